@@ -9,10 +9,13 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 from ai_model.routing import websocket_urlpatterns
+from ai_model.backends import warm_up
+from notifications.routing import websocket_urlpatterns as notification_websocket_urlpatterns
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Safe_Eye.settings')
 
@@ -20,7 +23,12 @@ application = ProtocolTypeRouter({
     "http": get_asgi_application(),
     "websocket": AuthMiddlewareStack(
         URLRouter(
-            websocket_urlpatterns
+            websocket_urlpatterns + notification_websocket_urlpatterns
         )
     ),
 })
+
+# Optional warm-up so the first request doesn't pay the model load; done
+# here rather than in AppConfig.ready so manage.py commands never load it
+if getattr(settings, 'AI_MODEL_WARMUP', False):
+    warm_up()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -105,13 +106,184 @@ WSGI_APPLICATION = 'Safe_Eye.wsgi.application'
 # Add ASGI application for WebSocket support
 ASGI_APPLICATION = 'Safe_Eye.asgi.application'
 
-# Channels configuration
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer',
-    },
+# Channels configuration. The in-memory layer only delivers group messages
+# within one process, so with more than one ASGI worker set
+# SAFE_EYE_REDIS_URL (e.g. redis://localhost:6379/0) to route them through
+# Redis and reach sockets on every worker. 'fakeredis://' runs the Redis
+# layer against an in-process stand-in (see notifications/layers.py).
+SAFE_EYE_REDIS_URL = os.environ.get('SAFE_EYE_REDIS_URL', '')
+if SAFE_EYE_REDIS_URL.startswith('fakeredis://'):
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'notifications.layers.FakeRedisChannelLayer',
+        },
+    }
+elif SAFE_EYE_REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [SAFE_EYE_REDIS_URL],
+                # Messages per channel before sends to it are dropped, and
+                # seconds an undelivered message is kept
+                'capacity': int(os.environ.get('SAFE_EYE_CHANNEL_CAPACITY', 1000)),
+                'expiry': 60,
+            },
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        },
+    }
+
+# Records per group message when pushing incidents/notifications to sockets
+ALERTS_BROADCAST_BATCH_SIZE = 50
+
+# Roles notified about every new incident (None: all active users)
+INCIDENT_NOTIFICATION_ROLES = None
+
+# AI model configuration
+# Weights are loaded once per process, on first use. Set AI_MODEL_WARMUP to
+# load them when the server starts instead (asgi.py / wsgi.py, so manage.py
+# migrate and friends never load them; runserver does, via those modules).
+AI_MODEL_PATH = BASE_DIR / 'ai_model' / 'best.pt'
+AI_MODEL_WARMUP = os.environ.get('SAFE_EYE_MODEL_WARMUP', '') == '1'
+
+# Inference backend, chosen per deployment (SAFE_EYE_INFERENCE_BACKEND):
+# 'torch' runs best.pt on PyTorch; 'onnxruntime' and 'openvino' export it
+# once (cached in ai_model/exports/, keyed by the weights' hash) and run the
+# export on the CPU. intra_op_threads / inter_op_threads size ONNX Runtime's
+# thread pools (None = its defaults). imgsz/conf/iou/max_det apply to every
+# backend; the defaults are ultralytics' own.
+AI_INFERENCE_BACKEND = {
+    'backend': os.environ.get('SAFE_EYE_INFERENCE_BACKEND', 'torch'),
+    'imgsz': 640,
+    'conf': 0.25,
+    'iou': 0.7,
+    'max_det': 300,
+    'intra_op_threads': int(os.environ['SAFE_EYE_INTRA_OP_THREADS']) if os.environ.get('SAFE_EYE_INTRA_OP_THREADS') else None,
+    'inter_op_threads': int(os.environ['SAFE_EYE_INTER_OP_THREADS']) if os.environ.get('SAFE_EYE_INTER_OP_THREADS') else None,
+}
+
+# WebSocket micro-batching: frames from all sockets are grouped into one
+# forward pass of up to AI_BATCH_MAX_SIZE frames, waiting at most
+# AI_BATCH_MAX_WAIT_MS for the batch to fill.
+AI_BATCH_MAX_SIZE = 8
+AI_BATCH_MAX_WAIT_MS = 10
+# Threads used to decode incoming WebSocket frames (None = min(4, CPUs))
+AI_DECODE_WORKERS = None
+
+# Camera detection: every running camera has its own capture thread, but
+# inference for all of them shares this many worker threads, each running
+# batches of up to AI_CAMERA_BATCH_SIZE frames. Frames beyond
+# AI_CAMERA_QUEUE_SIZE waiting for inference are dropped.
+AI_CAMERA_INFERENCE_WORKERS = 1
+AI_CAMERA_BATCH_SIZE = 8
+AI_CAMERA_QUEUE_SIZE = 64
+
+# Motion gating in front of YOLO (camera service and MJPEG stream): frames
+# are downscaled to `size` and compared with the previous one ('diff') or a
+# background model ('mog2'). Inference is skipped, and the last detections
+# reused, unless at least `min_changed_ratio` of the pixels changed by
+# `pixel_threshold` or more, or `max_skip_seconds` passed since the last run.
+AI_MOTION_GATE = {
+    'enabled': True,
+    'method': 'diff',
+    'size': (160, 90),
+    'pixel_threshold': 25,
+    'min_changed_ratio': 0.01,
+    'max_skip_seconds': 5.0,
 }
 
+# MJPEG video feed: one producer per camera encodes at this JPEG quality for
+# all viewers, and keeps the camera open this many seconds after the last
+# viewer disconnects.
+AI_STREAM_JPEG_QUALITY = 80
+AI_STREAM_IDLE_TIMEOUT = 5.0
+
+# Image uploads for detection are decoded from memory. Django only spools
+# uploads larger than FILE_UPLOAD_MAX_MEMORY_SIZE to a temporary file, and
+# anything above AI_MAX_UPLOAD_BYTES is rejected with 413.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024
+AI_MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+
+# Batch image detection (api/ai/incident/batch/): images per forward pass
+# (default and max allowed via ?batch_size=) and max images per request
+# (more uploaded files is a 413; an archive with more is cut off with a
+# trailing {"truncated": true} line).
+AI_BATCH_UPLOAD_SIZE = 16
+AI_BATCH_UPLOAD_MAX_SIZE = 64
+AI_BATCH_UPLOAD_MAX_IMAGES = 1000
+
+# Object tracking (camera service and ws/detect/): detections get stable
+# track ids. With detect_every > 1 the detector only runs on every Nth
+# analyzed frame and tracks are propagated in between. Tracks unmatched for
+# max_age frames are dropped.
+AI_TRACKER = {
+    'enabled': True,
+    'iou_threshold': 0.3,
+    'max_age': 30,
+    'detect_every': 1,
+}
+
+# Incident events per camera: an accident opens once min_positive_frames of
+# the last window_frames analyzed frames have a detection at or above
+# min_confidence. Later detections merge into it until close_after_seconds
+# pass with none. No new event opens for cooldown_seconds after a close.
+AI_INCIDENT_EVENTS = {
+    'min_positive_frames': 3,
+    'window_frames': 5,
+    'close_after_seconds': 10.0,
+    'cooldown_seconds': 30.0,
+    'min_confidence': 0.0,
+}
+
+# Incident persistence: detection threads queue incidents without blocking
+# and one writer thread bulk-creates them. A full queue drops (and counts)
+# new incidents; failed batches are retried max_retries times with
+# exponential backoff starting at retry_backoff seconds.
+AI_INCIDENT_WRITER = {
+    'max_queue_size': 1000,
+    'batch_size': 50,
+    'flush_interval': 1.0,
+    'max_retries': 3,
+    'retry_backoff': 0.5,
+}
+
+# Accident snapshots are encoded and stored (via default_storage, under
+# incidents/) by a small writer pool instead of the capture threads. A full
+# queue drops the snapshot.
+AI_SNAPSHOTS = {
+    'num_workers': 2,
+    'max_queue_size': 32,
+    'quality': 90,
+    'annotate': True,
+    'thumbnail_width': 320,
+}
+
+# Incident clips: each camera keeps the last buffer_seconds of footage,
+# sampled at fps and JPEG-encoded at width/quality, in a preallocated ring
+# buffer of max_buffer_bytes (the per-camera memory bound), and exports a
+# clip from pre_seconds before an event to post_seconds after it as
+# 'mp4' or 'avi' (motion-JPEG) into Incident.clip.
+AI_CLIPS = {
+    'enabled': False,
+    'fps': 5.0,
+    'buffer_seconds': 20.0,
+    'max_buffer_bytes': 16 * 1024 * 1024,
+    'width': 640,
+    'quality': 70,
+    'pre_seconds': 5.0,
+    'post_seconds': 5.0,
+    'format': 'mp4',
+}
+
+# Uploaded and AI-captured media (incident snapshots)
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 AUTH_USER_MODEL = 'users.CustomUser'
 # Authentication backends
 
@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Safe_Eye.settings')
 
 application = get_wsgi_application()
+
+# Optional warm-up so the first request doesn't pay the model load; done
+# here rather than in AppConfig.ready so manage.py commands never load it
+if getattr(settings, 'AI_MODEL_WARMUP', False):
+    from ai_model.backends import warm_up
+    warm_up()
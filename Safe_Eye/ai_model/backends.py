@@ -0,0 +1,393 @@
+"""
+Pluggable inference backends.
+
+Every inference path (REST uploads, WebSocket batches, camera workers, the
+MJPEG stream) goes through ``get_backend().predict(frames)`` and gets one
+DetectionArrays per frame, whatever runs the model:
+
+- ``torch``: the ultralytics/PyTorch model from ``model_registry`` (default)
+- ``onnxruntime``: ``best.pt`` exported once to ONNX and run with ONNX
+  Runtime on the CPU, with configurable intra/inter-op thread pools
+- ``openvino``: ``best.pt`` exported once to OpenVINO IR and run through
+  ultralytics' OpenVINO support
+
+Exports are cached next to the weights in ``exports/``, keyed by the
+weights' SHA-256, so a new ``best.pt`` is re-exported automatically and an
+unchanged one never is.
+"""
+import ast
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import cv2
+import numpy as np
+from django.conf import settings
+
+from .model_registry import get_model, get_model_lock, get_model_path
+from .results import DetectionArrays, empty_arrays, result_to_arrays
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('torch', 'onnxruntime', 'openvino')
+EXPORT_DIR = 'exports'
+
+# ultralytics' predict() defaults, so every backend returns the same boxes
+DEFAULT_IMGSZ = 640
+DEFAULT_CONF = 0.25
+DEFAULT_IOU = 0.7
+DEFAULT_MAX_DET = 300
+# Same constants as ultralytics' non_max_suppression
+MAX_NMS = 30000
+MAX_WH = 7680
+STRIDE = 32
+PAD_VALUE = 114
+
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """SHA-256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as weights:
+        for chunk in iter(lambda: weights.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def exported_model_path(model_path, fmt, imgsz=DEFAULT_IMGSZ):
+    """Cache location of ``model_path`` exported to ``fmt`` ('onnx' or 'openvino')"""
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    name = f'{stem}-{file_hash(model_path)[:16]}-{imgsz}'
+    # 'dynamic' keeps older static batch-1 OpenVINO exports from being reused
+    name += '.onnx' if fmt == 'onnx' else '-dynamic_openvino_model'
+    return os.path.join(os.path.dirname(model_path), EXPORT_DIR, name)
+
+
+_export_lock = threading.Lock()
+
+
+def export_model(model_path, fmt, imgsz=DEFAULT_IMGSZ):
+    """
+    Export a .pt model to ONNX or OpenVINO, unless already cached.
+
+    The export runs on a private copy of the weights in a temp directory
+    (ultralytics writes its output next to the weights it loaded) and is
+    moved into the cache when complete, so a crashed or concurrent export
+    never leaves a half-written artifact behind.
+
+    Returns:
+        Path of the exported model (.onnx file or OpenVINO directory)
+    """
+    target = exported_model_path(model_path, fmt, imgsz)
+    with _export_lock:
+        if os.path.exists(target):
+            return target
+
+        from ultralytics import YOLO
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        started = time.perf_counter()
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(target)) as workdir:
+            weights = shutil.copy2(model_path, os.path.join(workdir, os.path.basename(model_path)))
+            # Dynamic axes let both runtimes take the batches the camera pool
+            # and batch endpoints send, and the same stride-aligned
+            # rectangular inputs PyTorch sees
+            exported = YOLO(weights).export(format=fmt, imgsz=imgsz, dynamic=True, verbose=False)
+            os.replace(str(exported), target)
+        logger.info(f"Exported {model_path} to {fmt} in {time.perf_counter() - started:.1f}s: {target}")
+        return target
+
+
+def letterbox(image, new_shape, auto):
+    """
+    Resize keeping aspect ratio and pad to ``new_shape`` (h, w), exactly
+    like ultralytics' LetterBox; with ``auto`` the padding is only what is
+    needed to reach a multiple of the stride.
+
+    Returns:
+        Padded BGR image
+    """
+    shape = image.shape[:2]
+    ratio = min(new_shape[0] / shape[0], new_shape[1] / shape[1])
+    new_unpad = (int(round(shape[1] * ratio)), int(round(shape[0] * ratio)))
+    dw, dh = new_shape[1] - new_unpad[0], new_shape[0] - new_unpad[1]
+    if auto:
+        dw, dh = np.mod(dw, STRIDE), np.mod(dh, STRIDE)
+    dw /= 2
+    dh /= 2
+    if shape[::-1] != new_unpad:
+        image = cv2.resize(image, new_unpad, interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    return cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT,
+                              value=(PAD_VALUE, PAD_VALUE, PAD_VALUE))
+
+
+def scale_boxes(input_shape, boxes, image_shape):
+    """Map xyxy boxes (in place) from the letterboxed input back to the original image"""
+    gain = min(input_shape[0] / image_shape[0], input_shape[1] / image_shape[1])
+    pad_x = round((input_shape[1] - image_shape[1] * gain) / 2 - 0.1)
+    pad_y = round((input_shape[0] - image_shape[0] * gain) / 2 - 0.1)
+    boxes[:, [0, 2]] -= pad_x
+    boxes[:, [1, 3]] -= pad_y
+    boxes /= gain
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, image_shape[1])
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, image_shape[0])
+    return boxes
+
+
+def nms(boxes, scores, iou_threshold):
+    """Greedy non-maximum suppression; indices of the kept boxes, best first"""
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        width = np.maximum(0.0, np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]))
+        height = np.maximum(0.0, np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]))
+        inter = width * height
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+class InferenceBackend:
+    """Runs the detector on BGR frames; one DetectionArrays per frame"""
+
+    name = None
+
+    def __init__(self, model_path, imgsz=DEFAULT_IMGSZ, conf=DEFAULT_CONF, iou=DEFAULT_IOU,
+                 max_det=DEFAULT_MAX_DET):
+        self.model_path = model_path
+        self.imgsz = int(imgsz)
+        self.conf = float(conf)
+        self.iou = float(iou)
+        self.max_det = int(max_det)
+        self.load_seconds = None
+
+    @property
+    def names(self):
+        raise NotImplementedError
+
+    def predict(self, images, conf=None):
+        """
+        Args:
+            images: List of BGR numpy frames
+            conf: Confidence threshold for this call (default: the backend's)
+
+        Returns:
+            One DetectionArrays per image, in input order
+        """
+        raise NotImplementedError
+
+    def get_stats(self):
+        return {
+            'backend': self.name,
+            'model_path': self.model_path,
+            'imgsz': self.imgsz,
+            'load_seconds': self.load_seconds,
+        }
+
+
+class UltralyticsBackend(InferenceBackend):
+    """
+    Shared ultralytics model from the registry: the .pt weights on
+    PyTorch, or an exported OpenVINO model directory.
+    """
+
+    def __init__(self, model_path, name='torch', **options):
+        super().__init__(model_path, **options)
+        self.name = name
+        started = time.perf_counter()
+        self.model = get_model(model_path)
+        self.load_seconds = round(time.perf_counter() - started, 3)
+        self.model_lock = get_model_lock(model_path)
+
+    @property
+    def names(self):
+        return self.model.names
+
+    def predict(self, images, conf=None):
+        if not images:
+            return []
+        with self.model_lock:
+            results = self.model(list(images), imgsz=self.imgsz, conf=self.conf if conf is None else conf,
+                                 iou=self.iou, max_det=self.max_det, verbose=False)
+        return [result_to_arrays(result) for result in results]
+
+
+class OnnxRuntimeBackend(InferenceBackend):
+    """
+    Exported ONNX model on ONNX Runtime (CPU).
+
+    Pre- and post-processing mirror ultralytics (letterbox, class-aware NMS,
+    box rescaling) in NumPy, so results match the PyTorch backend within
+    numerical tolerance. An ``InferenceSession`` is safe to call from
+    several threads, so no lock is taken.
+
+    Args:
+        intra_op_threads: Threads used inside one operator (None = ORT default)
+        inter_op_threads: Threads running independent operators in parallel;
+            above 1 the session switches to parallel execution
+        providers: ONNX Runtime execution providers
+    """
+
+    name = 'onnxruntime'
+
+    def __init__(self, model_path, intra_op_threads=None, inter_op_threads=None,
+                 providers=('CPUExecutionProvider',), **options):
+        super().__init__(model_path, **options)
+        import onnxruntime as ort
+
+        session_options = ort.SessionOptions()
+        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            session_options.intra_op_num_threads = int(intra_op_threads)
+        if inter_op_threads:
+            session_options.inter_op_num_threads = int(inter_op_threads)
+            if int(inter_op_threads) > 1:
+                session_options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+
+        started = time.perf_counter()
+        self.session = ort.InferenceSession(model_path, sess_options=session_options, providers=list(providers))
+        self.load_seconds = round(time.perf_counter() - started, 3)
+        self.input_name = self.session.get_inputs()[0].name
+        # A static export only accepts its own square input size
+        self.dynamic = not all(isinstance(dim, int) for dim in self.session.get_inputs()[0].shape[2:])
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self._names = ast.literal_eval(metadata['names']) if 'names' in metadata else {}
+
+    @property
+    def names(self):
+        return self._names
+
+    def _preprocess(self, images):
+        # Like ultralytics: minimal stride-aligned padding when every frame
+        # has the same shape, otherwise a square imgsz input
+        auto = self.dynamic and all(image.shape == images[0].shape for image in images)
+        padded = [letterbox(image, (self.imgsz, self.imgsz), auto) for image in images]
+        batch = np.stack(padded)[..., ::-1].transpose(0, 3, 1, 2)  # BGR HWC -> RGB CHW
+        return np.ascontiguousarray(batch, dtype=np.float32) / 255.0
+
+    def _postprocess(self, prediction, input_shape, image_shape, conf):
+        # prediction: (4 + classes, anchors) of cx, cy, w, h, class scores
+        prediction = prediction.T
+        scores = prediction[:, 4:]
+        cls = scores.argmax(1)
+        confidence = scores[np.arange(len(scores)), cls]
+        keep = confidence > conf
+        if not keep.any():
+            return empty_arrays(self._names)
+        boxes, confidence, cls = prediction[keep, :4], confidence[keep], cls[keep]
+
+        order = confidence.argsort()[::-1][:MAX_NMS]
+        boxes, confidence, cls = boxes[order], confidence[order], cls[order]
+        xyxy = np.empty_like(boxes)
+        xyxy[:, :2] = boxes[:, :2] - boxes[:, 2:] / 2
+        xyxy[:, 2:] = boxes[:, :2] + boxes[:, 2:] / 2
+
+        # Offset boxes by class so NMS never suppresses across classes
+        kept = nms(xyxy + cls[:, None] * MAX_WH, confidence, self.iou)[:self.max_det]
+        xyxy = scale_boxes(input_shape, xyxy[kept], image_shape)
+        return DetectionArrays(xyxy.astype(np.float32), confidence[kept].astype(np.float32),
+                               cls[kept].astype(np.int64), self._names)
+
+    def predict(self, images, conf=None):
+        if not images:
+            return []
+        conf = self.conf if conf is None else conf
+        batch = self._preprocess(images)
+        output = self.session.run(None, {self.input_name: batch})[0]
+        if output.ndim != 3 or output.shape[1] < 5:
+            raise ValueError(f"Unsupported detection output shape {output.shape}")
+        return [
+            self._postprocess(prediction, batch.shape[2:], image.shape[:2], conf)
+            for prediction, image in zip(output, images)
+        ]
+
+    def get_stats(self):
+        stats = super().get_stats()
+        stats.update({
+            'intra_op_threads': self.intra_op_threads,
+            'inter_op_threads': self.inter_op_threads,
+            'providers': self.session.get_providers(),
+        })
+        return stats
+
+
+def build_backend(name='torch', model_path=None, **options):
+    """
+    Build a backend, exporting the weights first when it needs them.
+
+    Args:
+        name: One of BACKENDS
+        model_path: .pt weights (default: AI_MODEL_PATH)
+        options: imgsz, conf, iou, max_det and, for onnxruntime,
+            intra_op_threads, inter_op_threads, providers
+
+    Raises:
+        RuntimeError: if the model cannot be exported or loaded
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}' (expected one of {', '.join(BACKENDS)})")
+    model_path = get_model_path(model_path)
+    ort_options = {key: options.pop(key) for key in ('intra_op_threads', 'inter_op_threads', 'providers')
+                   if key in options}
+    if name == 'torch':
+        return UltralyticsBackend(model_path, **options)
+
+    imgsz = options.get('imgsz', DEFAULT_IMGSZ)
+    try:
+        if name == 'openvino':
+            return UltralyticsBackend(export_model(model_path, 'openvino', imgsz), name='openvino', **options)
+        return OnnxRuntimeBackend(export_model(model_path, 'onnx', imgsz), **ort_options, **options)
+    except RuntimeError:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to load {name} backend for {model_path}: {e}")
+        raise RuntimeError("YOLO model not loaded.") from e
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """
+    Process-wide inference backend, configured from AI_INFERENCE_BACKEND.
+
+    Raises:
+        RuntimeError: if the model cannot be loaded
+    """
+    global _backend
+    if _backend is not None:
+        return _backend
+    with _backend_lock:
+        if _backend is None:
+            options = {key: value for key, value in getattr(settings, 'AI_INFERENCE_BACKEND', {}).items()
+                       if value is not None}
+            _backend = build_backend(options.pop('backend', 'torch'), **options)
+        return _backend
+
+
+def get_backend_stats():
+    """Stats of the loaded backend (None until something has run inference)"""
+    return _backend.get_stats() if _backend is not None else None
+
+
+def warm_up():
+    """Load (and export, if needed) the configured backend eagerly"""
+    try:
+        get_backend()
+        return True
+    except RuntimeError:
+        return False
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .yolo_inference import YOLOInference
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceBatcher:
+    """
+    Dynamic micro-batching scheduler shared by all WebSocket consumers.
+
+    Consumers ``await submit(frame)``; frames from every connection are
+    collected into batches of up to ``max_batch_size`` (waiting at most
+    ``max_wait_ms`` after the first frame), run through the model in one
+    forward pass on a worker thread, and each caller gets back the
+    DetectionArrays for its own frame.
+    """
+
+    def __init__(self, max_batch_size=8, max_wait_ms=10, executor=None):
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        # One inference thread: the model lock serializes forward passes anyway
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix='yolo-batch')
+        self._inference = None
+        self._queue = None
+        self._task = None
+        self.batches_run = 0
+        self.frames_run = 0
+
+    async def submit(self, frame):
+        """Queue a frame for the next batch and wait for its DetectionArrays"""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((frame, future))
+        return await future
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+
+    async def _collect_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Frames whose sockets went away in the meantime aren't worth inferring
+        return [(frame, future) for frame, future in batch if not future.done()]
+
+    def _detect_batch(self, frames):
+        if self._inference is None:
+            self._inference = YOLOInference()
+        return self._inference.detect_batch_arrays(frames)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+            if not batch:
+                continue
+            frames = [frame for frame, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self._detect_batch, frames)
+            except Exception as e:
+                logger.exception(f"Batched inference failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches_run += 1
+            self.frames_run += len(frames)
+            for (_, future), detections in zip(batch, results):
+                if not future.done():
+                    future.set_result(detections)
+
+    def get_stats(self):
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'batches_run': self.batches_run,
+            'frames_run': self.frames_run,
+            'avg_batch_size': (self.frames_run / self.batches_run) if self.batches_run else 0.0,
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+        }
+
+
+_batcher = None
+
+
+def get_batcher():
+    """Process-wide batcher, configured from AI_BATCH_MAX_SIZE / AI_BATCH_MAX_WAIT_MS"""
+    global _batcher
+    if _batcher is None:
+        _batcher = InferenceBatcher(
+            max_batch_size=getattr(settings, 'AI_BATCH_MAX_SIZE', 8),
+            max_wait_ms=getattr(settings, 'AI_BATCH_MAX_WAIT_MS', 10),
+        )
+    return _batcher
+
+
+_decode_executor = None
+
+
+def get_decode_executor():
+    """
+    Bounded thread pool for per-frame CPU work (JPEG decode) that must stay
+    off the event loop; sized by AI_DECODE_WORKERS.
+    """
+    global _decode_executor
+    if _decode_executor is None:
+        workers = getattr(settings, 'AI_DECODE_WORKERS', None) or min(4, os.cpu_count() or 1)
+        _decode_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='frame-decode')
+    return _decode_executor
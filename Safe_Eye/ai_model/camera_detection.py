@@ -1,188 +1,568 @@
 import cv2
 import threading
+import queue
 import time
 import os
-from ultralytics import YOLO
 from django.conf import settings
-import requests
-import json
+from .backends import get_backend
+from .sampling import IntervalSampler
+from .results import to_detections, empty_arrays
+from .motion import build_motion_gate
+from .tracking import build_tracker
+from .events import IncidentEventTracker, OPENED, CLOSED
+from .persistence import get_incident_writer
+from .snapshots import get_snapshot_writer
+from .clips import build_clip_recorder
 
-class CameraDetectionService:
-    def __init__(self):
-        # Get the directory of the current script
-        BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-        MODEL_PATH = os.path.join(BASE_DIR, 'best.pt')
-        
-        # Load the YOLO model
-        self.model = YOLO(MODEL_PATH)
-        self.is_running = False
-        self.camera_thread = None
-        self.camera = None
-        
-    def start_camera_detection(self, camera_source=0, detection_interval=1.0):
+
+# Kinds of CameraDetectionService keys, so a CameraFeed pk and a webcam index
+# with the same number never address the same camera
+FEED = 'feed'
+DEVICE = 'device'
+SOURCE = 'source'
+
+
+def camera_key(camera_source=None, camera_feed_id=None):
+    """
+    Service key of a camera: (FEED, pk) for a CameraFeed, (DEVICE, index)
+    for a local webcam and (SOURCE, url) for an ad-hoc stream URL or file
+    """
+    if camera_feed_id is not None:
+        return (FEED, int(camera_feed_id))
+    if isinstance(camera_source, int):
+        return (DEVICE, camera_source)
+    return (SOURCE, camera_source)
+
+
+class InferenceWorkerPool:
+    """
+    Inference workers shared by every camera.
+
+    Capture threads hand sampled frames to ``submit``; worker threads drain
+    the queue, run frames from several cameras through the model as one
+    batch and hand each camera its detections. The number of inference
+    threads is fixed, no matter how many cameras are running.
+    """
+
+    def __init__(self, num_workers=1, max_batch_size=8, max_queue_size=64):
+        self.num_workers = max(1, int(num_workers))
+        self.max_batch_size = max(1, int(max_batch_size))
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._threads = []
+        self._lock = threading.Lock()
+        self.batches_run = 0
+        self.frames_run = 0
+        self.frames_rejected = 0
+
+    def _ensure_started(self):
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.num_workers:
+                thread = threading.Thread(
+                    target=self._worker_loop,
+                    name=f'camera-inference-{len(self._threads)}',
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, camera, frame):
         """
-        Start live camera detection
-        
-        Args:
-            camera_source: Camera source (0 for default webcam, or IP camera URL)
-            detection_interval: How often to run detection (in seconds)
+        Queue a frame for inference.
+
+        Returns:
+            False if the pool is saturated (the caller should drop the frame)
         """
-        if self.is_running:
-            print("Camera detection is already running!")
-            return
-            
-        self.is_running = True
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((camera, frame))
+            return True
+        except queue.Full:
+            self.frames_rejected += 1
+            return False
+
+    def _worker_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            frames = [frame for _, frame in batch]
+            try:
+                results = self._detect_batch(frames)
+                if len(results) != len(frames):
+                    raise ValueError(f"got {len(results)} results for {len(frames)} frames")
+            except Exception as e:
+                print(f"❌ Error in accident detection: {e}")
+                results = [empty_arrays() for _ in frames]
+
+            self.batches_run += 1
+            self.frames_run += len(frames)
+            # One camera's failure must neither kill this shared thread nor
+            # starve the other cameras in the batch
+            for (camera, frame), arrays in zip(batch, results):
+                try:
+                    camera.on_detections(frame, arrays)
+                except Exception as e:
+                    print(f"❌ Error handling detections for camera {camera.camera_id}: {e}")
+
+    def _detect_batch(self, frames):
+        return get_backend().predict(frames)
+
+    def get_status(self):
+        return {
+            'workers': self.num_workers,
+            'max_batch_size': self.max_batch_size,
+            'queued': self._queue.qsize(),
+            'batches_run': self.batches_run,
+            'frames_run': self.frames_run,
+            'frames_rejected': self.frames_rejected,
+        }
+
+
+class CameraWorker:
+    """A single camera source: one lightweight capture thread, no inference of its own"""
+
+    def __init__(self, camera_id, camera_source, detection_interval, inference_pool, location=None, sampler=None,
+                 camera_feed_id=None):
+        self.camera_id = camera_id
+        self.camera_source = camera_source
+        self.detection_interval = detection_interval
+        self.location = location
+        # CameraFeed this source belongs to (None for ad-hoc sources)
+        self.camera_feed_id = camera_feed_id
+        self.inference_pool = inference_pool
+        self.sampler = sampler or IntervalSampler(detection_interval)
+        # Skips YOLO on frames where nothing moved, reusing last_detections
+        # (not needed when the sampler already drops static frames)
+        self.motion_gate = None
+        if not self.sampler.gates_motion:
+            self.motion_gate = build_motion_gate(getattr(settings, 'AI_MOTION_GATE', None))
+        self.last_detections = []
+        # Stable track ids across frames; with detect_every > 1 the detector
+        # only runs on every Nth analyzed frame and tracks are propagated
+        self.tracker = build_tracker(getattr(settings, 'AI_TRACKER', None))
+        # Turns per-frame detections into debounced incident events
+        self.events = IncidentEventTracker(camera_id, **getattr(settings, 'AI_INCIDENT_EVENTS', {}))
+        self._events_lock = threading.Lock()
+        # Snapshots and clips are encoded and stored off-thread; an incident
+        # is only queued for the database once its snapshot is stored, so
+        # updates that arrive first wait in _pending_updates
+        self.snapshots = get_snapshot_writer()
+        self._incident_lock = threading.Lock()
+        self._pending_updates = {}
+        # Ring buffer of the last few seconds, for clips around each event
+        self.clips = build_clip_recorder(getattr(settings, 'AI_CLIPS', None))
+
+        self.camera = None
+        self.camera_thread = None
+        self._stop_event = threading.Event()
+        # Only one frame per camera is ever waiting on / running inference
+        self._inference_pending = threading.Event()
+
+        self.started_at = None
+        self.frames_read = 0
+        self.frames_decoded = 0
+        self.frames_analyzed = 0
+        self.incidents_detected = 0
+        self.last_detection_at = None
+        self.error = None
+
+    @property
+    def is_running(self):
+        return self.camera_thread is not None and self.camera_thread.is_alive()
+
+    @property
+    def active_motion_gate(self):
+        """The gate filtering this camera's frames: its own, or its sampler's"""
+        return self.motion_gate or getattr(self.sampler, 'motion_gate', None)
+
+    def start(self):
+        self._stop_event.clear()
+        self.started_at = time.time()
         self.camera_thread = threading.Thread(
             target=self._camera_detection_loop,
-            args=(camera_source, detection_interval)
+            name=f'camera-capture-{self.camera_id}',
+            daemon=True
         )
-        self.camera_thread.daemon = True
         self.camera_thread.start()
-        print(f"🎥 Camera detection started on source: {camera_source}")
-        
-    def stop_camera_detection(self):
-        """Stop live camera detection"""
-        self.is_running = False
-        if self.camera:
-            self.camera.release()
-        if self.camera_thread:
-            self.camera_thread.join()
-        print("🛑 Camera detection stopped")
-        
-    def _camera_detection_loop(self, camera_source, detection_interval):
-        """Main camera detection loop"""
+        print(f"🎥 Camera detection started on source: {self.camera_source}")
+
+    def stop(self, timeout=5.0):
+        self._stop_event.set()
+        if self.camera_thread and self.camera_thread is not threading.current_thread():
+            self.camera_thread.join(timeout)
+        # Close out an accident still in progress
+        with self._events_lock:
+            for _, event in self.events.flush(time.time()):
+                self._handle_event_closed(event)
+        if self.clips:
+            self._export_clips(self.clips.poll(time.time(), flush=True))
+        print(f"🛑 Camera detection stopped: {self.camera_source}")
+
+    def _is_file_source(self):
+        return isinstance(self.camera_source, str) and os.path.isfile(self.camera_source)
+
+    def _camera_detection_loop(self):
+        """
+        Capture loop: grab every frame, but only decode the ones the sampler
+        picks, and hand those to the shared inference pool.
+
+        ``grab()`` just pulls the next packet off the stream (which keeps
+        live sources from lagging behind); the expensive decode happens in
+        ``retrieve()``, only for sampled frames.
+        """
         try:
             # Open camera
-            self.camera = cv2.VideoCapture(camera_source)
-            
+            self.camera = cv2.VideoCapture(self.camera_source)
+
             if not self.camera.isOpened():
-                print(f"❌ Error: Could not open camera source {camera_source}")
+                self.error = f"Could not open camera source {self.camera_source}"
+                print(f"❌ Error: {self.error}")
                 return
-                
-            print(f"📹 Camera opened successfully: {camera_source}")
-            
-            last_detection_time = 0
-            
-            while self.is_running:
-                # Read frame
-                ret, frame = self.camera.read()
-                if not ret:
-                    print("❌ Error reading frame from camera")
+
+            print(f"📹 Camera opened successfully: {self.camera_source}")
+
+            # Live sources block in grab() at their own frame rate; files
+            # would be read as fast as the disk allows, so pace them instead
+            frame_period = 0
+            if self._is_file_source():
+                fps = self.camera.get(cv2.CAP_PROP_FPS)
+                frame_period = 1.0 / fps if fps and fps > 0 else 0
+            next_frame_time = time.monotonic()
+
+            while not self._stop_event.is_set():
+                if not self.camera.grab():
+                    self.error = "Error reading frame from camera"
+                    print(f"❌ {self.error}: {self.camera_source}")
                     break
-                    
+                self.frames_read += 1
+
+                if frame_period:
+                    next_frame_time += frame_period
+                    delay = next_frame_time - time.monotonic()
+                    if delay > 0:
+                        self._stop_event.wait(delay)
+
                 current_time = time.time()
-                
-                # Run detection at specified interval
-                if current_time - last_detection_time >= detection_interval:
-                    detections = self._detect_accidents(frame)
-                    
-                    if detections:
-                        print(f"🚨 Accident detected! Found {len(detections)} incidents")
-                        self._handle_accident_detection(detections, frame)
-                    
-                    last_detection_time = current_time
-                    
-                # Optional: Display live feed (comment out for production)
-                # cv2.imshow('Live Camera Detection', frame)
-                # if cv2.waitKey(1) & 0xFF == ord('q'):
-                #     break
-                    
+
+                # Skip (without decoding) frames the sampler doesn't want, and
+                # frames arriving while this camera's last frame is in flight,
+                # unless the clip buffer is due a frame
+                buffer_frame = self.clips is not None and self.clips.wants_frame(current_time)
+                detect = (not self._inference_pending.is_set()
+                          and self.sampler.should_decode(self.frames_read, current_time))
+                if not (detect or buffer_frame):
+                    continue
+
+                ret, frame = self.camera.retrieve()
+                if not ret:
+                    continue
+                self.frames_decoded += 1
+
+                # A bad frame is skipped; it must not end the capture thread
+                try:
+                    if buffer_frame:
+                        self._export_clips(self.clips.add_frame(frame, current_time))
+                    if detect:
+                        self._analyze_frame(frame, current_time)
+                except Exception as e:
+                    print(f"❌ Error processing frame from {self.camera_source}: {e}")
+
         except Exception as e:
+            self.error = str(e)
             print(f"❌ Error in camera detection loop: {e}")
         finally:
             if self.camera:
                 self.camera.release()
-            cv2.destroyAllWindows()
-            
-    def _detect_accidents(self, frame):
-        """
-        Run YOLO detection on a frame
-        
-        Args:
-            frame: OpenCV frame
-            
-        Returns:
-            List of detections with bounding boxes and confidence scores
-        """
+
+    def _analyze_frame(self, frame, current_time):
+        """Run a sampled frame through the tracker, motion gate or inference pool"""
+        if not self.sampler.accept(frame, current_time):
+            return
+
+        if self.tracker and not self.tracker.should_detect():
+            # Between detector runs: move the known tracks forward
+            self.last_detections = to_detections(self.tracker.predict(), 'camera', current_time)
+            self._process_detections(frame, self.last_detections)
+            return
+
+        if self.motion_gate and not self.motion_gate.should_infer(frame, current_time):
+            # Static scene: the previous detections still apply
+            self._process_detections(frame, self.last_detections)
+            return
+
+        self._inference_pending.set()
+        if not self.inference_pool.submit(self, frame):
+            self._inference_pending.clear()
+
+    def on_detections(self, frame, arrays):
+        """Called from an inference worker with this camera's DetectionArrays"""
         try:
-            results = self.model(frame)
-            detections = []
-            
-            for result in results:
-                for box in result.boxes:
-                    detection = {
-                        'class': int(box.cls),
-                        'label': result.names[int(box.cls)],
-                        'confidence': float(box.conf),
-                        'box': [float(coord) for coord in box.xyxy[0]],
-                        'timestamp': time.time()
-                    }
-                    detections.append(detection)
-                    
-            return detections
-            
-        except Exception as e:
-            print(f"❌ Error in accident detection: {e}")
-            return []
-            
-    def _handle_accident_detection(self, detections, frame):
+            if self.tracker:
+                arrays = self.tracker.update(arrays)
+            detections = to_detections(arrays, 'camera')
+            self.frames_analyzed += 1
+            self.last_detections = detections
+        finally:
+            # Even on error, or this camera never submits another frame
+            self._inference_pending.clear()
+        self._process_detections(frame, detections)
+
+    def _process_detections(self, frame, detections):
+        now = time.time()
+        if detections:
+            self.last_detection_at = now
+        with self._events_lock:
+            for transition, event in self.events.observe(detections, now):
+                if transition == OPENED:
+                    self.incidents_detected += 1
+                    print(f"🚨 Accident detected on {self.camera_id}! Found {len(detections)} incidents")
+                    self._handle_accident_detection(event, detections, frame)
+                elif transition == CLOSED:
+                    self._handle_event_closed(event)
+
+    def _handle_accident_detection(self, event, detections, frame):
         """
-        Handle detected accidents - save to database, notify frontend, etc.
-        
+        Handle a newly opened accident event - save to database, notify frontend, etc.
+
         Args:
+            event: The IncidentEvent that just opened
             detections: List of detected objects
             frame: The frame where detection occurred
         """
-        try:
-            # Save frame as image (optional)
-            timestamp = int(time.time())
-            frame_path = f"media/accident_frames/accident_{timestamp}.jpg"
-            os.makedirs(os.path.dirname(frame_path), exist_ok=True)
-            cv2.imwrite(frame_path, frame)
-            
-            # Create incident record in database
-            incident_data = {
-                'incident_type': 'accident',
-                'detections': detections,
-                'frame_path': frame_path,
-                'timestamp': timestamp,
-                'camera_id': 'live_camera'
-            }
-            
-            # Call Django API to save incident
-            self._save_incident_to_database(incident_data)
-            
-            print(f"📸 Accident frame saved: {frame_path}")
-            
-        except Exception as e:
-            print(f"❌ Error handling accident detection: {e}")
-            
+        incident_data = {
+            'incident_type': 'Accident',
+            'event_id': event.id,
+            'description': self._describe_event(event, detections),
+            'confidence': event.peak_confidence,
+            'image': None,
+            'camera_id': self.camera_id,
+            'camera_feed_id': self.camera_feed_id,
+            'location': self.location
+        }
+
+        with self._incident_lock:
+            # Marks the event as not yet queued for the database
+            self._pending_updates[event.id] = []
+
+        def on_snapshot_saved(stored_name):
+            if stored_name:
+                print(f"📸 Accident frame saved: {stored_name}")
+            incident_data['image'] = stored_name
+            with self._incident_lock:
+                self._save_incident_to_database(incident_data)
+                for update in self._pending_updates.pop(event.id, []):
+                    get_incident_writer().submit_update(update)
+
+        # One snapshot per event, encoded and stored by the snapshot writer;
+        # if its queue is full the incident is still recorded, without image
+        if not self.snapshots.submit_snapshot(f"accident_{self.camera_id}_{event.id}.jpg", frame, detections,
+                                              on_snapshot_saved):
+            print(f"⚠️ Snapshot queue full, recording event {event.id} without an image")
+            on_snapshot_saved(None)
+        if self.clips:
+            self.clips.event_opened(event, lambda frames: self._export_clip(event, frames))
+
+    def _handle_event_closed(self, event):
+        """An accident scene ended: record its duration and peak confidence"""
+        duration = event.end_time - event.start_time
+        print(f"✅ Accident event {event.id} on {self.camera_id} closed after "
+              f"{duration:.1f}s, peak confidence {event.peak_confidence:.2f}")
+        if self.clips:
+            self.clips.event_closed(event)
+        self._queue_incident_update({
+            'event_id': event.id,
+            'confidence': event.peak_confidence,
+            'description': self._describe_event(event, event.peak_detections, duration),
+        })
+
+    def _queue_incident_update(self, update):
+        with self._incident_lock:
+            pending = self._pending_updates.get(update['event_id'])
+            if pending is not None:
+                # Snapshot still being written; queued right after the open
+                pending.append(update)
+            else:
+                get_incident_writer().submit_update(update)
+
+    def _export_clips(self, ready):
+        for on_ready, frames in ready:
+            on_ready(frames)
+
+    def _export_clip(self, event, frames):
+        """Hand an event's buffered footage to the snapshot writer and link the stored clip"""
+        name = f"accident_{self.camera_id}_{event.id}.{self.clips.format}"
+
+        def on_clip_saved(stored_name):
+            if stored_name:
+                print(f"🎬 Accident clip saved: {stored_name}")
+                self._queue_incident_update({'event_id': event.id, 'clip': stored_name})
+
+        if not self.snapshots.submit_clip(name, frames, self.clips.fps, on_clip_saved):
+            print(f"⚠️ Snapshot queue full, dropped clip {name}")
+
+    def _describe_event(self, event, detections, duration=None):
+        labels = sorted({detection['label'] for detection in detections})
+        description = f"Detected by camera {self.camera_id}: {', '.join(labels) or 'accident'}"
+        if duration is not None:
+            description += f" (lasted {duration:.1f}s over {event.positive_frames} frames)"
+        return description
+
     def _save_incident_to_database(self, incident_data):
         """
-        Save incident to Django database via API call
+        Hand the incident to the persistence queue without blocking the
+        detection thread (the queue drops and counts it when full)
         """
-        try:
-            # This would call your Django API endpoint
-            # For now, we'll just print the data
-            print(f"💾 Saving incident to database: {incident_data}")
-            
-            # TODO: Implement actual API call to save incident
-            # response = requests.post(
-            #     'http://127.0.0.1:8000/api/incidents/',
-            #     json=incident_data,
-            #     headers={'Content-Type': 'application/json'}
-            # )
-            
-        except Exception as e:
-            print(f"❌ Error saving incident to database: {e}")
-            
-    def get_camera_status(self):
-        """Get current camera detection status"""
+        if not get_incident_writer().submit_opened(incident_data):
+            print(f"⚠️ Incident queue full, dropped event {incident_data['event_id']}")
+
+    def get_status(self):
         return {
+            'camera_id': self.camera_id,
+            'camera_feed_id': self.camera_feed_id,
+            'camera_source': self.camera_source,
+            'location': self.location,
             'is_running': self.is_running,
-            'camera_source': getattr(self, 'camera_source', None),
-            'detection_interval': getattr(self, 'detection_interval', None)
+            'detection_interval': self.detection_interval,
+            'sampling': self.sampler.describe(),
+            'started_at': self.started_at,
+            'frames_read': self.frames_read,
+            'frames_decoded': self.frames_decoded,
+            'frames_analyzed': self.frames_analyzed,
+            'motion_gate': self.active_motion_gate.get_stats() if self.active_motion_gate else None,
+            'tracker': self.tracker.get_stats() if self.tracker else None,
+            'incidents_detected': self.incidents_detected,
+            'events': self.events.get_stats(),
+            'clip_buffer': self.clips.get_stats() if self.clips else None,
+            'last_detection_at': self.last_detection_at,
+            'error': self.error,
+        }
+
+
+class CameraDetectionService:
+    """
+    Runs any number of camera sources concurrently.
+
+    Each source gets its own capture thread (``CameraWorker``); inference for
+    all of them goes through one shared ``InferenceWorkerPool``. Cameras are
+    keyed by ``camera_key``: (FEED, pk), (DEVICE, index) or (SOURCE, url).
+    """
+
+    def __init__(self):
+        # The YOLO model comes from the shared registry on first detection,
+        # so creating the service (at import time) doesn't load any weights
+        self.cameras = {}
+        self._lock = threading.Lock()
+        self._inference_pool = None
+
+    @property
+    def inference_pool(self):
+        if self._inference_pool is None:
+            self._inference_pool = InferenceWorkerPool(
+                num_workers=getattr(settings, 'AI_CAMERA_INFERENCE_WORKERS', 1),
+                max_batch_size=getattr(settings, 'AI_CAMERA_BATCH_SIZE', 8),
+                max_queue_size=getattr(settings, 'AI_CAMERA_QUEUE_SIZE', 64),
+            )
+        return self._inference_pool
+
+    @property
+    def is_running(self):
+        return any(camera.is_running for camera in self.cameras.values())
+
+    def start_camera_detection(self, camera_source=0, detection_interval=1.0, camera_id=None, location=None,
+                               sampler=None, camera_feed_id=None):
+        """
+        Start live camera detection
+
+        Args:
+            camera_source: Camera source (0 for default webcam, or IP camera URL)
+            detection_interval: How often to run detection (in seconds)
+            camera_id: Label used in logs, file names and incident
+                descriptions (defaults to the feed pk, else the source)
+            location: Human-readable location used for incidents
+            sampler: FrameSampler choosing the frames to analyze
+                (defaults to one frame every detection_interval seconds)
+            camera_feed_id: CameraFeed pk, linked to the incidents it reports
+
+        Returns:
+            False if that camera is already running
+        """
+        key = camera_key(camera_source, camera_feed_id)
+        if camera_id is None:
+            camera_id = camera_feed_id if camera_feed_id is not None else camera_source
+        with self._lock:
+            existing = self.cameras.get(key)
+            if existing is not None and existing.is_running:
+                print(f"Camera detection is already running for {camera_id}!")
+                return False
+
+            camera = CameraWorker(
+                camera_id=camera_id,
+                camera_source=camera_source,
+                detection_interval=detection_interval,
+                inference_pool=self.inference_pool,
+                location=location,
+                sampler=sampler,
+                camera_feed_id=camera_feed_id
+            )
+            self.cameras[key] = camera
+            camera.start()
+            return True
+
+    def stop_camera_detection(self, key=None):
+        """
+        Stop live camera detection
+
+        Args:
+            key: ``camera_key`` of the camera to stop; all cameras when None
+
+        Returns:
+            List of camera ids that were stopped
+        """
+        with self._lock:
+            if key is None:
+                cameras = list(self.cameras.values())
+                self.cameras.clear()
+            else:
+                camera = self.cameras.pop(key, None)
+                cameras = [camera] if camera else []
+
+        # Signal every capture thread first so shutdown runs in parallel
+        for camera in cameras:
+            camera._stop_event.set()
+        for camera in cameras:
+            camera.stop()
+        return [camera.camera_id for camera in cameras]
+
+    def get_camera_status(self, key=None):
+        """Get current camera detection status (one camera by ``camera_key``, or all of them)"""
+        if key is not None:
+            camera = self.cameras.get(key)
+            return camera.get_status() if camera else None
+
+        cameras = list(self.cameras.values())
+        gates = [camera.active_motion_gate for camera in cameras if camera.active_motion_gate]
+        gate_hits = sum(gate.hits for gate in gates)
+        gate_skips = sum(gate.skips for gate in gates)
+        gate_total = gate_hits + gate_skips
+        return {
+            'is_running': any(camera.is_running for camera in cameras),
+            'active_cameras': sum(1 for camera in cameras if camera.is_running),
+            'cameras': [camera.get_status() for camera in cameras],
+            'motion_gate': {
+                'hits': gate_hits,
+                'skips': gate_skips,
+                'hit_ratio': gate_hits / gate_total if gate_total else None,
+                'skip_ratio': gate_skips / gate_total if gate_total else None,
+            } if gates else None,
+            'inference': self._inference_pool.get_status() if self._inference_pool else None,
+            'persistence': get_incident_writer().get_stats(),
+            'snapshots': get_snapshot_writer().get_stats()
         }
 
 # Global instance
-camera_service = CameraDetectionService() 
\ No newline at end of file
+camera_service = CameraDetectionService()
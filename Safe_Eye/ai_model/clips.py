@@ -0,0 +1,194 @@
+import threading
+
+import numpy as np
+
+from .snapshots import encode_jpeg, resize_to_width
+
+
+class FrameRingBuffer:
+    """
+    Fixed-memory store of the most recent JPEG-encoded frames.
+
+    Frame bytes live in one preallocated ``max_bytes`` buffer, laid out
+    back to back and wrapping to the start when the end is reached; offsets,
+    sizes and timestamps live in preallocated arrays of ``max_frames``
+    slots. Appending evicts the oldest frames whose bytes (or slot) the new
+    frame needs, so nothing is allocated per frame and memory never grows.
+    """
+
+    def __init__(self, max_bytes, max_frames):
+        self.max_bytes = int(max_bytes)
+        self.max_frames = max(1, int(max_frames))
+        self._data = np.empty(self.max_bytes, dtype=np.uint8)
+        self._offsets = np.zeros(self.max_frames, dtype=np.int64)
+        self._sizes = np.zeros(self.max_frames, dtype=np.int64)
+        self._times = np.zeros(self.max_frames, dtype=np.float64)
+        self._lock = threading.Lock()
+        self._next_slot = 0
+        self._count = 0
+        self._write_pos = 0
+        self.frames_written = 0
+        self.frames_rejected = 0
+
+    def __len__(self):
+        return self._count
+
+    def _oldest_slot(self):
+        return (self._next_slot - self._count) % self.max_frames
+
+    def append(self, data, timestamp):
+        """
+        Store one encoded frame (bytes-like).
+
+        Returns:
+            False if the frame is larger than the whole buffer
+        """
+        data = np.frombuffer(data, dtype=np.uint8)
+        size = len(data)
+        if size > self.max_bytes:
+            self.frames_rejected += 1
+            return False
+
+        with self._lock:
+            pos = self._write_pos
+            wrapped = pos + size > self.max_bytes
+            if wrapped:
+                pos = 0
+            while self._count:
+                slot = self._oldest_slot()
+                offset = self._offsets[slot]
+                if not (self._count == self.max_frames
+                        # Frames in the unused tail are the oldest; drop them on wrap
+                        or (wrapped and offset >= self._write_pos)
+                        or (offset < pos + size and offset + self._sizes[slot] > pos)):
+                    break
+                self._count -= 1
+
+            slot = self._next_slot
+            self._data[pos:pos + size] = data
+            self._offsets[slot] = pos
+            self._sizes[slot] = size
+            self._times[slot] = timestamp
+            self._next_slot = (slot + 1) % self.max_frames
+            self._count += 1
+            self._write_pos = pos + size
+            self.frames_written += 1
+            return True
+
+    def frames_between(self, start, end):
+        """Copies of the stored frames with ``start <= timestamp <= end``, oldest first"""
+        with self._lock:
+            frames = []
+            for i in range(self._count):
+                slot = (self._oldest_slot() + i) % self.max_frames
+                timestamp = self._times[slot]
+                if start <= timestamp <= end:
+                    offset = self._offsets[slot]
+                    frames.append((float(timestamp), self._data[offset:offset + self._sizes[slot]].tobytes()))
+            return frames
+
+    def get_stats(self):
+        with self._lock:
+            used = int(self._sizes[[(self._oldest_slot() + i) % self.max_frames for i in range(self._count)]].sum())
+            oldest = float(self._times[self._oldest_slot()]) if self._count else None
+        return {
+            'frames': self._count,
+            'max_frames': self.max_frames,
+            'bytes_used': used,
+            'max_bytes': self.max_bytes,
+            'oldest_frame_at': oldest,
+            'frames_written': self.frames_written,
+            'frames_rejected': self.frames_rejected,
+        }
+
+
+class ClipRecorder:
+    """
+    Keeps the last ``buffer_seconds`` of a camera (sampled at ``fps``) in a
+    FrameRingBuffer and exports a clip around each incident event.
+
+    A clip spans ``pre_seconds`` before the event opened to ``post_seconds``
+    after it closed. It is exported once that much footage has been
+    recorded, or earlier if the event runs long enough that its first
+    frames would otherwise fall out of the buffer.
+    """
+
+    def __init__(self, fps=5.0, buffer_seconds=20.0, max_buffer_bytes=16 * 1024 * 1024, width=640, quality=70,
+                 pre_seconds=5.0, post_seconds=5.0, format='mp4'):
+        self.fps = float(fps)
+        self.buffer_seconds = float(buffer_seconds)
+        self.width = width
+        self.quality = quality
+        self.pre_seconds = float(pre_seconds)
+        self.post_seconds = float(post_seconds)
+        self.format = format
+        self.buffer = FrameRingBuffer(max_buffer_bytes, int(np.ceil(self.buffer_seconds * self.fps)) + 1)
+        self._frame_period = 1.0 / self.fps
+        self._next_frame_at = 0
+        self._lock = threading.Lock()
+        # event id -> {'start', 'end', 'on_ready'}
+        self._pending = {}
+
+    def wants_frame(self, now):
+        """True when a frame captured at ``now`` should go into the buffer"""
+        return now >= self._next_frame_at
+
+    def add_frame(self, frame, now):
+        """
+        Encode and buffer one frame.
+
+        Returns:
+            List of (on_ready, frames) for clips that are now complete
+        """
+        self._next_frame_at = max(self._next_frame_at + self._frame_period, now)
+        self.buffer.append(encode_jpeg(resize_to_width(frame, self.width), self.quality), now)
+        return self.poll(now)
+
+    def event_opened(self, event, on_ready):
+        """
+        Start a clip for ``event``; ``on_ready(frames)`` receives the clip's
+        (timestamp, jpeg bytes) list once it can be exported
+        """
+        with self._lock:
+            self._pending[event.id] = {
+                'start': event.start_time - self.pre_seconds,
+                'end': None,
+                'on_ready': on_ready,
+            }
+
+    def event_closed(self, event):
+        with self._lock:
+            clip = self._pending.get(event.id)
+            if clip:
+                clip['end'] = event.end_time + self.post_seconds
+
+    def poll(self, now, flush=False):
+        """Pop clips whose footage is complete (or about to leave the buffer)"""
+        ready = []
+        with self._lock:
+            for event_id, clip in list(self._pending.items()):
+                # Leave a frame of margin before the start falls out of the buffer
+                deadline = clip['start'] + self.buffer_seconds - self._frame_period
+                end = clip['end']
+                if flush or now >= deadline or (end is not None and now >= end):
+                    del self._pending[event_id]
+                    ready.append((clip['on_ready'], clip['start'], min(end or now, now)))
+        return [(on_ready, self.buffer.frames_between(start, end)) for on_ready, start, end in ready]
+
+    def get_stats(self):
+        stats = self.buffer.get_stats()
+        stats.update({'fps': self.fps, 'pending_clips': len(self._pending)})
+        return stats
+
+
+def build_clip_recorder(options):
+    """
+    Build a ClipRecorder from a settings-style dict, e.g. AI_CLIPS.
+
+    Returns:
+        None when clips are disabled (``options`` empty or ``enabled`` False)
+    """
+    if not options or not options.get('enabled', True):
+        return None
+    options = {key: value for key, value in options.items() if key != 'enabled' and value is not None}
+    return ClipRecorder(**options)
@@ -1,27 +1,56 @@
+import asyncio
 import json
 import cv2
 import numpy as np
 from channels.generic.websocket import AsyncWebsocketConsumer
-from .yolo_inference import YOLOInference
+from .batching import get_batcher, get_decode_executor
+from .protocol import BINARY_SUBPROTOCOL, decode_binary_frame, encode_detections, encode_class_table, frame_seq
+from .results import to_detections
+from .tracking import build_tracker
+from django.conf import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
-class DetectionConsumer(AsyncWebsocketConsumer):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.yolo_model = YOLOInference()
 
+def decode_frame(bytes_data):
+    """Decode a JPEG/PNG frame sent by the browser (runs on the decode pool)"""
+    nparr = np.frombuffer(bytes_data, np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+
+class DetectionConsumer(AsyncWebsocketConsumer):
     async def connect(self):
-        await self.accept()
+        # "Latest frame wins": at most one frame waits per socket, and a newer
+        # frame replaces it instead of queueing behind it
+        self.pending_frame = None
+        self.frame_ready = asyncio.Event()
+        self.dropped_frames = 0
+        self.frame_seq = 0
+
+        # Opt-in compact binary protocol (see protocol.py); JSON otherwise
+        self.binary = BINARY_SUBPROTOCOL in self.scope.get('subprotocols', [])
+        self.class_table_sent = False
+
+        # Per-socket tracker: stable track ids, and with detect_every > 1
+        # only every Nth frame goes through the model
+        self.tracker = build_tracker(getattr(settings, 'AI_TRACKER', None))
+
+        self.worker_task = asyncio.create_task(self._process_frames())
+
+        await self.accept(subprotocol=BINARY_SUBPROTOCOL if self.binary else None)
         logger.info("WebSocket connected")
         await self.send(text_data=json.dumps({
             'type': 'connection_established',
-            'message': 'WebSocket connected and YOLO model loaded'
+            'message': 'WebSocket connected',
+            'protocol': BINARY_SUBPROTOCOL if self.binary else 'json'
         }))
 
     async def disconnect(self, close_code):
         logger.info(f"WebSocket disconnected: {close_code}")
+        worker_task = getattr(self, 'worker_task', None)
+        if worker_task:
+            worker_task.cancel()
 
     async def receive(self, text_data=None, bytes_data=None):
         if text_data:
@@ -30,21 +59,68 @@ class DetectionConsumer(AsyncWebsocketConsumer):
             logger.info(f"Received text_data: {data}")
 
         elif bytes_data:
-            logger.info("Received frame from frontend")
+            logger.debug("Received frame from frontend")
+            if self.pending_frame is not None:
+                # Client is outpacing the model: drop the stale frame
+                self.dropped_frames += 1
+            self.pending_frame = bytes_data
+            self.frame_ready.set()
+
+    def _decode(self, bytes_data):
+        """Runs on the decode pool; returns (seq, frame)"""
+        if self.binary:
+            return decode_binary_frame(bytes_data)
+        self.frame_seq += 1
+        return self.frame_seq, decode_frame(bytes_data)
+
+    def _peek_seq(self, bytes_data):
+        if self.binary:
+            return frame_seq(bytes_data)
+        self.frame_seq += 1
+        return self.frame_seq
+
+    async def _process_frames(self):
+        """Per-socket worker: decode + infer the newest pending frame, off the event loop"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.frame_ready.wait()
+            self.frame_ready.clear()
+            bytes_data, self.pending_frame = self.pending_frame, None
+            if bytes_data is None:
+                continue
+
             try:
-                nparr = np.frombuffer(bytes_data, np.uint8)
-                frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                if frame is None:
-                    logger.error("Invalid frame received (decode failed)")
-                    return
-
-                detections = self.yolo_model.detect_accidents(frame)
-                
+                if self.tracker and not self.tracker.should_detect():
+                    # Propagate tracks instead of running the detector; only
+                    # the frame's sequence number is needed
+                    seq = self._peek_seq(bytes_data)
+                    arrays = self.tracker.predict()
+                else:
+                    seq, frame = await loop.run_in_executor(get_decode_executor(), self._decode, bytes_data)
+                    if frame is None:
+                        logger.error("Invalid frame received (decode failed)")
+                        continue
+
+                    # Batched with frames from every other connected socket
+                    arrays = await get_batcher().submit(frame)
+                    if self.tracker:
+                        arrays = self.tracker.update(arrays)
+
+                if self.binary:
+                    if not self.class_table_sent:
+                        await self.send(text_data=encode_class_table(arrays.names))
+                        self.class_table_sent = True
+                    await self.send(bytes_data=encode_detections(seq, arrays, self.dropped_frames))
+                    continue
+
                 # Send detections back to frontend
                 await self.send(text_data=json.dumps({
                     "type": "detections",
-                    "detections": detections
+                    "detections": to_detections(arrays, 'ws'),
+                    "dropped_frames": self.dropped_frames
                 }))
 
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logger.exception(f"Error processing frame: {e}")
@@ -0,0 +1,128 @@
+import uuid
+from collections import deque
+
+OPENED = 'opened'
+CLOSED = 'closed'
+
+
+class IncidentEvent:
+    """One continuous accident scene on one camera"""
+
+    def __init__(self, camera_id, start_time, detections):
+        self.id = uuid.uuid4().hex
+        self.camera_id = camera_id
+        self.start_time = start_time
+        self.end_time = None
+        self.last_positive_time = start_time
+        self.positive_frames = 0
+        self.peak_confidence = 0.0
+        self.peak_detections = []
+        self.track_ids = set()
+        self.add(detections, start_time)
+
+    @property
+    def is_open(self):
+        return self.end_time is None
+
+    def add(self, detections, now):
+        self.positive_frames += 1
+        self.last_positive_time = now
+        confidence = max(detection['confidence'] for detection in detections)
+        if confidence >= self.peak_confidence:
+            self.peak_confidence = confidence
+            self.peak_detections = detections
+        self.track_ids.update(
+            detection['track_id'] for detection in detections
+            if detection.get('track_id') is not None
+        )
+
+    def to_dict(self):
+        return {
+            'event_id': self.id,
+            'camera_id': self.camera_id,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'positive_frames': self.positive_frames,
+            'peak_confidence': self.peak_confidence,
+            'track_ids': sorted(self.track_ids),
+        }
+
+
+class IncidentEventTracker:
+    """
+    Per-camera state machine turning per-frame detections into incident events.
+
+    An event opens once ``min_positive_frames`` of the last ``window_frames``
+    analyzed frames had a detection at or above ``min_confidence``. While it
+    is open, further positive frames are merged into it (tracking its peak
+    confidence); it closes after ``close_after_seconds`` without a positive
+    frame, ending at the last positive one. No new event opens until
+    ``cooldown_seconds`` after a close.
+    """
+
+    def __init__(self, camera_id, min_positive_frames=3, window_frames=5, close_after_seconds=10.0,
+                 cooldown_seconds=30.0, min_confidence=0.0):
+        self.camera_id = camera_id
+        self.min_positive_frames = max(1, int(min_positive_frames))
+        self.window = deque(maxlen=max(self.min_positive_frames, int(window_frames)))
+        self.close_after_seconds = float(close_after_seconds)
+        self.cooldown_seconds = float(cooldown_seconds)
+        self.min_confidence = float(min_confidence)
+
+        self.current = None
+        self.cooldown_until = 0
+        self.events_opened = 0
+        self.events_closed = 0
+
+    def observe(self, detections, now):
+        """
+        Feed one analyzed frame's detections.
+
+        Returns:
+            List of (OPENED | CLOSED, IncidentEvent) transitions caused by
+            this frame (usually empty)
+        """
+        positives = [d for d in detections if d['confidence'] >= self.min_confidence]
+        transitions = []
+
+        if self.current is not None:
+            if positives:
+                self.current.add(positives, now)
+            elif now - self.current.last_positive_time >= self.close_after_seconds:
+                transitions.append((CLOSED, self._close(now)))
+            return transitions
+
+        if now < self.cooldown_until:
+            # Frames seen during the cooldown never count towards the next event
+            return transitions
+
+        self.window.append(bool(positives))
+        # Only a positive frame can open an event (it seeds the peak detections)
+        if positives and sum(self.window) >= self.min_positive_frames:
+            self.current = IncidentEvent(self.camera_id, now, positives)
+            self.events_opened += 1
+            self.window.clear()
+            transitions.append((OPENED, self.current))
+        return transitions
+
+    def _close(self, now):
+        event, self.current = self.current, None
+        event.end_time = event.last_positive_time
+        self.cooldown_until = now + self.cooldown_seconds
+        self.window.clear()
+        self.events_closed += 1
+        return event
+
+    def flush(self, now):
+        """Close the open event, if any (e.g. when the camera stops)"""
+        if self.current is None:
+            return []
+        return [(CLOSED, self._close(now))]
+
+    def get_stats(self):
+        return {
+            'events_opened': self.events_opened,
+            'events_closed': self.events_closed,
+            'current_event': self.current.to_dict() if self.current else None,
+            'cooldown_until': self.cooldown_until or None,
+        }
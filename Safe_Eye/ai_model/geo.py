@@ -0,0 +1,188 @@
+"""
+Geohash spatial index helpers (no PostGIS; works on any database).
+
+Rows store the geohash of their coordinates in an indexed column. A radius
+or bounding-box query is turned into a handful of geohash cells covering
+the area; each cell is a contiguous range of the index
+(``cell <= geohash < cell + '{'``), so candidates are fetched with a few
+index range scans and then filtered exactly in Python.
+"""
+import math
+
+from django.db.models import Case, ExpressionWrapper, F, FloatField, Q, When
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9  # ~5 m cells
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+# Upper bound on cells (index range scans) per query
+MAX_QUERY_CELLS = 16
+# Radius queries fetch this many candidates per requested row, nearest
+# first by a flat-earth approximation, before the exact haversine filter
+RADIUS_CANDIDATES_PER_ROW = 2
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Geohash of a point"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lon_range[0] = mid
+            else:
+                bits <<= 1
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(height, width) in degrees of a geohash cell"""
+    lon_bits = math.ceil(5 * precision / 2)
+    lat_bits = 5 * precision - lon_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def covering_cells(min_lat, min_lon, max_lat, max_lon, max_cells=MAX_QUERY_CELLS):
+    """
+    Geohash cells that together cover a bounding box, at the finest
+    precision needing no more than ``max_cells`` cells.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = math.floor(max_lat / height) - math.floor(min_lat / height) + 1
+        cols = math.floor(max_lon / width) - math.floor(min_lon / width) + 1
+        if rows * cols <= max_cells:
+            break
+
+    cells = set()
+    lat = min_lat
+    while True:
+        lon = min_lon
+        while True:
+            cells.add(encode(lat, lon, precision))
+            if lon >= max_lon:
+                break
+            lon = min(lon + width, max_lon)
+        if lat >= max_lat:
+            break
+        lat = min(lat + height, max_lat)
+    return sorted(cells)
+
+
+def cells_q(cells, field='geohash'):
+    """Q matching rows whose geohash falls in any of ``cells`` (index range scans)"""
+    query = Q()
+    for cell in cells:
+        # '{' sorts right after 'z', the last geohash character
+        query |= Q(**{f'{field}__gte': cell, f'{field}__lt': cell + '{'})
+    return query
+
+
+def radius_bboxes(latitude, longitude, radius_km):
+    """
+    Bounding boxes (min_lat, min_lon, max_lat, max_lon) enclosing a circle:
+    one, or two split at the antimeridian when the circle crosses it
+    """
+    lat_delta = radius_km / KM_PER_DEGREE_LAT
+    min_lat, max_lat = max(latitude - lat_delta, -90.0), min(latitude + lat_delta, 90.0)
+    lon_delta = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(latitude)), 1e-6))
+    if min_lat == -90.0 or max_lat == 90.0 or lon_delta >= 180.0:
+        # Around a pole every longitude is within reach
+        return [(min_lat, -180.0, max_lat, 180.0)]
+
+    min_lon, max_lon = longitude - lon_delta, longitude + lon_delta
+    if min_lon < -180.0:
+        return [(min_lat, min_lon + 360.0, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon)]
+    if max_lon > 180.0:
+        return [(min_lat, min_lon, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon - 360.0)]
+    return [(min_lat, min_lon, max_lat, max_lon)]
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def bbox_q(min_lat, min_lon, max_lat, max_lon, lat_field='latitude', lon_field='longitude'):
+    """Q for rows inside a bounding box: geohash cell ranges, then the exact bounds"""
+    return cells_q(covering_cells(min_lat, min_lon, max_lat, max_lon)) & Q(**{
+        f'{lat_field}__gte': min_lat, f'{lat_field}__lte': max_lat,
+        f'{lon_field}__gte': min_lon, f'{lon_field}__lte': max_lon,
+    })
+
+
+def filter_bbox(queryset, min_lat, min_lon, max_lat, max_lon, lat_field='latitude', lon_field='longitude'):
+    """Rows inside a bounding box"""
+    return queryset.filter(bbox_q(min_lat, min_lon, max_lat, max_lon, lat_field, lon_field))
+
+
+def approximate_distance(latitude, longitude, lat_field='latitude', lon_field='longitude'):
+    """
+    Squared flat-earth distance (in degrees of latitude) from a point, as
+    an SQL expression; orders nearby rows like haversine_km does, across
+    the antimeridian too
+    """
+    lon = F(lon_field)
+    dlon = Case(
+        When(**{f'{lon_field}__gt': longitude + 180.0}, then=lon - (longitude + 360.0)),
+        When(**{f'{lon_field}__lt': longitude - 180.0}, then=lon - (longitude - 360.0)),
+        default=lon - longitude,
+        output_field=FloatField(),
+    )
+    dlat = F(lat_field) - latitude
+    dx = dlon * math.cos(math.radians(latitude))
+    return ExpressionWrapper(dlat * dlat + dx * dx, output_field=FloatField())
+
+
+def within_radius(queryset, latitude, longitude, radius_km, limit=None, lat_field='latitude',
+                  lon_field='longitude'):
+    """
+    Up to ``limit`` rows within ``radius_km`` of a point, nearest first.
+
+    The database narrows the candidates to the enclosing bounding box(es),
+    orders them by approximate distance and returns at most
+    ``limit * RADIUS_CANDIDATES_PER_ROW``; only those are checked exactly,
+    so the cost is bounded by ``limit`` however many rows fall in the area.
+
+    Returns:
+        List of (distance_km, row)
+    """
+    area = Q()
+    for bbox in radius_bboxes(latitude, longitude, radius_km):
+        area |= bbox_q(*bbox, lat_field=lat_field, lon_field=lon_field)
+    candidates = queryset.filter(area).annotate(
+        approximate_distance=approximate_distance(latitude, longitude, lat_field, lon_field)
+    ).order_by('approximate_distance')
+    if limit is not None:
+        candidates = candidates[:limit * RADIUS_CANDIDATES_PER_ROW]
+
+    matches = []
+    for row in candidates:
+        distance = haversine_km(latitude, longitude, getattr(row, lat_field), getattr(row, lon_field))
+        if distance <= radius_km:
+            matches.append((distance, row))
+    matches.sort(key=lambda match: match[0])
+    return matches[:limit]
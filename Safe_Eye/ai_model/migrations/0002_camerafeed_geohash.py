@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-18 03:40
+
+from django.db import migrations, models
+
+from ai_model import geo
+
+
+def fill_geohash(apps, schema_editor):
+    CameraFeed = apps.get_model('ai_model', 'CameraFeed')
+    cameras = list(CameraFeed.objects.all())
+    for camera in cameras:
+        camera.geohash = geo.encode(camera.latitude, camera.longitude)
+    CameraFeed.objects.bulk_update(cameras, ['geohash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_model', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='camerafeed',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12),
+        ),
+        migrations.RunPython(fill_geohash, migrations.RunPython.noop),
+    ]
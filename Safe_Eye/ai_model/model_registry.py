@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODEL_PATH = os.path.join(BASE_DIR, 'best.pt')
+
+# Process-wide cache: one loaded model per weights file
+_models = {}
+_model_locks = {}
+_stats = {}
+_registry_lock = threading.Lock()
+
+
+def get_model_path(model_path=None):
+    """Resolve the weights file to load (explicit path > settings > bundled best.pt)"""
+    path = model_path or getattr(settings, 'AI_MODEL_PATH', None) or DEFAULT_MODEL_PATH
+    return os.path.abspath(str(path))
+
+
+def _get_rss_bytes():
+    """Current resident set size of this process, in bytes (None if unknown)"""
+    try:
+        with open('/proc/self/status') as status_file:
+            for line in status_file:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        # ru_maxrss is the peak, in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+    except (ImportError, AttributeError):
+        return None
+
+
+def _load_yolo(model_path):
+    """
+    Import ultralytics/torch and load the weights file.
+
+    The heavy imports live here so that importing the ai_model app (and
+    therefore running manage.py migrate / admin commands) never pulls in torch.
+    """
+    from ultralytics import YOLO
+
+    try:
+        return YOLO(model_path)
+    except Exception as e:
+        logger.warning(f"Error loading YOLO model {model_path}: {e}")
+        # Fallback: try loading with weights_only=False
+        import torch.serialization
+        original_weights_only = torch.serialization._weights_only
+        torch.serialization._weights_only = False
+        try:
+            return YOLO(model_path)
+        finally:
+            torch.serialization._weights_only = original_weights_only
+
+
+def get_model(model_path=None):
+    """
+    Return the shared YOLO model for ``model_path``, loading it on first use.
+
+    Every caller in the process (REST views, WebSocket consumers, camera
+    service, MJPEG stream) receives the same instance.
+
+    Raises:
+        RuntimeError: if the model cannot be loaded
+    """
+    path = get_model_path(model_path)
+    model = _models.get(path)
+    if model is not None:
+        return model
+
+    with _registry_lock:
+        model = _models.get(path)
+        if model is not None:
+            return model
+
+        rss_before = _get_rss_bytes()
+        started = time.perf_counter()
+        try:
+            model = _load_yolo(path)
+        except Exception as e:
+            logger.error(f"Failed to load YOLO model {path}: {e}")
+            raise RuntimeError("YOLO model not loaded.") from e
+        load_seconds = time.perf_counter() - started
+        rss_after = _get_rss_bytes()
+
+        _models[path] = model
+        _model_locks.setdefault(path, threading.Lock())
+        _stats[path] = {
+            'model_path': path,
+            'load_seconds': round(load_seconds, 3),
+            'rss_before_bytes': rss_before,
+            'rss_after_bytes': rss_after,
+            'rss_delta_bytes': (rss_after - rss_before) if rss_before and rss_after else None,
+            'loaded_at': time.time(),
+        }
+        logger.info(f"YOLO model loaded from {path} in {load_seconds:.2f}s")
+        return model
+
+
+def get_model_lock(model_path=None):
+    """
+    Lock serializing forward passes on the shared model.
+
+    Ultralytics predictors keep per-call state on the model object, so
+    concurrent threads must not run inference on the same instance at once.
+    """
+    path = get_model_path(model_path)
+    with _registry_lock:
+        return _model_locks.setdefault(path, threading.Lock())
+
+
+def get_model_stats():
+    """Load time and memory figures for every model loaded in this process"""
+    return {
+        'models': list(_stats.values()),
+        'rss_bytes': _get_rss_bytes(),
+        'pid': os.getpid(),
+    }
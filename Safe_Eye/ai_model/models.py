@@ -1,5 +1,6 @@
 from django.db import models
 from django.http import JsonResponse
+from . import geo
 
 class CameraFeed(models.Model):
     location = models.CharField(max_length=255)
@@ -7,6 +8,14 @@ class CameraFeed(models.Model):
     longitude = models.FloatField()
     stream_url = models.URLField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # Spatial index key, kept in sync with latitude/longitude (see geo.py)
+    geohash = models.CharField(max_length=12, db_index=True, blank=True, editable=False)
+
+    def save(self, *args, **kwargs):
+        self.geohash = geo.encode(self.latitude, self.longitude)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'geohash'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.location
@@ -0,0 +1,90 @@
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Cheap pre-filter deciding whether a frame is worth running YOLO on.
+
+    Frames are downscaled to ``size`` and compared in grayscale, either
+    against the previous checked frame ('diff') or against a MOG2
+    background model ('mog2'). A frame passes when the fraction of changed
+    pixels reaches ``min_changed_ratio``; otherwise the caller should reuse
+    its last detections. ``max_skip_seconds`` forces a pass every so often
+    so stale detections can't live forever.
+    """
+
+    def __init__(self, method='diff', size=(160, 90), pixel_threshold=25, min_changed_ratio=0.01,
+                 max_skip_seconds=5.0):
+        if method not in ('diff', 'mog2'):
+            raise ValueError(f"Unknown motion gate method '{method}' (expected 'diff' or 'mog2')")
+        self.method = method
+        self.size = tuple(size)
+        self.pixel_threshold = int(pixel_threshold)
+        self.min_changed_ratio = float(min_changed_ratio)
+        self.max_skip_seconds = float(max_skip_seconds)
+
+        self._previous = None
+        self._background = None
+        if method == 'mog2':
+            self._background = cv2.createBackgroundSubtractorMOG2(history=200, detectShadows=False)
+        self._last_pass_time = None
+
+        self.hits = 0
+        self.skips = 0
+        self.last_changed_ratio = 0.0
+
+    def _changed_ratio(self, frame):
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        if self._background is not None:
+            mask = self._background.apply(small)
+            return float(np.count_nonzero(mask)) / mask.size
+
+        small = cv2.GaussianBlur(small, (5, 5), 0)
+        previous, self._previous = self._previous, small
+        if previous is None:
+            return 1.0
+        diff = cv2.absdiff(small, previous)
+        return float(np.count_nonzero(diff >= self.pixel_threshold)) / diff.size
+
+    def should_infer(self, frame, now):
+        """
+        Returns:
+            True if the frame changed enough (or the gate has skipped for too
+            long) and should go through the detector
+        """
+        self.last_changed_ratio = self._changed_ratio(frame)
+        forced = self._last_pass_time is None or now - self._last_pass_time >= self.max_skip_seconds
+        if forced or self.last_changed_ratio >= self.min_changed_ratio:
+            self.hits += 1
+            self._last_pass_time = now
+            return True
+        self.skips += 1
+        return False
+
+    def get_stats(self):
+        total = self.hits + self.skips
+        return {
+            'method': self.method,
+            'hits': self.hits,
+            'skips': self.skips,
+            'hit_ratio': self.hits / total if total else None,
+            'skip_ratio': self.skips / total if total else None,
+            'last_changed_ratio': self.last_changed_ratio,
+        }
+
+
+def build_motion_gate(options):
+    """
+    Build a MotionGate from a settings-style dict, e.g. AI_MOTION_GATE.
+
+    Returns:
+        None when gating is disabled (``options`` empty or ``enabled`` False)
+    """
+    if not options or not options.get('enabled', True):
+        return None
+    options = {key: value for key, value in options.items() if key != 'enabled' and value is not None}
+    return MotionGate(**options)
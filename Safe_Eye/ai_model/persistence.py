@@ -0,0 +1,240 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+
+from notifications.broadcast import broadcast_incidents
+from notifications.services import notify_incidents
+
+logger = logging.getLogger(__name__)
+
+_FLUSH = object()
+
+# Fields a queued update may set on an existing incident
+UPDATE_FIELDS = ('confidence', 'description', 'clip')
+
+
+class IncidentWriter:
+    """
+    In-process persistence queue for AI-detected incidents.
+
+    Detection threads call ``submit_opened`` / ``submit_update`` which never
+    block (a full queue drops the item and counts it). A single writer
+    thread drains the queue, bulk-creates ``incidents.Incident`` rows in
+    batches of up to ``batch_size`` and applies later updates (final peak
+    confidence and duration when the event closes, its clip once exported)
+    to the row created for the same event. Failed batches are retried with
+    backoff; pending items are flushed at interpreter exit.
+    """
+
+    def __init__(self, max_queue_size=1000, batch_size=50, flush_interval=1.0, max_retries=3, retry_backoff=0.5):
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+        self.max_retries = int(max_retries)
+        self.retry_backoff = float(retry_backoff)
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+        # event id -> Incident pk of the most recent events, so updates
+        # can find their row
+        self._incident_ids = OrderedDict()
+        self.max_tracked_events = 1000
+
+        self.created = 0
+        self.updated = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='incident-writer', daemon=True)
+                self._thread.start()
+
+    def _put(self, item):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Incident queue full, dropping %s for event %s", item[0], item[1].get('event_id'))
+            return False
+
+    def submit_opened(self, incident_data):
+        """
+        Queue a new incident.
+
+        Args:
+            incident_data: dict with 'event_id' and optional 'incident_type',
+                'description', 'location', 'camera_feed_id', 'confidence',
+                'image' (storage name)
+        """
+        return self._put(('opened', incident_data))
+
+    def submit_update(self, incident_data):
+        """
+        Queue changes to an already submitted incident.
+
+        Args:
+            incident_data: dict with 'event_id' and any of UPDATE_FIELDS
+        """
+        return self._put(('update', incident_data))
+
+    def flush(self, timeout=10.0):
+        """Block until everything queued so far has been written (or timeout)"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        done = threading.Event()
+        try:
+            self._queue.put((_FLUSH, done), timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def _run(self):
+        while True:
+            batch = []
+            flushes = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()) if batch else None)
+                except queue.Empty:
+                    break
+                if item[0] is _FLUSH:
+                    flushes.append(item[1])
+                    break
+                batch.append(item)
+
+            if batch:
+                self._write_with_retry(batch)
+            for done in flushes:
+                done.set()
+
+    def _write_with_retry(self, batch):
+        for attempt in range(self.max_retries + 1):
+            close_old_connections()
+            try:
+                written = self._write(batch)
+            except DatabaseError as e:
+                if attempt == self.max_retries:
+                    self.failed += len(batch)
+                    logger.error("Giving up on %d incident writes: %s", len(batch), e)
+                    return
+                logger.warning("Incident write failed (attempt %d): %s", attempt + 1, e)
+                time.sleep(self.retry_backoff * (2 ** attempt))
+            except Exception:
+                self.failed += len(batch)
+                logger.exception("Unexpected error writing incidents")
+                return
+            else:
+                self._broadcast(*written)
+                return
+
+    def _write(self, batch):
+        from incidents.models import Incident
+        from incidents.rollups import record_confidence_change, record_incidents
+        from .models import CameraFeed
+
+        opened = [data for kind, data in batch if kind == 'opened']
+        updates = [data for kind, data in batch if kind == 'update']
+
+        created_ids = {}
+        incidents = []
+        updated_ids = []
+        with transaction.atomic():
+            if opened:
+                # bulk_create skips save(), so position the rows here, with
+                # one query for all the batch's cameras
+                camera_ids = {data['camera_feed_id'] for data in opened if data.get('camera_feed_id') is not None}
+                cameras = CameraFeed.objects.in_bulk(camera_ids) if camera_ids else {}
+                incidents = [
+                    Incident(
+                        incident_type=data.get('incident_type', 'Accident'),
+                        description=data.get('description'),
+                        location=data.get('location'),
+                        camera_id=data.get('camera_feed_id'),
+                        confidence=data.get('confidence'),
+                        image=data.get('image'),
+                    )
+                    for data in opened
+                ]
+                for incident in incidents:
+                    incident.set_position(cameras.get(incident.camera_id))
+                incidents = Incident.objects.bulk_create(incidents)
+                record_incidents(incidents)
+                created_ids = {
+                    data['event_id']: incident.pk
+                    for data, incident in zip(opened, incidents) if incident.pk is not None
+                }
+
+            for data in updates:
+                incident_id = created_ids.get(data['event_id'], self._incident_ids.get(data['event_id']))
+                if incident_id is None:
+                    continue
+                fields = {key: data[key] for key in UPDATE_FIELDS if data.get(key) is not None}
+                if not fields:
+                    continue
+                previous = None
+                if 'confidence' in fields:
+                    previous = Incident.objects.filter(pk=incident_id).only(
+                        'timestamp', 'camera', 'incident_type', 'confidence').first()
+                if Incident.objects.filter(pk=incident_id).update(**fields):
+                    updated_ids.append(incident_id)
+                    if previous is not None:
+                        old_confidence, previous.confidence = previous.confidence, fields['confidence']
+                        record_confidence_change(previous, old_confidence)
+
+        # Only remember ids (and count) once the transaction has committed
+        self._incident_ids.update(created_ids)
+        while len(self._incident_ids) > self.max_tracked_events:
+            self._incident_ids.popitem(last=False)
+        self.created += len(opened)
+        self.updated += len(updated_ids)
+        return incidents, updated_ids
+
+    def _broadcast(self, incidents, updated_ids):
+        """Push written incidents to connected alert sockets and notify subscribers"""
+        from incidents.models import Incident
+
+        try:
+            broadcast_incidents(incidents)
+            if updated_ids:
+                broadcast_incidents(Incident.objects.filter(pk__in=set(updated_ids)), created=False)
+        except Exception:
+            logger.exception("Error pushing incidents to alert sockets")
+        try:
+            # One bulk insert for every new incident x subscribed user
+            notify_incidents(incidents)
+        except Exception:
+            logger.exception("Error creating incident notifications")
+
+    def get_stats(self):
+        return {
+            'queued': self._queue.qsize(),
+            'created': self.created,
+            'updated': self.updated,
+            'dropped': self.dropped,
+            'failed': self.failed,
+        }
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_incident_writer():
+    """Process-wide IncidentWriter, configured from AI_INCIDENT_WRITER"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = IncidentWriter(**getattr(settings, 'AI_INCIDENT_WRITER', {}))
+            atexit.register(_writer.flush)
+        return _writer
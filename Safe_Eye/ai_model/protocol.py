@@ -0,0 +1,120 @@
+"""
+Compact binary protocol for the ws/detect/ WebSocket.
+
+Clients opt in by requesting the ``safeeye.detect.v1`` subprotocol when
+connecting; without it the socket keeps speaking JSON. All integers and
+floats are little-endian.
+
+Client -> server (binary messages), one frame each:
+
+    JPEG frame:  <B kind=0> <I seq> <JPEG/PNG bytes>
+    Raw frame:   <B kind=1> <I seq> <H width> <H height> <width*height*3 BGR bytes>
+
+Clients may downscale frames before sending; boxes come back in the
+coordinates of the frame that was sent.
+
+Server -> client:
+
+    Class table (text, once, before the first detections):
+        {"type": "class_table", "classes": {"0": "accident", ...}}
+
+    Detections (binary):
+        header   <B type=1> <I seq> <I dropped_frames> <H count>
+        records  count x <H class_id> <f confidence> <f x1> <f y1> <f x2> <f y2> <i track_id>
+
+``track_id`` is -1 when tracking is disabled.
+
+The frame sequence number is carried once in the header, since every
+record of a message belongs to the same frame.
+"""
+import json
+import struct
+
+import cv2
+import numpy as np
+
+BINARY_SUBPROTOCOL = 'safeeye.detect.v1'
+
+FRAME_JPEG = 0
+FRAME_RAW = 1
+MSG_DETECTIONS = 1
+
+_FRAME_HEADER = struct.Struct('<BI')
+_RAW_SIZE = struct.Struct('<HH')
+_DETECTIONS_HEADER = struct.Struct('<BIIH')
+
+# One packed detection record, as a numpy dtype so a whole frame's boxes
+# are packed in one vectorized copy
+RECORD_DTYPE = np.dtype([
+    ('class_id', '<u2'),
+    ('confidence', '<f4'),
+    ('x1', '<f4'),
+    ('y1', '<f4'),
+    ('x2', '<f4'),
+    ('y2', '<f4'),
+    ('track_id', '<i4'),
+])
+
+
+def frame_seq(data):
+    """Sequence number of a client frame message, without decoding the image"""
+    if len(data) < _FRAME_HEADER.size:
+        raise ValueError("Frame message too short")
+    return _FRAME_HEADER.unpack_from(data)[1]
+
+
+def decode_binary_frame(data):
+    """
+    Parse a client frame message.
+
+    Returns:
+        (seq, frame) where frame is a BGR numpy array, or None if it
+        couldn't be decoded
+
+    Raises:
+        ValueError: for a malformed message
+    """
+    if len(data) < _FRAME_HEADER.size:
+        raise ValueError("Frame message too short")
+    kind, seq = _FRAME_HEADER.unpack_from(data)
+    payload = memoryview(data)[_FRAME_HEADER.size:]
+
+    if kind == FRAME_JPEG:
+        return seq, cv2.imdecode(np.frombuffer(payload, np.uint8), cv2.IMREAD_COLOR)
+
+    if kind == FRAME_RAW:
+        if len(payload) < _RAW_SIZE.size:
+            raise ValueError("Raw frame message too short")
+        width, height = _RAW_SIZE.unpack_from(payload)
+        pixels = payload[_RAW_SIZE.size:]
+        if len(pixels) != width * height * 3:
+            raise ValueError(f"Raw frame is {len(pixels)} bytes, expected {width}x{height}x3")
+        return seq, np.frombuffer(pixels, np.uint8).reshape(height, width, 3)
+
+    raise ValueError(f"Unknown frame kind {kind}")
+
+
+def encode_detections(seq, arrays, dropped_frames=0):
+    """Pack one frame's DetectionArrays into a binary detections message"""
+    count = int(arrays.cls.size)
+    records = np.empty(count, dtype=RECORD_DTYPE)
+    if count:
+        records['class_id'] = arrays.cls
+        records['confidence'] = arrays.conf
+        records['x1'] = arrays.xyxy[:, 0]
+        records['y1'] = arrays.xyxy[:, 1]
+        records['x2'] = arrays.xyxy[:, 2]
+        records['y2'] = arrays.xyxy[:, 3]
+        records['track_id'] = arrays.track_ids if arrays.track_ids is not None else -1
+    header = _DETECTIONS_HEADER.pack(MSG_DETECTIONS, seq & 0xFFFFFFFF, min(dropped_frames, 0xFFFFFFFF), count)
+    return header + records.tobytes()
+
+
+def encode_class_table(names):
+    """JSON class-name table sent once per binary connection"""
+    if not isinstance(names, dict):
+        names = dict(enumerate(names))
+    return json.dumps({
+        'type': 'class_table',
+        'classes': {str(class_id): str(name) for class_id, name in names.items()}
+    })
@@ -0,0 +1,110 @@
+import time
+from collections import namedtuple
+
+import numpy as np
+
+# Boxes of one image as whole arrays: xyxy (N, 4) float32, conf (N,)
+# float32, cls (N,) int64, the model's class-name mapping and, once a
+# tracker has seen them, track_ids (N,) int64
+DetectionArrays = namedtuple('DetectionArrays', ['xyxy', 'conf', 'cls', 'names', 'track_ids'], defaults=(None,))
+
+# names object -> numpy array of labels indexed by class id
+_label_lookups = {}
+
+
+def _label_lookup(names):
+    """Precomputed class id -> label array for a model's ``names`` mapping"""
+    cached = _label_lookups.get(id(names))
+    if cached is not None and cached[0] is names:
+        return cached[1]
+    if isinstance(names, dict):
+        size = max(names) + 1 if names else 0
+        labels = np.array([str(names.get(i, i)) for i in range(size)], dtype=object)
+    else:
+        labels = np.array([str(name) for name in names], dtype=object)
+    _label_lookups[id(names)] = (names, labels)
+    return labels
+
+
+def empty_arrays(names=None):
+    return DetectionArrays(
+        np.zeros((0, 4), dtype=np.float32),
+        np.zeros((0,), dtype=np.float32),
+        np.zeros((0,), dtype=np.int64),
+        names or {},
+    )
+
+
+def result_to_arrays(result):
+    """
+    Pull every box of an ultralytics result off the device in one transfer.
+
+    ``boxes.data`` is (N, 6) ``[x1, y1, x2, y2, conf, cls]`` (or (N, 7) with a
+    track id before conf), so one ``.cpu().numpy()`` replaces the per-box,
+    per-attribute conversions.
+    """
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return empty_arrays(result.names)
+    data = boxes.data
+    if hasattr(data, 'cpu'):
+        data = data.cpu().numpy()
+    data = np.asarray(data, dtype=np.float32)
+    return DetectionArrays(data[:, :4], data[:, -2], data[:, -1].astype(np.int64), result.names)
+
+
+def _labels(arrays):
+    lookup = _label_lookup(arrays.names)
+    cls = arrays.cls
+    if len(lookup) and cls.size and cls.max() < len(lookup) and cls.min() >= 0:
+        return lookup[cls].tolist()
+    return [str(arrays.names.get(c, c)) if isinstance(arrays.names, dict) else str(c) for c in cls.tolist()]
+
+
+def to_detections(arrays, schema='api', timestamp=None):
+    """
+    Build the response payload for one image in a single vectorized pass.
+
+    Args:
+        arrays: DetectionArrays for the image
+        schema: 'api' (REST: label/confidence/box), 'ws' (WebSocket:
+            bbox/confidence/class_id/class_name) or 'camera' (camera service:
+            class/label/confidence/box/timestamp); each dict also gets a
+            'track_id' when the arrays carry track ids
+        timestamp: Timestamp for the 'camera' schema (defaults to now)
+    """
+    if arrays.cls.size == 0:
+        return []
+    if arrays.track_ids is not None:
+        payload = to_detections(arrays._replace(track_ids=None), schema, timestamp)
+        for detection, track_id in zip(payload, arrays.track_ids.tolist()):
+            detection['track_id'] = track_id
+        return payload
+
+    boxes = arrays.xyxy.tolist()
+    confidences = arrays.conf.tolist()
+    class_ids = arrays.cls.tolist()
+    labels = _labels(arrays)
+
+    if schema == 'api':
+        return [
+            {'label': label, 'confidence': conf, 'box': box}
+            for label, conf, box in zip(labels, confidences, boxes)
+        ]
+    if schema == 'ws':
+        return [
+            {'bbox': box, 'confidence': conf, 'class_id': class_id, 'class_name': label}
+            for box, conf, class_id, label in zip(boxes, confidences, class_ids, labels)
+        ]
+    if schema == 'camera':
+        timestamp = time.time() if timestamp is None else timestamp
+        return [
+            {'class': class_id, 'label': label, 'confidence': conf, 'box': box, 'timestamp': timestamp}
+            for class_id, label, conf, box in zip(class_ids, labels, confidences, boxes)
+        ]
+    raise ValueError(f"Unknown detection schema '{schema}'")
+
+
+def result_to_detections(result, schema='api', timestamp=None):
+    """Shortcut: ultralytics result -> payload dicts (see ``to_detections``)"""
+    return to_detections(result_to_arrays(result), schema, timestamp)
@@ -0,0 +1,135 @@
+from django.conf import settings
+
+from .motion import MotionGate
+
+
+class FrameSampler:
+    """
+    Decides which captured frames are worth analyzing.
+
+    The capture loop calls ``should_decode`` for every grabbed frame; only
+    when it returns True is the frame actually decoded (``retrieve``), and
+    ``accept`` then gets the final say on the decoded frame before it is
+    sent for inference.
+    """
+
+    mode = None
+    # True when accept() already filters out static frames, so the camera
+    # needs no motion gate of its own
+    gates_motion = False
+
+    def __init__(self):
+        self.last_sample_time = 0
+
+    def should_decode(self, frame_index, now):
+        raise NotImplementedError
+
+    def accept(self, frame, now):
+        self.last_sample_time = now
+        return True
+
+    def describe(self):
+        return {'mode': self.mode}
+
+
+class IntervalSampler(FrameSampler):
+    """Analyze at most one frame every ``detection_interval`` seconds"""
+
+    mode = 'interval'
+
+    def __init__(self, detection_interval=1.0):
+        super().__init__()
+        self.detection_interval = float(detection_interval)
+
+    def should_decode(self, frame_index, now):
+        return now - self.last_sample_time >= self.detection_interval
+
+    def describe(self):
+        return {'mode': self.mode, 'detection_interval': self.detection_interval}
+
+
+class EveryNthSampler(FrameSampler):
+    """Analyze every ``n``-th frame of the source"""
+
+    mode = 'every_n'
+
+    def __init__(self, n=30):
+        super().__init__()
+        self.n = max(1, int(n))
+
+    def should_decode(self, frame_index, now):
+        return frame_index % self.n == 0
+
+    def describe(self):
+        return {'mode': self.mode, 'n': self.n}
+
+
+class MotionSampler(FrameSampler):
+    """
+    Analyze frames only when the scene changes.
+
+    Every ``check_every`` frames is decoded and put through a MotionGate
+    configured like the camera service's (AI_MOTION_GATE), so motion is
+    detected and tuned in one place. ``threshold`` (fraction of changed
+    pixels, 0-1) overrides the gate's ``min_changed_ratio``. Frames are
+    analyzed no more often than ``min_interval`` seconds, and at least every
+    ``max_interval`` seconds regardless of motion.
+    """
+
+    mode = 'motion'
+    gates_motion = True
+
+    def __init__(self, check_every=5, threshold=None, min_interval=0.2, max_interval=10.0):
+        super().__init__()
+        self.check_every = max(1, int(check_every))
+        self.min_interval = float(min_interval)
+        options = {key: value for key, value in (getattr(settings, 'AI_MOTION_GATE', None) or {}).items()
+                   if key != 'enabled' and value is not None}
+        options['max_skip_seconds'] = float(max_interval)
+        if threshold is not None:
+            threshold = float(threshold)
+            if not 0 <= threshold <= 1:
+                raise ValueError(f"Motion threshold {threshold} is not a fraction of changed pixels (0-1)")
+            options['min_changed_ratio'] = threshold
+        self.motion_gate = MotionGate(**options)
+
+    def should_decode(self, frame_index, now):
+        if now - self.last_sample_time < self.min_interval:
+            return False
+        return frame_index % self.check_every == 0
+
+    def accept(self, frame, now):
+        if self.motion_gate.should_infer(frame, now):
+            self.last_sample_time = now
+            return True
+        return False
+
+    def describe(self):
+        return {
+            'mode': self.mode,
+            'check_every': self.check_every,
+            'threshold': self.motion_gate.min_changed_ratio,
+            'min_interval': self.min_interval,
+            'max_interval': self.motion_gate.max_skip_seconds,
+        }
+
+
+SAMPLERS = {
+    IntervalSampler.mode: IntervalSampler,
+    EveryNthSampler.mode: EveryNthSampler,
+    MotionSampler.mode: MotionSampler,
+}
+
+
+def build_sampler(mode='interval', **options):
+    """
+    Create a sampler by name ('interval', 'every_n' or 'motion').
+
+    Raises:
+        ValueError: for an unknown mode
+    """
+    try:
+        sampler_class = SAMPLERS[mode]
+    except KeyError:
+        raise ValueError(f"Unknown sampling mode '{mode}' (expected one of {', '.join(SAMPLERS)})")
+    return sampler_class(**{key: value for key, value in options.items() if value is not None})
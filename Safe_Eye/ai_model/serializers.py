@@ -0,0 +1,16 @@
+from rest_framework import serializers
+from incidents.models import Incident
+from .models import CameraFeed
+
+
+class CameraFeedSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CameraFeed
+        fields = ('id', 'location', 'latitude', 'longitude', 'stream_url', 'geohash')
+
+
+class IncidentMapSerializer(serializers.ModelSerializer):
+    """The incident fields a map marker needs"""
+    class Meta:
+        model = Incident
+        fields = ('id', 'incident_type', 'location', 'latitude', 'longitude', 'timestamp', 'confidence', 'camera')
@@ -0,0 +1,209 @@
+import logging
+import os
+import queue
+import tempfile
+import threading
+
+import cv2
+import numpy as np
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+# Same locations as Incident.image / Incident.clip
+SNAPSHOT_DIR = 'incidents'
+CLIP_DIR = 'incidents/clips'
+
+# Clip file extension -> VideoWriter codec
+CLIP_CODECS = {
+    'mp4': 'mp4v',
+    'avi': 'MJPG',
+}
+
+
+def annotate_frame(frame, detections):
+    """Copy of ``frame`` with each 'camera' schema detection boxed and labelled"""
+    annotated = frame.copy()
+    for detection in detections:
+        x1, y1, x2, y2 = (int(v) for v in detection['box'])
+        label = f"{detection['label']} {detection['confidence']:.2f}"
+        if detection.get('track_id') is not None:
+            label = f"#{detection['track_id']} {label}"
+        cv2.rectangle(annotated, (x1, y1), (x2, y2), (0, 0, 255), 2)
+        cv2.putText(annotated, label, (x1, max(y1 - 6, 12)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
+    return annotated
+
+
+def resize_to_width(frame, width):
+    height, frame_width = frame.shape[:2]
+    if not width or frame_width <= width:
+        return frame
+    return cv2.resize(frame, (int(width), max(1, round(height * width / frame_width))), interpolation=cv2.INTER_AREA)
+
+
+def encode_jpeg(frame, quality):
+    ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    if not ret:
+        raise ValueError("Could not encode frame as JPEG")
+    return buffer.tobytes()
+
+
+class SnapshotWriter:
+    """
+    Encodes and stores accident snapshots off the capture threads.
+
+    ``submit_snapshot`` / ``submit_clip`` only queue the frames; worker
+    threads draw the detection overlay, JPEG-encode the full frame (and a
+    thumbnail), write clips with ``cv2.VideoWriter`` and save everything
+    through Django's default storage under ``incidents/``. When the queue
+    is full the job is dropped and counted.
+    """
+
+    def __init__(self, num_workers=2, max_queue_size=32, quality=90, annotate=True, thumbnail_width=320):
+        self.num_workers = max(1, int(num_workers))
+        self.quality = quality
+        self.annotate = annotate
+        self.thumbnail_width = thumbnail_width
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._threads = []
+        self._lock = threading.Lock()
+
+        self.saved = 0
+        self.clips_saved = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def _ensure_started(self):
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.num_workers:
+                thread = threading.Thread(
+                    target=self._worker_loop,
+                    name=f'snapshot-writer-{len(self._threads)}',
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _put(self, job):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(job)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def submit_snapshot(self, name, frame, detections=None, on_saved=None):
+        """
+        Queue one accident frame.
+
+        Args:
+            name: File name (no directory), e.g. 'accident_cam1_<event>.jpg'
+            frame: BGR frame; must not be modified by the caller afterwards
+            detections: 'camera' schema detections to draw on the snapshot
+            on_saved: Called from the writer thread with the stored name
+                (None if saving failed)
+
+        Returns:
+            False if the queue is full and the snapshot was dropped
+        """
+        return self._put((self._write_snapshot, (name, frame, detections or []), on_saved))
+
+    def submit_clip(self, name, frames, fps, on_saved=None):
+        """
+        Queue a clip for export.
+
+        Args:
+            name: File name; its extension ('mp4' or 'avi') picks the codec
+            frames: (timestamp, jpeg bytes) list, e.g. from a FrameRingBuffer
+            fps: Playback frame rate
+        """
+        return self._put((self._write_clip, (name, frames, fps), on_saved))
+
+    def _worker_loop(self):
+        while True:
+            write, args, on_saved = self._queue.get()
+            try:
+                stored_name = write(*args)
+            except Exception:
+                self.failed += 1
+                logger.exception("Error writing snapshot %s", args[0])
+                stored_name = None
+            if on_saved:
+                try:
+                    on_saved(stored_name)
+                except Exception:
+                    logger.exception("Snapshot callback failed for %s", args[0])
+
+    def _write_snapshot(self, name, frame, detections):
+        if self.annotate and detections:
+            frame = annotate_frame(frame, detections)
+        stored_name = default_storage.save(f'{SNAPSHOT_DIR}/{name}', ContentFile(encode_jpeg(frame, self.quality)))
+        if self.thumbnail_width:
+            thumbnail = resize_to_width(frame, self.thumbnail_width)
+            default_storage.save(f'{SNAPSHOT_DIR}/thumbnails/{name}', ContentFile(encode_jpeg(thumbnail, self.quality)))
+        self.saved += 1
+        return stored_name
+
+    def _write_clip(self, name, frames, fps):
+        if not frames:
+            return None
+        extension = name.rsplit('.', 1)[-1].lower()
+        if extension not in CLIP_CODECS:
+            raise ValueError(f"Unsupported clip format '{extension}'")
+
+        # VideoWriter only writes to a path, so encode into a temp file
+        # and hand that to the storage backend
+        fd, path = tempfile.mkstemp(suffix=f'.{extension}')
+        os.close(fd)
+        try:
+            writer = None
+            for _, data in frames:
+                frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+                if frame is None:
+                    continue
+                if writer is None:
+                    size = (frame.shape[1], frame.shape[0])
+                    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*CLIP_CODECS[extension]), fps, size)
+                    if not writer.isOpened():
+                        raise ValueError(f"Could not open a VideoWriter for '{extension}'")
+                elif (frame.shape[1], frame.shape[0]) != size:
+                    frame = cv2.resize(frame, size)
+                writer.write(frame)
+            if writer is None:
+                return None
+            writer.release()
+            with open(path, 'rb') as clip_file:
+                stored_name = default_storage.save(f'{CLIP_DIR}/{name}', File(clip_file))
+        finally:
+            os.remove(path)
+        self.clips_saved += 1
+        return stored_name
+
+    def get_stats(self):
+        return {
+            'workers': self.num_workers,
+            'queued': self._queue.qsize(),
+            'saved': self.saved,
+            'clips_saved': self.clips_saved,
+            'dropped': self.dropped,
+            'failed': self.failed,
+        }
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_snapshot_writer():
+    """Process-wide SnapshotWriter, configured from AI_SNAPSHOTS"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = SnapshotWriter(**getattr(settings, 'AI_SNAPSHOTS', {}))
+        return _writer
@@ -0,0 +1,395 @@
+import asyncio
+import threading
+import time
+
+import cv2
+from django.conf import settings
+
+from .backends import get_backend
+from .motion import build_motion_gate
+from .results import to_detections
+from .snapshots import annotate_frame
+
+MJPEG_BOUNDARY = 'frame'
+
+# Re-encoded (quality, width) variants kept for the current frame
+MAX_VARIANTS = 8
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+def mjpeg_part(frame_bytes):
+    """Wrap one JPEG in a multipart/x-mixed-replace part"""
+    return (b'--' + MJPEG_BOUNDARY.encode() + b'\r\n'
+            b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+
+
+class StreamProducer:
+    """
+    Captures, infers, annotates and JPEG-encodes one camera exactly once,
+    whatever the number of viewers.
+
+    Viewers never block the producer: the producer only ever keeps the
+    latest encoded frame (with a sequence number), and each viewer waits for
+    a sequence number newer than the last one it sent. A slow viewer simply
+    skips the frames it missed.
+
+    Viewers asking for a smaller size or lower JPEG quality get a re-encoded
+    variant of the latest frame, cached so it is encoded once per frame per
+    (quality, width) pair rather than once per viewer. The cache only holds
+    the current frame's variants, at most MAX_VARIANTS of them.
+    """
+
+    def __init__(self, camera_source=0, width=640, height=480, fps=30, quality=80, confidence=0.5,
+                 idle_timeout=5.0, on_stop=None):
+        self.camera_source = camera_source
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.quality = quality
+        self.confidence = confidence
+        self.idle_timeout = idle_timeout
+        # Called from the producer thread once it has exited
+        self.on_stop = on_stop
+
+        self._condition = threading.Condition()
+        self._thread = None
+        self._frame = None
+        self._annotated = None
+        self._variants = {}
+        self._async_waiters = []
+        self._seq = 0
+        self._subscribers = 0
+        self._idle_since = None
+        self.error = None
+        self.frames_produced = 0
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def subscribers(self):
+        return self._subscribers
+
+    def subscribe(self):
+        with self._condition:
+            self._subscribers += 1
+            self._idle_since = None
+            if not self.is_running:
+                self.error = None
+                self._frame = None
+                self._thread = threading.Thread(
+                    target=self._produce,
+                    name=f'mjpeg-producer-{self.camera_source}',
+                    daemon=True
+                )
+                self._thread.start()
+
+    def unsubscribe(self):
+        with self._condition:
+            self._subscribers = max(0, self._subscribers - 1)
+            if self._subscribers == 0:
+                self._idle_since = time.monotonic()
+
+    def _has_new_frame(self, last_seq):
+        return self._seq > last_seq and self._frame is not None
+
+    def wait_for_frame(self, last_seq, timeout=5.0):
+        """
+        Block until a frame newer than ``last_seq`` is available.
+
+        Returns:
+            The new sequence number, or None if the producer stopped or timed out
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while not self._has_new_frame(last_seq):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.is_running:
+                    return None
+                self._condition.wait(remaining)
+            return self._seq
+
+    async def wait_for_frame_async(self, last_seq, timeout=5.0):
+        """Same as ``wait_for_frame``, without tying up a thread while waiting"""
+        loop = asyncio.get_running_loop()
+        with self._condition:
+            if self._has_new_frame(last_seq):
+                return self._seq
+            if not self.is_running:
+                return None
+            waiter = (loop, loop.create_future())
+            self._async_waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter[1], timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._condition:
+                if waiter in self._async_waiters:
+                    self._async_waiters.remove(waiter)
+        with self._condition:
+            return self._seq if self._has_new_frame(last_seq) else None
+
+    def get_jpeg(self, quality=None, width=None):
+        """
+        Latest frame as JPEG, optionally downscaled to ``width`` and/or
+        re-encoded at ``quality``.
+
+        Returns:
+            (seq, jpeg_bytes)
+        """
+        with self._condition:
+            seq, frame_bytes, annotated = self._seq, self._frame, self._annotated
+            if width and width >= annotated.shape[1]:
+                # No upscaling: every width past the frame's is the same variant
+                width = None
+            if quality in (None, self.quality) and not width:
+                return seq, frame_bytes
+            key = (quality or self.quality, width or 0)
+            cached = self._variants.get(key)
+            if cached and cached[0] == seq:
+                # Most recently used last
+                self._variants[key] = self._variants.pop(key)
+                return cached
+
+        if width:
+            height = max(1, round(annotated.shape[0] * width / annotated.shape[1]))
+            annotated = cv2.resize(annotated, (width, height), interpolation=cv2.INTER_AREA)
+        ret, buffer = cv2.imencode('.jpg', annotated, [cv2.IMWRITE_JPEG_QUALITY, key[0]])
+        variant = (seq, buffer.tobytes() if ret else frame_bytes)
+        with self._condition:
+            # Only cache variants of the frame still being served
+            if seq == self._seq:
+                self._variants.pop(key, None)
+                while len(self._variants) >= MAX_VARIANTS:
+                    self._variants.pop(next(iter(self._variants)))
+                self._variants[key] = variant
+        return variant
+
+    def _should_stop(self):
+        # Keep the camera open for a short grace period after the last viewer
+        # leaves, so reconnecting clients don't pay for a reopen
+        with self._condition:
+            if (self._subscribers == 0 and self._idle_since is not None
+                    and time.monotonic() - self._idle_since >= self.idle_timeout):
+                # Detach under the lock so a viewer arriving now starts a
+                # fresh producer instead of attaching to this exiting one
+                self._thread = None
+                return True
+            return False
+
+    def _notify_waiters(self):
+        # Caller holds self._condition
+        self._condition.notify_all()
+        for loop, future in self._async_waiters:
+            loop.call_soon_threadsafe(_wake, future)
+        self._async_waiters = []
+
+    def _publish(self, annotated_frame, frame_bytes):
+        with self._condition:
+            self._annotated = annotated_frame
+            self._frame = frame_bytes
+            self._seq += 1
+            self._variants.clear()
+            self._notify_waiters()
+
+    def _produce(self):
+        try:
+            self._capture()
+        finally:
+            with self._condition:
+                # Mark the producer stopped before waking viewers, so they
+                # (and on_stop) see it as not running
+                if self._thread is threading.current_thread():
+                    self._thread = None
+                self._notify_waiters()
+            if self.on_stop:
+                self.on_stop(self)
+
+    def _capture(self):
+        try:
+            backend = get_backend()
+        except RuntimeError:
+            self.error = "YOLO model not loaded"
+            print("Error: YOLO model not loaded. Cannot start streaming.")
+            return
+
+        cap = cv2.VideoCapture(self.camera_source)
+
+        if not cap.isOpened():
+            self.error = f"Could not open camera {self.camera_source}"
+            print("Error: Could not open camera")
+            return
+
+        # Set camera properties for better performance
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        cap.set(cv2.CAP_PROP_FPS, self.fps)
+
+        # Only run YOLO when the scene changed; otherwise redraw the last boxes
+        motion_gate = build_motion_gate(getattr(settings, 'AI_MOTION_GATE', None))
+        detections = None
+
+        try:
+            while not self._should_stop():
+                success, frame = cap.read()
+                if not success:
+                    self.error = "Could not read frame"
+                    print("Error: Could not read frame")
+                    break
+
+                if detections is None or not motion_gate or motion_gate.should_infer(frame, time.time()):
+                    # Run YOLO inference on the frame
+                    arrays = backend.predict([frame], conf=self.confidence)[0]
+                    detections = to_detections(arrays, 'camera')
+
+                # Draw bounding boxes and labels on the frame
+                annotated_frame = annotate_frame(frame, detections)
+
+                # Convert frame to JPEG, once for every viewer
+                ret, buffer = cv2.imencode('.jpg', annotated_frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+                if not ret:
+                    continue
+
+                self.frames_produced += 1
+                self._publish(annotated_frame, buffer.tobytes())
+
+        except Exception as e:
+            self.error = str(e)
+            print(f"Error in MJPEG stream: {e}")
+
+        finally:
+            cap.release()
+
+    def get_status(self):
+        return {
+            'camera_source': self.camera_source,
+            'is_running': self.is_running,
+            'subscribers': self._subscribers,
+            'frames_produced': self.frames_produced,
+            'error': self.error,
+        }
+
+
+class StreamBroadcaster:
+    """
+    One StreamProducer per camera source, shared by every viewer of that
+    source. A producer is evicted once its thread has stopped and no
+    viewer is left.
+    """
+
+    def __init__(self):
+        self._producers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, camera_source=0):
+        """Producer for ``camera_source``, with one more viewer subscribed"""
+        with self._lock:
+            producer = self._producers.get(camera_source)
+            if producer is None:
+                producer = StreamProducer(
+                    camera_source,
+                    quality=getattr(settings, 'AI_STREAM_JPEG_QUALITY', 80),
+                    idle_timeout=getattr(settings, 'AI_STREAM_IDLE_TIMEOUT', 5.0),
+                    on_stop=self._evict,
+                )
+                self._producers[camera_source] = producer
+            # Under the broadcaster lock, so an eviction can't race a new viewer
+            producer.subscribe()
+            return producer
+
+    def unsubscribe(self, producer):
+        with self._lock:
+            producer.unsubscribe()
+            self._evict_locked(producer)
+
+    def _evict(self, producer):
+        with self._lock:
+            self._evict_locked(producer)
+
+    def _evict_locked(self, producer):
+        if (self._producers.get(producer.camera_source) is producer
+                and not producer.is_running and producer.subscribers == 0):
+            del self._producers[producer.camera_source]
+
+    def get_status(self):
+        with self._lock:
+            producers = list(self._producers.values())
+        return [producer.get_status() for producer in producers]
+
+
+broadcaster = StreamBroadcaster()
+
+
+def generate_mjpeg_stream(camera_source=0, fps=None, quality=None, width=None):
+    """
+    Generate MJPEG stream with YOLO detection and bounding boxes (one viewer).
+
+    Args:
+        camera_source: Camera to watch
+        fps: Max frames per second sent to this viewer (None = every frame)
+        quality: JPEG quality for this viewer (None = producer default)
+        width: Downscale frames to this width (None = full size)
+    """
+    producer = broadcaster.subscribe(camera_source)
+    min_period = 1.0 / fps if fps else 0
+    next_frame_time = 0
+    last_seq = 0
+    try:
+        while True:
+            if min_period:
+                delay = next_frame_time - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+            if producer.wait_for_frame(last_seq) is None:
+                if not producer.is_running:
+                    break
+                continue
+            last_seq, frame_bytes = producer.get_jpeg(quality, width)
+            next_frame_time = time.monotonic() + min_period
+
+            # Yield the frame in MJPEG format
+            yield mjpeg_part(frame_bytes)
+    finally:
+        broadcaster.unsubscribe(producer)
+
+
+async def agenerate_mjpeg_stream(camera_source=0, fps=None, quality=None, width=None):
+    """
+    Async variant of ``generate_mjpeg_stream`` for ASGI.
+
+    Waiting for frames doesn't hold a thread, and when the client goes away
+    Django cancels the iteration, which runs the ``finally`` below and
+    releases the viewer's subscription (and eventually the camera).
+    """
+    producer = broadcaster.subscribe(camera_source)
+    min_period = 1.0 / fps if fps else 0
+    next_frame_time = 0
+    last_seq = 0
+    try:
+        while True:
+            if min_period:
+                delay = next_frame_time - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            if await producer.wait_for_frame_async(last_seq) is None:
+                if not producer.is_running:
+                    break
+                continue
+            if quality or width:
+                # Re-encoding a variant is CPU work: keep it off the event loop
+                last_seq, frame_bytes = await asyncio.to_thread(producer.get_jpeg, quality, width)
+            else:
+                last_seq, frame_bytes = producer.get_jpeg()
+            next_frame_time = time.monotonic() + min_period
+
+            yield mjpeg_part(frame_bytes)
+    finally:
+        broadcaster.unsubscribe(producer)
@@ -1,3 +1,578 @@
-from django.test import TestCase
+import importlib.util
+import io
+import json
+import os
+import struct
+import unittest
+import zipfile
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import cv2
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings, tag
+from rest_framework.test import APIClient
+
+from incidents.models import Incident
+
+from . import backends, geo, protocol, views
+from .clips import ClipRecorder, FrameRingBuffer
+from .events import CLOSED, OPENED, IncidentEventTracker
+from .model_registry import get_model_path
+from .models import CameraFeed
+from .motion import MotionGate
+from .results import DetectionArrays, empty_arrays
+from .sampling import build_sampler
+from .tracking import IoUTracker
+
+BACKEND_DEPS = ('ultralytics', 'onnx')
+FALLBACK_WEIGHTS = 'yolov8n.pt'
+
+
+def _missing_deps(*names):
+    return [name for name in names if importlib.util.find_spec(name) is None]
+
+
+def _detection(confidence):
+    return {'class': 0, 'label': 'accident', 'confidence': confidence, 'box': [0, 0, 10, 10]}
+
+
+class IncidentEventTrackerTests(SimpleTestCase):
+    def setUp(self):
+        self.tracker = IncidentEventTracker('cam', min_positive_frames=2, window_frames=5,
+                                            close_after_seconds=1.0, cooldown_seconds=5.0)
+
+    def observe(self, positive, now):
+        return self.tracker.observe([_detection(0.9)] if positive else [], now)
+
+    def test_opens_after_min_positive_frames(self):
+        self.assertEqual(self.observe(True, 0), [])
+        transitions = self.observe(True, 1)
+        self.assertEqual([kind for kind, _ in transitions], [OPENED])
+        self.assertEqual(transitions[0][1].peak_confidence, 0.9)
+
+    def test_negative_frame_after_cooldown_does_not_open(self):
+        self.observe(True, 0)
+        self.observe(True, 1)
+        self.assertEqual([kind for kind, _ in self.observe(False, 3)], [CLOSED])
+        # Positives during the cooldown must not carry over past it
+        for now in (4, 5, 6, 7):
+            self.assertEqual(self.observe(True, now), [])
+        self.assertEqual(self.observe(False, 8.5), [])
+        self.assertIsNone(self.tracker.current)
+        self.assertEqual(self.observe(True, 9), [])
+        self.assertEqual([kind for kind, _ in self.observe(True, 10)], [OPENED])
+
+
+class BinaryProtocolTests(SimpleTestCase):
+    def test_jpeg_frame(self):
+        image = np.full((24, 32, 3), 200, dtype=np.uint8)
+        message = struct.pack('<BI', protocol.FRAME_JPEG, 7) + cv2.imencode('.png', image)[1].tobytes()
+        self.assertEqual(protocol.frame_seq(message), 7)
+        seq, frame = protocol.decode_binary_frame(message)
+        self.assertEqual(seq, 7)
+        np.testing.assert_array_equal(frame, image)
+
+    def test_raw_frame(self):
+        image = np.arange(4 * 6 * 3, dtype=np.uint8).reshape(4, 6, 3)
+        message = struct.pack('<BIHH', protocol.FRAME_RAW, 2 ** 32 - 1, 6, 4) + image.tobytes()
+        seq, frame = protocol.decode_binary_frame(message)
+        self.assertEqual(seq, 2 ** 32 - 1)
+        np.testing.assert_array_equal(frame, image)
+
+    def test_malformed_frames(self):
+        for message in (b'\x00\x01', struct.pack('<BIHH', protocol.FRAME_RAW, 1, 6, 4) + bytes(10),
+                        struct.pack('<BI', 9, 1) + bytes(4)):
+            with self.subTest(message=message[:8]):
+                with self.assertRaises(ValueError):
+                    protocol.decode_binary_frame(message)
+
+    def test_detections_round_trip(self):
+        arrays = DetectionArrays(
+            np.array([[1.5, 2.0, 30.25, 40.0], [5.0, 6.0, 7.0, 8.0]], dtype=np.float32),
+            np.array([0.9, 0.25], dtype=np.float32), np.array([0, 3]), {0: 'accident'},
+            np.array([12, 13]),
+        )
+        message = protocol.encode_detections(42, arrays, dropped_frames=3)
+        kind, seq, dropped, count = struct.unpack_from('<BIIH', message)
+        self.assertEqual((kind, seq, dropped, count), (protocol.MSG_DETECTIONS, 42, 3, 2))
+        records = np.frombuffer(message, protocol.RECORD_DTYPE, offset=struct.calcsize('<BIIH'))
+        np.testing.assert_array_equal(records['class_id'], arrays.cls)
+        np.testing.assert_array_equal(records['confidence'], arrays.conf)
+        np.testing.assert_array_equal(np.stack([records[k] for k in ('x1', 'y1', 'x2', 'y2')], axis=1), arrays.xyxy)
+        np.testing.assert_array_equal(records['track_id'], arrays.track_ids)
+
+    def test_untracked_and_empty_detections(self):
+        arrays = DetectionArrays(np.array([[0, 0, 1, 1]], dtype=np.float32), np.array([0.5], dtype=np.float32),
+                                 np.array([1]), {})
+        records = np.frombuffer(protocol.encode_detections(1, arrays), protocol.RECORD_DTYPE,
+                                offset=struct.calcsize('<BIIH'))
+        self.assertEqual(records['track_id'].tolist(), [-1])
+        self.assertEqual(len(protocol.encode_detections(1, empty_arrays())), struct.calcsize('<BIIH'))
+
+    def test_class_table(self):
+        self.assertEqual(json.loads(protocol.encode_class_table(['accident', 'fire'])),
+                         {'type': 'class_table', 'classes': {'0': 'accident', '1': 'fire'}})
+
+
+def _boxes(*boxes, cls=None):
+    xyxy = np.array(boxes, dtype=np.float32).reshape(-1, 4)
+    cls = np.zeros(len(xyxy), dtype=np.int64) if cls is None else np.array(cls)
+    return DetectionArrays(xyxy, np.full(len(xyxy), 0.8, dtype=np.float32), cls, {0: 'car', 1: 'person'})
+
+
+class IoUTrackerTests(SimpleTestCase):
+    def test_ids_stable_across_frames(self):
+        tracker = IoUTracker(iou_threshold=0.3, max_age=5)
+        first = tracker.update(_boxes([0, 0, 10, 10], [100, 100, 120, 120])).track_ids.tolist()
+        self.assertEqual(len(set(first)), 2)
+        for step in range(1, 6):
+            # Both objects move a little; input order flips every frame
+            boxes = [[step, 0, 10 + step, 10], [100, 100 + step, 120, 120 + step]]
+            if step % 2:
+                self.assertEqual(tracker.update(_boxes(*boxes[::-1])).track_ids.tolist(), first[::-1])
+            else:
+                self.assertEqual(tracker.update(_boxes(*boxes)).track_ids.tolist(), first)
+
+    def test_other_class_gets_new_id(self):
+        tracker = IoUTracker()
+        [car] = tracker.update(_boxes([0, 0, 10, 10], cls=[0])).track_ids
+        [person] = tracker.update(_boxes([0, 0, 10, 10], cls=[1])).track_ids
+        self.assertNotEqual(car, person)
+
+    def test_tracks_expire_after_max_age(self):
+        tracker = IoUTracker(max_age=2)
+        [track_id] = tracker.update(_boxes([0, 0, 10, 10])).track_ids
+        for _ in range(2):
+            tracker.update(_boxes())
+        self.assertEqual(tracker.get_stats()['active_tracks'], 1)
+        # Back within max_age frames: same id
+        self.assertEqual(tracker.update(_boxes([0, 0, 10, 10])).track_ids.tolist(), [track_id])
+
+        for _ in range(3):
+            tracker.update(_boxes())
+        self.assertEqual(tracker.get_stats()['active_tracks'], 0)
+        self.assertNotEqual(tracker.update(_boxes([0, 0, 10, 10])).track_ids.tolist(), [track_id])
+
+    def test_predict_between_detections(self):
+        tracker = IoUTracker(velocity_smoothing=1.0, detect_every=2)
+        self.assertTrue(tracker.should_detect())
+        [track_id] = tracker.update(_boxes([0, 0, 10, 10])).track_ids
+        self.assertFalse(tracker.should_detect())
+        tracker.predict()
+        self.assertTrue(tracker.should_detect())
+        tracker.update(_boxes([4, 0, 14, 10]))  # 2 px per frame
+        predicted = tracker.predict()
+        self.assertEqual(predicted.track_ids.tolist(), [track_id])
+        np.testing.assert_allclose(predicted.xyxy, [[6, 0, 16, 10]])
+
+
+class FrameRingBufferTests(SimpleTestCase):
+    def everything(self, buffer):
+        return buffer.frames_between(float('-inf'), float('inf'))
+
+    def test_wraparound_keeps_latest_frames(self):
+        buffer = FrameRingBuffer(max_bytes=100, max_frames=10)
+        written = []
+        for i in range(7):
+            written.append((float(i), bytes([i]) * 30))
+            self.assertTrue(buffer.append(written[-1][1], i))
+            # 30-byte frames: three fit, the fourth wraps over the oldest
+            self.assertEqual(self.everything(buffer), written[-3:])
+        self.assertEqual(buffer.get_stats()['bytes_used'], 90)
+
+    def test_mixed_sizes_never_corrupt_or_overflow(self):
+        rng = np.random.default_rng(0)
+        buffer = FrameRingBuffer(max_bytes=150, max_frames=5)
+        written = []
+        for i in range(300):
+            written.append((float(i), rng.integers(0, 256, int(rng.integers(1, 61)), dtype=np.uint8).tobytes()))
+            buffer.append(written[-1][1], i)
+            kept = self.everything(buffer)
+            # Always the newest frames, intact, within both limits
+            self.assertEqual(kept, written[-len(kept):])
+            self.assertLessEqual(len(kept), 5)
+            self.assertLessEqual(sum(len(data) for _, data in kept), 150)
+
+    def test_slot_limit(self):
+        buffer = FrameRingBuffer(max_bytes=1000, max_frames=2)
+        for i in range(4):
+            buffer.append(bytes([i]), i)
+        self.assertEqual(self.everything(buffer), [(2.0, b'\x02'), (3.0, b'\x03')])
+
+    def test_oversized_frame_rejected(self):
+        buffer = FrameRingBuffer(max_bytes=10, max_frames=4)
+        buffer.append(b'ok', 0)
+        self.assertFalse(buffer.append(bytes(11), 1))
+        self.assertEqual(self.everything(buffer), [(0.0, b'ok')])
+        self.assertEqual(buffer.frames_rejected, 1)
+
+    def test_frames_between(self):
+        buffer = FrameRingBuffer(max_bytes=100, max_frames=10)
+        for i in range(5):
+            buffer.append(bytes([i]), i)
+        self.assertEqual([t for t, _ in buffer.frames_between(1, 3)], [1.0, 2.0, 3.0])
+
+
+class ClipRecorderTests(SimpleTestCase):
+    def setUp(self):
+        self.recorder = ClipRecorder(fps=1, buffer_seconds=20, pre_seconds=2, post_seconds=2, width=None)
+        self.frame = np.zeros((8, 8, 3), dtype=np.uint8)
+        self.event = SimpleNamespace(id=1, start_time=10.0, end_time=None)
+
+    def record(self, start, end):
+        """Add one frame per second; the (seconds, timestamps) of each clip exported"""
+        exported = []
+        for now in range(start, end + 1):
+            for _, frames in self.recorder.add_frame(self.frame, float(now)):
+                exported.append((now, [timestamp for timestamp, _ in frames]))
+        return exported
+
+    def test_clip_spans_pre_and_post_window(self):
+        self.assertEqual(self.record(0, 10), [])
+        self.recorder.event_opened(self.event, on_ready=None)
+        self.assertEqual(self.record(11, 12), [])
+        self.event.end_time = 12.0
+        self.recorder.event_closed(self.event)
+        self.assertEqual(self.record(13, 16), [(14, [8.0, 9.0, 10.0, 11.0, 12.0, 13.0, 14.0])])
+
+    def test_long_event_exported_before_leaving_buffer(self):
+        self.record(0, 10)
+        self.recorder.event_opened(self.event, on_ready=None)
+        # The clip starts at 8s; the 20s buffer would start losing it after 27s
+        [(exported_at, timestamps)] = self.record(11, 40)
+        self.assertEqual(exported_at, 27)
+        self.assertEqual(timestamps, [float(t) for t in range(8, 28)])
+
+
+class MotionSamplerTests(SimpleTestCase):
+    def setUp(self):
+        self.still = np.zeros((90, 160, 3), dtype=np.uint8)
+        self.moved = self.still.copy()
+        self.moved[20:60, 40:100] = 255
+
+    def test_analyzes_only_changed_frames(self):
+        sampler = build_sampler('motion', check_every=1, min_interval=0, max_interval=60)
+        self.assertTrue(sampler.accept(self.still, 0))  # first frame: nothing to compare with
+        self.assertFalse(sampler.accept(self.still, 1))
+        self.assertTrue(sampler.accept(self.moved, 2))
+        self.assertFalse(sampler.accept(self.moved, 3))
+        self.assertTrue(sampler.accept(self.still, 70))  # max_interval forces one through
+
+    def test_uses_motion_gate_settings(self):
+        with override_settings(AI_MOTION_GATE={'enabled': False, 'min_changed_ratio': 0.5}):
+            sampler = build_sampler('motion')
+        self.assertIsInstance(sampler.motion_gate, MotionGate)
+        self.assertEqual(sampler.describe()['threshold'], 0.5)
+        sampler.accept(self.still, 0)
+        # A sixth of the pixels changed: below the configured ratio
+        self.assertFalse(sampler.accept(self.moved, 1))
+        self.assertTrue(build_sampler('motion', threshold=0.1).accept(self.still, 0))
+
+    def test_threshold_is_a_ratio(self):
+        with self.assertRaises(ValueError):
+            build_sampler('motion', threshold=8)
+
+
+class CameraSourceTests(TestCase):
+    """Camera endpoints only open registered CameraFeeds or webcam indexes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user('operator', password='x'))
+        patcher = mock.patch.object(views.camera_service, 'start_camera_detection', return_value=True)
+        self.start = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def start_camera(self, **data):
+        return self.client.post('/api/ai/camera/start/', data, format='json')
+
+    def test_rejects_paths_and_urls(self):
+        for source in ('/etc/passwd', 'rtsp://attacker.example/stream', 'file:///etc/passwd', '-1', ''):
+            with self.subTest(source=source):
+                self.assertEqual(self.start_camera(camera_source=source).status_code, 400)
+        self.start.assert_not_called()
+
+    def test_rejects_malformed_camera_id(self):
+        self.assertEqual(self.start_camera(camera_id='/etc/passwd').status_code, 400)
+        self.assertEqual(self.start_camera(camera_id=999).status_code, 404)
+        self.start.assert_not_called()
+
+    def test_device_index(self):
+        self.assertEqual(self.start_camera(camera_source='1').status_code, 200)
+        self.assertEqual(self.start.call_args.kwargs['camera_source'], 1)
+
+    def test_camera_feed_uses_stored_url(self):
+        feed = CameraFeed.objects.create(location='Main St', latitude=30.0, longitude=31.0,
+                                         stream_url='http://cameras.example/main')
+        self.assertEqual(self.start_camera(camera_id=feed.pk).status_code, 200)
+        self.assertEqual(self.start.call_args.kwargs['camera_source'], feed.stream_url)
+        self.assertEqual(self.start.call_args.kwargs['camera_feed_id'], feed.pk)
+
+    def test_video_feed_rejects_paths(self):
+        with mock.patch.object(views, 'get_backend'):
+            response = self.client.get('/api/ai/video-feed/', {'camera_source': '/etc/passwd'})
+        self.assertEqual(response.status_code, 400)
+
+
+class GeoRadiusTests(TestCase):
+    def camera(self, latitude, longitude):
+        return CameraFeed.objects.create(location=f'{latitude},{longitude}', latitude=latitude,
+                                         longitude=longitude, stream_url='http://cameras.example/feed')
+
+    def test_nearest_first_within_radius(self):
+        near, far = self.camera(30.0, 31.001), self.camera(30.0, 31.05)
+        self.camera(30.0, 32.0)  # ~96 km away
+        matches = geo.within_radius(CameraFeed.objects.all(), 30.0, 31.0, 10)
+        self.assertEqual([row for _, row in matches], [near, far])
+        self.assertAlmostEqual(matches[0][0], geo.haversine_km(30.0, 31.0, 30.0, 31.001))
+
+    def test_crosses_antimeridian(self):
+        east, west = self.camera(0.0, 179.99), self.camera(0.0, -179.98)
+        self.camera(0.0, 0.0)
+        self.assertEqual(len(geo.radius_bboxes(0.0, 179.995, 10)), 2)
+        for longitude in (179.995, -179.995):
+            with self.subTest(longitude=longitude):
+                matches = geo.within_radius(CameraFeed.objects.all(), 0.0, longitude, 10)
+                self.assertEqual({row for _, row in matches}, {east, west})
+
+    def test_limit_is_applied_in_sql(self):
+        cameras = [self.camera(30.0, 31.0 + i * 0.001) for i in range(20)]
+        with self.assertNumQueries(1) as queries:
+            matches = geo.within_radius(CameraFeed.objects.all(), 30.0, 31.0, 50, limit=3)
+        self.assertEqual([row for _, row in matches], cameras[:3])
+        self.assertIn(f'LIMIT {3 * geo.RADIUS_CANDIDATES_PER_ROW}', queries.captured_queries[0]['sql'])
+
+
+class GeoQueryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user('operator', password='x'))
+
+    def test_radius_query(self):
+        for offset in (0.02, 0.01, 1.0):
+            Incident.objects.create(incident_type='Accident', latitude=30.0, longitude=31.0 + offset)
+        response = self.client.get('/api/ai/geo/incidents/', {'lat': 30, 'lon': 31, 'radius_km': 5, 'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['longitude'], 31.01)
+        self.assertAlmostEqual(response.data['results'][0]['distance_km'], 0.964, places=2)
+
+    def test_invalid_since_is_bad_request(self):
+        for since in ('2024-13-45T00:00', 'yesterday'):
+            with self.subTest(since=since):
+                response = self.client.get('/api/ai/geo/incidents/',
+                                           {'lat': 30, 'lon': 31, 'radius_km': 5, 'since': since})
+                self.assertEqual(response.status_code, 400)
+
+
+class FakeBackend:
+    """One 'accident' box per frame; records the batch sizes it was called with"""
+
+    names = {0: 'accident'}
+
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, images, conf=None):
+        self.batches.append(len(images))
+        return [
+            DetectionArrays(np.array([[0, 0, image.shape[1], image.shape[0]]], dtype=np.float32),
+                            np.array([0.9], dtype=np.float32), np.array([0]), self.names)
+            for image in images
+        ]
+
+
+def _png(width=32, height=24):
+    return cv2.imencode('.png', np.zeros((height, width, 3), dtype=np.uint8))[1].tobytes()
+
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+class BatchDetectionTests(TestCase):
+    url = '/api/ai/incident/batch/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user('operator', password='x'))
+        self.backend = FakeBackend()
+        patcher = mock.patch.object(backends, '_backend', self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, query='', **files):
+        response = self.client.post(self.url + query, files, format='multipart')
+        if not response.streaming:
+            return response, None
+        return response, [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_multiple_files(self):
+        images = [SimpleUploadedFile(f'frame{i}.png', _png(width=32 + i)) for i in range(3)]
+        images.append(SimpleUploadedFile('broken.png', b'not an image'))
+        response, lines = self.post('?batch_size=2', images=images)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([line['index'] for line in lines], [0, 1, 2, 3])
+        self.assertEqual([line['name'] for line in lines], ['frame0.png', 'frame1.png', 'frame2.png', 'broken.png'])
+        for i, line in enumerate(lines[:3]):
+            self.assertEqual(line['total_detections'], 1)
+            self.assertEqual(line['detections'][0]['box'], [0, 0, 32 + i, 24])
+        self.assertIn('error', lines[3])
+        # Chunks of batch_size; the undecodable image never reaches the model
+        self.assertEqual(self.backend.batches, [2, 1])
+
+    @override_settings(AI_BATCH_UPLOAD_MAX_IMAGES=3)
+    def test_zip_truncated_at_max_images(self):
+        archive = _zip([(f'frames/{i}.png', _png()) for i in range(5)] + [('notes.txt', b'skipped')])
+        response, lines = self.post(archive=SimpleUploadedFile('frames.zip', archive))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([line.get('name') for line in lines[:3]], ['frames/0.png', 'frames/1.png', 'frames/2.png'])
+        self.assertTrue(all(line['total_detections'] == 1 for line in lines[:3]))
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[3]['truncated'])
+
+    @override_settings(AI_BATCH_UPLOAD_MAX_IMAGES=2)
+    def test_too_many_files(self):
+        images = [SimpleUploadedFile(f'{i}.png', _png()) for i in range(3)]
+        response, _ = self.post(images=images)
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(self.backend.batches, [])
+
+    def test_corrupt_archive(self):
+        for data in (b'not an archive', _zip([('0.png', _png())])[:40]):
+            with self.subTest(data=data[:8]):
+                response, _ = self.post(archive=SimpleUploadedFile('frames.zip', data))
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.backend.batches, [])
+
+    def test_corrupt_archive_member(self):
+        data = bytearray(_zip([('0.png', _png()), ('1.png', _png(width=64))]))
+        # Zero bytes inside the first member's compressed data (bad CRC on read)
+        offset = data.index(b'0.png') + len('0.png') + 4
+        data[offset:offset + 8] = bytes(8)
+        response, lines = self.post(archive=SimpleUploadedFile('frames.zip', bytes(data)))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('error', lines[0])
+        self.assertEqual(lines[1]['total_detections'], 1)
+
+
+def _test_weights():
+    """best.pt when present, otherwise ultralytics' stock yolov8n.pt (downloaded once)"""
+    if os.path.exists(get_model_path()):
+        return get_model_path()
+    from ultralytics.utils.downloads import attempt_download_asset
+
+    try:
+        path = attempt_download_asset(FALLBACK_WEIGHTS)
+    except Exception as e:
+        raise unittest.SkipTest(f"no weights at {get_model_path()} and {FALLBACK_WEIGHTS} unavailable: {e}")
+    return os.path.abspath(str(path))
+
+
+@tag('integration')
+class BackendTestCase(SimpleTestCase):
+    """
+    Compares an exported backend with PyTorch on the same weights. Needs
+    ultralytics, onnx and the backend's runtime; runs on best.pt, or on the
+    stock yolov8n.pt when best.pt isn't checked out. Skip the whole group
+    with ``manage.py test --exclude-tag integration``.
+    """
+
+    backend = None
+    runtime = None
+
+    # Box corners in pixels, confidences in [0, 1]
+    BOX_TOLERANCE = 2.0
+    CONF_TOLERANCE = 0.02
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        missing = _missing_deps(*BACKEND_DEPS, cls.runtime)
+        if missing:
+            raise unittest.SkipTest(f"missing {', '.join(missing)}")
+
+        from ultralytics.utils import ASSETS
+        from .backends import build_backend
+
+        cls.model_path = _test_weights()
+        cls.torch = build_backend('torch', cls.model_path)
+        cls.exported = cls.build_exported(build_backend)
+        cls.images = [cv2.imread(str(path)) for path in sorted(ASSETS.glob('*.jpg'))]
+        rng = np.random.default_rng(0)
+        cls.images.append(rng.integers(0, 256, (480, 640, 3), dtype=np.uint8))
+
+    @classmethod
+    def build_exported(cls, build_backend):
+        return build_backend(cls.backend, cls.model_path)
+
+    def assert_same_detections(self, expected, actual):
+        self.assertEqual(len(expected.cls), len(actual.cls))
+        # Both backends sort by confidence, but near-ties may swap
+        expected_order = np.lexsort((expected.xyxy[:, 0], expected.cls, -np.round(expected.conf, 2)))
+        actual_order = np.lexsort((actual.xyxy[:, 0], actual.cls, -np.round(actual.conf, 2)))
+        np.testing.assert_array_equal(expected.cls[expected_order], actual.cls[actual_order])
+        np.testing.assert_allclose(expected.conf[expected_order], actual.conf[actual_order],
+                                   atol=self.CONF_TOLERANCE)
+        np.testing.assert_allclose(expected.xyxy[expected_order], actual.xyxy[actual_order],
+                                   atol=self.BOX_TOLERANCE)
+
+    def assert_same_batch(self, images):
+        expected, actual = self.torch.predict(images), self.exported.predict(images)
+        self.assertEqual(len(actual), len(images))
+        for expected_arrays, actual_arrays in zip(expected, actual):
+            self.assert_same_detections(expected_arrays, actual_arrays)
+
+
+class OnnxRuntimeBackendTests(BackendTestCase):
+    """ONNX Runtime must return what PyTorch returns for the same weights"""
+
+    backend = 'onnxruntime'
+    runtime = 'onnxruntime'
+
+    @classmethod
+    def build_exported(cls, build_backend):
+        return build_backend(cls.backend, cls.model_path, intra_op_threads=2, inter_op_threads=1)
+
+    def test_names_match(self):
+        self.assertEqual(dict(self.torch.names), dict(self.exported.names))
+
+    def test_single_images_match(self):
+        for image in self.images:
+            with self.subTest(shape=image.shape):
+                self.assert_same_batch([image])
+
+    def test_mixed_size_batch_matches(self):
+        self.assert_same_batch(self.images)
+
+    def test_export_is_cached(self):
+        from .backends import export_model, exported_model_path
+
+        path = export_model(self.model_path, 'onnx')
+        self.assertEqual(path, exported_model_path(self.model_path, 'onnx'))
+        modified = os.path.getmtime(path)
+        self.assertEqual(export_model(self.model_path, 'onnx'), path)
+        self.assertEqual(os.path.getmtime(path), modified)
+
+
+class OpenVinoBackendTests(BackendTestCase):
+    """The OpenVINO export must take the batches the camera pool sends"""
+
+    backend = 'openvino'
+    runtime = 'openvino'
+
+    def test_camera_sized_batch_matches(self):
+        # Same-shape frames, as a camera pool batch of several streams
+        frame = self.images[0]
+        self.assert_same_batch([frame] * 8)
+
+    def test_mixed_size_batch_matches(self):
+        self.assert_same_batch(self.images)
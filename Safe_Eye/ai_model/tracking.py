@@ -0,0 +1,161 @@
+import threading
+
+import numpy as np
+
+from .results import DetectionArrays
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy boxes -> (N, M)"""
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-6)
+
+
+class IoUTracker:
+    """
+    SORT-style multi-object tracker, CPU only.
+
+    Each track keeps its last box and a smoothed per-frame velocity (a
+    constant-velocity model standing in for SORT's Kalman filter). On every
+    detector run, tracks are advanced to the current frame and greedily
+    matched to detections of the same class by IoU; matched detections
+    inherit the track id, unmatched ones start new tracks, and tracks
+    not matched for more than ``max_age`` frames are dropped.
+
+    Between detector runs, ``predict`` advances the tracks one frame so the
+    detector only has to run every ``detect_every`` frames.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_age=30, velocity_smoothing=0.5, detect_every=1):
+        self.iou_threshold = float(iou_threshold)
+        self.max_age = int(max_age)
+        self.velocity_smoothing = float(velocity_smoothing)
+        self.detect_every = max(1, int(detect_every))
+
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._frame_index = 0
+        self._names = {}
+        self._ids = np.zeros((0,), dtype=np.int64)
+        self._boxes = np.zeros((0, 4), dtype=np.float32)
+        self._velocities = np.zeros((0, 4), dtype=np.float32)
+        self._conf = np.zeros((0,), dtype=np.float32)
+        self._cls = np.zeros((0,), dtype=np.int64)
+        # Detector runs without a match / frames since the last match
+        self._misses = np.zeros((0,), dtype=np.int64)
+        self._since_seen = np.zeros((0,), dtype=np.int64)
+
+    def should_detect(self):
+        """True on frames where the detector should run (vs. ``predict``)"""
+        return self._frame_index % self.detect_every == 0
+
+    def _advance(self):
+        # Caller holds self._lock
+        self._frame_index += 1
+        self._boxes = self._boxes + self._velocities
+        self._since_seen = self._since_seen + 1
+
+    def _tracked_arrays(self, mask=None):
+        if mask is None:
+            mask = np.ones(len(self._ids), dtype=bool)
+        return DetectionArrays(
+            self._boxes[mask].copy(), self._conf[mask].copy(), self._cls[mask].copy(),
+            self._names, self._ids[mask].copy()
+        )
+
+    def update(self, arrays):
+        """
+        Feed one frame's detections.
+
+        Returns:
+            ``arrays`` with ``track_ids`` filled in (same order as the input)
+        """
+        with self._lock:
+            self._advance()
+            self._names = arrays.names
+            count = len(arrays.cls)
+            track_ids = np.full(count, -1, dtype=np.int64)
+            matched_tracks = np.zeros(len(self._ids), dtype=bool)
+            matched_dets = np.zeros(count, dtype=bool)
+
+            ious = iou_matrix(self._boxes, arrays.xyxy)
+            if ious.size:
+                # Only match detections and tracks of the same class
+                ious[self._cls[:, None] != arrays.cls[None, :]] = 0
+                # Greedy matching, best IoU first
+                order = np.argsort(ious, axis=None)[::-1]
+                for track_index, det_index in zip(*np.unravel_index(order, ious.shape)):
+                    if ious[track_index, det_index] < self.iou_threshold:
+                        break
+                    if matched_tracks[track_index] or matched_dets[det_index]:
+                        continue
+                    matched_tracks[track_index] = True
+                    matched_dets[det_index] = True
+                    track_ids[det_index] = self._ids[track_index]
+
+                    steps = self._since_seen[track_index]
+                    observed = (arrays.xyxy[det_index] - (self._boxes[track_index] - self._velocities[track_index] * steps)) / steps
+                    self._velocities[track_index] = (self.velocity_smoothing * observed
+                                                     + (1 - self.velocity_smoothing) * self._velocities[track_index])
+                    self._boxes[track_index] = arrays.xyxy[det_index]
+                    self._conf[track_index] = arrays.conf[det_index]
+                    self._misses[track_index] = 0
+                    self._since_seen[track_index] = 0
+
+            self._misses[~matched_tracks] += 1
+            keep = self._since_seen <= self.max_age
+
+            new = ~matched_dets
+            new_ids = np.arange(self._next_id, self._next_id + int(new.sum()), dtype=np.int64)
+            self._next_id += len(new_ids)
+            track_ids[new] = new_ids
+
+            self._ids = np.concatenate([self._ids[keep], new_ids])
+            self._boxes = np.concatenate([self._boxes[keep], arrays.xyxy[new]]).astype(np.float32)
+            self._velocities = np.concatenate([self._velocities[keep], np.zeros((len(new_ids), 4), np.float32)])
+            self._conf = np.concatenate([self._conf[keep], arrays.conf[new]]).astype(np.float32)
+            self._cls = np.concatenate([self._cls[keep], arrays.cls[new]])
+            self._misses = np.concatenate([self._misses[keep], np.zeros(len(new_ids), np.int64)])
+            self._since_seen = np.concatenate([self._since_seen[keep], np.zeros(len(new_ids), np.int64)])
+
+            return arrays._replace(track_ids=track_ids)
+
+    def predict(self):
+        """
+        Advance every track one frame without running the detector.
+
+        Returns:
+            DetectionArrays of the tracks seen on the last detector run,
+            at their propagated positions
+        """
+        with self._lock:
+            self._advance()
+            return self._tracked_arrays(self._misses == 0)
+
+    def get_stats(self):
+        return {
+            'active_tracks': int(len(self._ids)),
+            'next_track_id': self._next_id,
+            'detect_every': self.detect_every,
+        }
+
+
+def build_tracker(options):
+    """
+    Build an IoUTracker from a settings-style dict, e.g. AI_TRACKER.
+
+    Returns:
+        None when tracking is disabled (``options`` empty or ``enabled`` False)
+    """
+    if not options or not options.get('enabled', True):
+        return None
+    options = {key: value for key, value in options.items() if key != 'enabled' and value is not None}
+    return IoUTracker(**options)
@@ -0,0 +1,149 @@
+import os
+import tarfile
+import zipfile
+import zlib
+
+import cv2
+import numpy as np
+from django.conf import settings
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an uploaded image exceeds AI_MAX_UPLOAD_BYTES"""
+
+
+def get_max_upload_bytes():
+    return getattr(settings, 'AI_MAX_UPLOAD_BYTES', 20 * 1024 * 1024)
+
+
+def decode_image_bytes(data):
+    """
+    Decode an encoded image (JPEG/PNG/...) held in memory.
+
+    Raises:
+        ValueError: if the bytes are not a decodable image
+    """
+    frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError("Could not decode image")
+    return frame
+
+
+def decode_uploaded_image(uploaded_file, max_bytes=None):
+    """
+    Decode a Django UploadedFile straight into a BGR numpy array.
+
+    Small uploads are already in memory and are decoded from their buffer;
+    only uploads bigger than FILE_UPLOAD_MAX_MEMORY_SIZE have been spooled by
+    Django to a uniquely named temporary file, which is decoded in place.
+    Nothing is written to disk by this function.
+
+    Raises:
+        UploadTooLarge: if the upload exceeds ``max_bytes``
+        ValueError: if the upload is not a decodable image
+    """
+    max_bytes = get_max_upload_bytes() if max_bytes is None else max_bytes
+    if max_bytes and uploaded_file.size and uploaded_file.size > max_bytes:
+        raise UploadTooLarge(f"Image is larger than the {max_bytes} byte limit")
+
+    if hasattr(uploaded_file, 'temporary_file_path'):
+        frame = cv2.imread(uploaded_file.temporary_file_path(), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError("Could not decode image")
+        return frame
+
+    uploaded_file.seek(0)
+    return decode_image_bytes(uploaded_file.read())
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tif', '.tiff')
+
+# What a truncated or corrupt archive raises while being read
+ARCHIVE_ERRORS = (zipfile.BadZipFile, zlib.error, tarfile.TarError, EOFError, OSError)
+
+
+def _is_image_name(name):
+    return os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+
+def iter_archive_images(archive_file, max_bytes=None):
+    """
+    Yield (name, read) for every image inside a zip or tar(.gz/.bz2/.xz) upload.
+
+    ``read`` returns the member's bytes, so members are only pulled out of the
+    archive one at a time as they are consumed. Members larger than
+    ``max_bytes`` yield a ``read`` that raises UploadTooLarge; a corrupt
+    member's ``read`` raises ValueError.
+
+    Raises:
+        ValueError: if the upload is neither a zip nor a tar archive, or is
+            too corrupt to list its members
+    """
+    max_bytes = get_max_upload_bytes() if max_bytes is None else max_bytes
+
+    def too_large(name):
+        def read():
+            raise UploadTooLarge(f"{name} is larger than the {max_bytes} byte limit")
+        return read
+
+    def read_zip_member(archive, info):
+        try:
+            return archive.read(info)
+        except ARCHIVE_ERRORS as e:
+            raise ValueError(f"Could not read {info.filename} from the archive: {e}")
+
+    archive_file.seek(0)
+    if zipfile.is_zipfile(archive_file):
+        archive_file.seek(0)
+        try:
+            archive = zipfile.ZipFile(archive_file)
+        except ARCHIVE_ERRORS as e:
+            raise ValueError(f"Corrupt zip archive: {e}")
+        for info in archive.infolist():
+            if info.is_dir() or not _is_image_name(info.filename):
+                continue
+            if max_bytes and info.file_size > max_bytes:
+                yield info.filename, too_large(info.filename)
+            else:
+                yield info.filename, (lambda info=info: read_zip_member(archive, info))
+        return
+
+    archive_file.seek(0)
+    try:
+        archive = tarfile.open(fileobj=archive_file, mode='r:*')
+    except tarfile.TarError:
+        raise ValueError("Archive must be a zip or tar file")
+    # Members are only reachable while iterating, so a corrupt tail ends
+    # the iteration itself
+    try:
+        for member in archive:
+            if not member.isfile() or not _is_image_name(member.name):
+                continue
+            if max_bytes and member.size > max_bytes:
+                yield member.name, too_large(member.name)
+            else:
+                data = archive.extractfile(member).read()
+                yield member.name, (lambda data=data: data)
+    except ARCHIVE_ERRORS as e:
+        raise ValueError(f"Corrupt tar archive: {e}")
+
+
+def iter_uploaded_images(files, archive=None, max_bytes=None):
+    """
+    Yield (name, read) for a list of uploaded image files and/or one archive.
+
+    ``read`` returns the encoded image bytes (raising UploadTooLarge for
+    oversized files).
+    """
+    max_bytes = get_max_upload_bytes() if max_bytes is None else max_bytes
+    for uploaded_file in files:
+        if max_bytes and uploaded_file.size and uploaded_file.size > max_bytes:
+            def read(name=uploaded_file.name):
+                raise UploadTooLarge(f"{name} is larger than the {max_bytes} byte limit")
+        else:
+            def read(uploaded_file=uploaded_file):
+                uploaded_file.seek(0)
+                return uploaded_file.read()
+        yield uploaded_file.name, read
+    if archive is not None:
+        yield from iter_archive_images(archive, max_bytes)
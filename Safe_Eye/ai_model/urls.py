@@ -1,11 +1,14 @@
 # Safe_Eye/ai_model/urls.py
 
 from django.urls import path
-from .views import detect_accident, start_camera_detection, stop_camera_detection, get_camera_status, video_feed
+from .views import detect_accident, detect_accident_batch, start_camera_detection, stop_camera_detection, get_camera_status, video_feed, get_model_status, cameras_nearby, incidents_nearby
 
 urlpatterns = [
     # POST /api/ai/detect/ to run your model
     path('incident/', detect_accident, name='incident'),
+
+    # POST many images (or a zip/tar archive), NDJSON results streamed back
+    path('incident/batch/', detect_accident_batch, name='incident_batch'),
     
     # MJPEG streaming endpoint
     path('video-feed/', video_feed, name='video_feed'),
@@ -14,4 +17,11 @@ urlpatterns = [
     path('camera/start/', start_camera_detection, name='start_camera'),
     path('camera/stop/', stop_camera_detection, name='stop_camera'),
     path('camera/status/', get_camera_status, name='camera_status'),
+
+    # Shared model load time / memory
+    path('model/status/', get_model_status, name='model_status'),
+
+    # Radius / bounding-box lookups for map views
+    path('geo/cameras/', cameras_nearby, name='geo_cameras'),
+    path('geo/incidents/', incidents_nearby, name='geo_incidents'),
 ]
@@ -1,52 +1,31 @@
-import os
+import asyncio
 import json
-import cv2
-import numpy as np
-from django.http import JsonResponse, StreamingHttpResponse
-from django.views.decorators.csrf import csrf_exempt
-from django.core.files.storage import FileSystemStorage
+from itertools import chain, islice
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from .yolo_inference import predict_image
-from .camera_detection import camera_service
-
-# Import YOLO and set up model for streaming
-try:
-    from ultralytics import YOLO
-    import torch
-    from torch.serialization import add_safe_globals
-    from ultralytics.nn.tasks import DetectionModel
-    
-    # Add safe globals for YOLO model loading
-    add_safe_globals([DetectionModel])
-    
-    # Load the YOLO model for streaming
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    MODEL_PATH = os.path.join(BASE_DIR, 'best.pt')
-    
-    model = None
-    try:
-        model = YOLO(MODEL_PATH)
-        print("YOLO model loaded successfully for streaming")
-    except Exception as e:
-        print(f"Error loading YOLO model for streaming: {e}")
-        # Fallback: try loading with weights_only=False
-        try:
-            import torch.serialization
-            original_weights_only = torch.serialization._weights_only
-            torch.serialization._weights_only = False
-            model = YOLO(MODEL_PATH)
-            torch.serialization._weights_only = original_weights_only
-            print("YOLO model loaded with fallback method")
-        except Exception as e2:
-            print(f"Failed to load YOLO model for streaming: {e2}")
-            model = None
-
-except ImportError as e:
-    print(f"Failed to import YOLO dependencies: {e}")
-    model = None
+from .results import to_detections
+from .uploads import decode_uploaded_image, decode_image_bytes, iter_uploaded_images, UploadTooLarge
+from .batching import get_decode_executor
+from .model_registry import get_model_stats
+from .backends import get_backend, get_backend_stats
+from .camera_detection import camera_service, camera_key
+from .models import CameraFeed
+from .serializers import CameraFeedSerializer, IncidentMapSerializer
+from . import geo
+from incidents.models import Incident
+from django.utils.dateparse import parse_datetime
+from .sampling import build_sampler
+from .streaming import generate_mjpeg_stream, agenerate_mjpeg_stream, broadcaster, MJPEG_BOUNDARY
+
+def _serialize_result(arrays):
+    """Convert one image's DetectionArrays into the REST API's detection dicts"""
+    return to_detections(arrays, 'api')
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -57,38 +36,22 @@ def detect_accident(request):
     
     image_file = request.FILES['image']
     
-    # Save the uploaded image temporarily
-    temp_path = f'/tmp/uploaded_image_{image_file.name}'
-    with open(temp_path, 'wb+') as destination:
-        for chunk in image_file.chunks():
-            destination.write(chunk)
+    # Decode straight from the upload buffer: no temp file round-trip
+    try:
+        image = decode_uploaded_image(image_file)
+    except UploadTooLarge as e:
+        return Response({'error': str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
         # Run prediction
-        results = predict_image(temp_path)
+        results = predict_image(image)
         
         # Process results into a clean format
         detections = []
-        if results and len(results) > 0:
-            for result in results:
-                boxes = result.boxes
-                if boxes is not None:
-                    for box in boxes:
-                        # Get box coordinates
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        
-                        # Get class and confidence
-                        cls = int(box.cls[0].cpu().numpy())
-                        conf = float(box.conf[0].cpu().numpy())
-                        
-                        # Get class name
-                        class_name = result.names[cls]
-                        
-                        detections.append({
-                            'label': class_name,
-                            'confidence': conf,
-                            'box': [float(x1), float(y1), float(x2), float(y2)]
-                        })
+        for result in results or []:
+            detections.extend(_serialize_result(result))
         
         return Response({
             'detections': detections,
@@ -97,121 +60,431 @@ def detect_accident(request):
         
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    
-    finally:
-        # Clean up temporary file
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-
-def generate_mjpeg_stream():
-    """Generate MJPEG stream with YOLO detection and bounding boxes"""
-    if model is None:
-        print("Error: YOLO model not loaded. Cannot start streaming.")
-        return
-    
-    cap = cv2.VideoCapture(0)  # Use default camera (index 0)
-    
-    if not cap.isOpened():
-        print("Error: Could not open camera")
-        return
-    
-    # Set camera properties for better performance
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-    cap.set(cv2.CAP_PROP_FPS, 30)
-    
+
+def _batch_detection_lines(images, batch_size, max_images):
+    """
+    Decode and infer ``images`` (an iterator of (name, read)) in chunks of
+    ``batch_size``, yielding the NDJSON lines of each chunk (one per image)
+    as it completes.
+
+    A corrupt archive ends the stream with an error line; images past
+    ``max_images`` are not processed and end it with a 'truncated' line.
+    """
+    index = 0
+    executor = get_decode_executor()
+    while index < max_images:
+        try:
+            chunk = list(islice(images, min(batch_size, max_images - index)))
+        except ValueError as e:
+            yield json.dumps({'index': index, 'error': str(e)}) + '\n'
+            return
+        if not chunk:
+            return
+
+        def decode(item):
+            name, read = item
+            try:
+                return name, decode_image_bytes(read()), None
+            except ValueError as e:
+                return name, None, str(e)
+
+        decoded = list(executor.map(decode, chunk))
+        frames = [frame for _, frame, _ in decoded if frame is not None]
+        try:
+            results = iter(predict_image(frames)) if frames else iter(())
+            batch_error = None
+        except Exception as e:
+            results, batch_error = iter(()), str(e)
+
+        lines = []
+        for name, frame, error in decoded:
+            line = {'index': index, 'name': name}
+            if error is None and batch_error is not None:
+                error = batch_error
+            if error is not None:
+                line['error'] = error
+            else:
+                detections = _serialize_result(next(results))
+                line['detections'] = detections
+                line['total_detections'] = len(detections)
+            index += 1
+            lines.append(json.dumps(line) + '\n')
+        yield ''.join(lines)
+
     try:
-        while True:
-            success, frame = cap.read()
-            if not success:
-                print("Error: Could not read frame")
-                break
-            
-            # Run YOLO inference on the frame
-            results = model(frame, conf=0.5)  # Confidence threshold of 0.5
-            
-            # Draw bounding boxes and labels on the frame
-            annotated_frame = results[0].plot()
-            
-            # Convert frame to JPEG
-            ret, buffer = cv2.imencode('.jpg', annotated_frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-            if not ret:
-                continue
-            
-            frame_bytes = buffer.tobytes()
-            
-            # Yield the frame in MJPEG format
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-    
-    except Exception as e:
-        print(f"Error in MJPEG stream: {e}")
-    
-    finally:
-        cap.release()
+        truncated = next(images, None) is not None
+    except ValueError:
+        truncated = True
+    if truncated:
+        yield json.dumps({
+            'truncated': True,
+            'error': f'Only the first {max_images} images were processed',
+        }) + '\n'
+
+async def _abatch_detection_lines(images, batch_size, max_images):
+    """
+    Async variant of ``_batch_detection_lines`` for ASGI: each chunk is
+    read, decoded and inferred on a worker thread, so lines reach the
+    client as chunks complete instead of after the whole body.
+    """
+    chunks = _batch_detection_lines(images, batch_size, max_images)
+    while True:
+        lines = await asyncio.to_thread(next, chunks, None)
+        if lines is None:
+            break
+        yield lines
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def detect_accident_batch(request):
+    """
+    Detect accidents in many images in one request.
+
+    Accepts any number of ``images`` files and/or one zip/tar ``archive``,
+    runs them through the model ``?batch_size=`` at a time and streams one
+    NDJSON line per image (in upload order) as each batch completes. More
+    than AI_BATCH_UPLOAD_MAX_IMAGES files is a 413; an archive holding more
+    ends the stream with a 'truncated' line. Under ASGI the stream is
+    served from an async generator.
+    """
+    files = request.FILES.getlist('images')
+    archive = request.FILES.get('archive')
+    if not files and archive is None:
+        return Response({'error': 'No images provided'}, status=status.HTTP_400_BAD_REQUEST)
+
+    max_images = getattr(settings, 'AI_BATCH_UPLOAD_MAX_IMAGES', 1000)
+    if len(files) > max_images:
+        return Response({'error': f'At most {max_images} images per request'},
+                        status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    max_batch_size = getattr(settings, 'AI_BATCH_UPLOAD_MAX_SIZE', 64)
+    try:
+        # Documented as a query parameter; a form field is still accepted
+        batch_size = _optional_number(
+            request.query_params.get('batch_size', request.data.get('batch_size')), int, 1, max_batch_size
+        )
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    batch_size = batch_size or getattr(settings, 'AI_BATCH_UPLOAD_SIZE', 16)
+
+    try:
+        get_backend()
+    except RuntimeError:
+        return Response({'error': 'YOLO model not loaded'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    images = iter_uploaded_images(files, archive)
+    try:
+        # Pull the first image now so a bad archive is a 400, not a broken stream
+        first = next(images, None)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if first is None:
+        return Response({'error': 'No images found'}, status=status.HTTP_400_BAD_REQUEST)
+    images = chain([first], images)
+
+    if isinstance(request._request, ASGIRequest):
+        lines = _abatch_detection_lines(images, batch_size, max_images)
+    else:
+        lines = _batch_detection_lines(images, batch_size, max_images)
+    return StreamingHttpResponse(lines, content_type='application/x-ndjson')
+
+def _device_index(camera_source):
+    """
+    Local webcam index from request params (int or digit string)
+
+    Raises:
+        ValueError: for anything else, so a client can never make the
+            server open a URL or file path of its choosing
+    """
+    if isinstance(camera_source, int) and not isinstance(camera_source, bool):
+        return camera_source
+    camera_source = str(camera_source).strip()
+    if not camera_source.isdigit():
+        raise ValueError("camera_source must be a webcam device index; use camera_id for registered cameras")
+    return int(camera_source)
+
+def _camera_feed_id(camera_id):
+    """CameraFeed pk from request params; ValueError if malformed"""
+    try:
+        return int(camera_id)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid camera_id: {camera_id}")
+
+def _stream_source(params):
+    """
+    What the MJPEG feed may open: a registered CameraFeed's stream URL
+    (``camera_id``) or a local webcam index (``camera_source``), never a
+    URL or path taken from the request
+
+    Raises:
+        CameraFeed.DoesNotExist: unknown camera_id
+        ValueError: malformed camera_id, or a camera_source that isn't a device index
+    """
+    camera_id = params.get('camera_id')
+    if camera_id is not None:
+        return CameraFeed.objects.get(pk=_camera_feed_id(camera_id)).stream_url
+    return _device_index(params.get('camera_source', 0))
+
+def _camera_key(params):
+    """
+    Service key for ``camera_id`` (a CameraFeed pk) or ``camera_source``
+    (webcam index) in request params; None when neither is given
+    """
+    camera_id = params.get('camera_id')
+    if camera_id is not None:
+        return camera_key(camera_feed_id=_camera_feed_id(camera_id))
+    if 'camera_source' in params:
+        return camera_key(_device_index(params['camera_source']))
+    return None
+
+def _optional_number(value, cast, minimum, maximum):
+    """Parse an optional numeric query parameter within [minimum, maximum]"""
+    if value in (None, ''):
+        return None
+    try:
+        number = cast(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid number: {value}")
+    if not minimum <= number <= maximum:
+        raise ValueError(f"{value} is out of range ({minimum}-{maximum})")
+    return number
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def video_feed(request):
-    """Stream live video with YOLO detection"""
-    if model is None:
+    """
+    Stream live video with YOLO detection.
+
+    Watches a registered CameraFeed (?camera_id=) or a local webcam
+    (?camera_source=<device index>, default 0); arbitrary URLs and file
+    paths are refused. All viewers of the same camera share one
+    capture/inference/encode producer. Per-viewer ?fps=, ?quality= (JPEG,
+    1-100) and ?width= reduce bandwidth. Under ASGI the stream is served
+    from an async generator.
+    """
+    try:
+        get_backend()
+    except RuntimeError:
         return Response({'error': 'YOLO model not loaded'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    try:
+        camera_source = _stream_source(request.query_params)
+    except CameraFeed.DoesNotExist:
+        return Response({'error': f"Camera {request.query_params['camera_id']} not found"},
+                        status=status.HTTP_404_NOT_FOUND)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        fps = _optional_number(request.query_params.get('fps'), float, 0.1, 60)
+        quality = _optional_number(request.query_params.get('quality'), int, 1, 100)
+        width = _optional_number(request.query_params.get('width'), int, 16, 4096)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    if isinstance(request._request, ASGIRequest):
+        stream = agenerate_mjpeg_stream(camera_source, fps=fps, quality=quality, width=width)
+    else:
+        stream = generate_mjpeg_stream(camera_source, fps=fps, quality=quality, width=width)
     
     try:
         return StreamingHttpResponse(
-            generate_mjpeg_stream(),
-            content_type='multipart/x-mixed-replace; boundary=frame'
+            stream,
+            content_type=f'multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}'
         )
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-# Legacy camera detection endpoints for backward compatibility
+# Camera detection endpoints: one camera per CameraFeed (camera_id), or a
+# webcam device index (camera_source) for backward compatibility
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def start_camera_detection(request):
-    """Start camera detection service (legacy endpoint)"""
+    """Start detection on a CameraFeed (camera_id) or a local webcam (camera_source device index)"""
     try:
         # Get parameters from request
-        camera_source = request.data.get('camera_source', 0)
+        camera_id = request.data.get('camera_id')
         detection_interval = float(request.data.get('detection_interval', 1.0))
-        
+        location = None
+
+        # Frame sampling: 'interval' (default), 'every_n' or 'motion'
+        sampling_mode = request.data.get('sampling_mode', 'interval')
+        try:
+            if sampling_mode == 'interval':
+                sampler = build_sampler('interval', detection_interval=detection_interval)
+            elif sampling_mode == 'every_n':
+                sampler = build_sampler('every_n', n=request.data.get('sample_every_n'))
+            else:
+                sampler = build_sampler(
+                    sampling_mode,
+                    check_every=request.data.get('motion_check_every'),
+                    threshold=request.data.get('motion_threshold'),
+                    min_interval=request.data.get('motion_min_interval'),
+                    max_interval=request.data.get('motion_max_interval'),
+                )
+        except (TypeError, ValueError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Only a registered CameraFeed's stream URL or a local webcam index,
+        # never a URL or file path taken from the request
+        try:
+            if camera_id is not None:
+                feed = CameraFeed.objects.get(pk=_camera_feed_id(camera_id))
+                camera_id = feed.pk
+                camera_source = feed.stream_url
+                location = feed.location
+            else:
+                camera_source = _device_index(request.data.get('camera_source', 0))
+        except CameraFeed.DoesNotExist:
+            return Response({'error': f'Camera {camera_id} not found'}, status=status.HTTP_404_NOT_FOUND)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         # Start camera detection
-        camera_service.start_camera_detection(
-            camera_source=int(camera_source),
-            detection_interval=detection_interval
+        started = camera_service.start_camera_detection(
+            camera_source=camera_source,
+            detection_interval=detection_interval,
+            location=location,
+            sampler=sampler,
+            camera_feed_id=camera_id
         )
-        
+        if not started:
+            return Response({
+                'error': f'Camera detection is already running for {camera_id if camera_id is not None else camera_source}'
+            }, status=status.HTTP_409_CONFLICT)
+
         return Response({
             'status': 'success',
             'message': f'Camera detection started on source {camera_source}',
+            'camera_id': camera_id if camera_id is not None else camera_source,
             'camera_source': camera_source,
-            'detection_interval': detection_interval
+            'detection_interval': detection_interval,
+            'sampling': sampler.describe()
         })
-        
+
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def stop_camera_detection(request):
-    """Stop camera detection service (legacy endpoint)"""
+    """Stop detection on one camera (camera_id / camera_source), or on all cameras"""
     try:
-        camera_service.stop_camera_detection()
+        try:
+            key = _camera_key(request.data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        stopped = camera_service.stop_camera_detection(key)
+        if key is not None and not stopped:
+            return Response({'error': f'Camera {key[1]} is not running'}, status=status.HTTP_404_NOT_FOUND)
+
         return Response({
             'status': 'success',
-            'message': 'Camera detection stopped'
+            'message': 'Camera detection stopped',
+            'stopped': stopped
         })
-        
+
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_camera_status(request):
-    """Get camera detection status (legacy endpoint)"""
+    """Get detection status for every camera, or one camera with ?camera_id= (or ?camera_source=)"""
     try:
-        status = camera_service.get_camera_status()
-        return Response(status)
-        
+        try:
+            key = _camera_key(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if key is not None:
+            camera_status = camera_service.get_camera_status(key)
+            if camera_status is None:
+                return Response({'error': f'Camera {key[1]} is not running'}, status=status.HTTP_404_NOT_FOUND)
+            return Response(camera_status)
+
+        camera_status = camera_service.get_camera_status()
+        camera_status['streams'] = broadcaster.get_status()
+        return Response(camera_status)
+
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_model_status(request):
+    """Load time and resident memory of the shared YOLO model(s), and the inference backend in use"""
+    stats = get_model_stats()
+    stats['backend'] = get_backend_stats()
+    return Response(stats)
+
+# Spatial queries over cameras and incidents, served from the geohash index
+# (see geo.py): either ?lat=&lon=&radius_km= (nearest first, with
+# distance_km) or ?bbox=min_lon,min_lat,max_lon,max_lat
+GEO_MAX_RADIUS_KM = 500
+GEO_DEFAULT_LIMIT = 500
+GEO_MAX_LIMIT = 5000
+
+def _parse_geo_area(params):
+    """
+    Returns:
+        ('radius', (lat, lon, radius_km)) or ('bbox', (min_lat, min_lon, max_lat, max_lon))
+
+    Raises:
+        ValueError: for a missing or invalid area
+    """
+    bbox = params.get('bbox')
+    if bbox:
+        try:
+            min_lon, min_lat, max_lon, max_lat = (float(value) for value in bbox.split(','))
+        except ValueError:
+            raise ValueError("bbox must be min_lon,min_lat,max_lon,max_lat")
+        if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lon <= max_lon <= 180):
+            raise ValueError("bbox is out of range or inverted")
+        return 'bbox', (min_lat, min_lon, max_lat, max_lon)
+
+    lat = _optional_number(params.get('lat'), float, -90, 90)
+    lon = _optional_number(params.get('lon'), float, -180, 180)
+    radius_km = _optional_number(params.get('radius_km'), float, 0, GEO_MAX_RADIUS_KM)
+    if lat is None or lon is None or radius_km is None:
+        raise ValueError("Provide lat, lon and radius_km, or bbox")
+    return 'radius', (lat, lon, radius_km)
+
+def _geo_query(request, queryset, serializer_class, bbox_ordering):
+    try:
+        kind, area = _parse_geo_area(request.query_params)
+        limit = _optional_number(request.query_params.get('limit'), int, 1, GEO_MAX_LIMIT) or GEO_DEFAULT_LIMIT
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    if kind == 'bbox':
+        rows = list(geo.filter_bbox(queryset, *area).order_by(*bbox_ordering)[:limit])
+        return Response({'count': len(rows), 'results': serializer_class(rows, many=True).data})
+
+    matches = geo.within_radius(queryset, *area, limit=limit)
+    results = serializer_class([row for _, row in matches], many=True).data
+    for result, (distance, _) in zip(results, matches):
+        result['distance_km'] = round(distance, 3)
+    return Response({'count': len(results), 'results': results})
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def cameras_nearby(request):
+    """Cameras within a radius (nearest first) or a bounding box"""
+    return _geo_query(request, CameraFeed.objects.all(), CameraFeedSerializer, ('id',))
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def incidents_nearby(request):
+    """Incidents within a radius (nearest first) or a bounding box (newest first); ?since= limits them in time"""
+    incidents = Incident.objects.all()
+    since = request.query_params.get('since')
+    if since:
+        try:
+            since = parse_datetime(since)
+        except ValueError:  # well-formed but out of range, e.g. month 13
+            since = None
+        if since is None:
+            return Response({'error': 'since must be an ISO 8601 datetime'}, status=status.HTTP_400_BAD_REQUEST)
+        incidents = incidents.filter(timestamp__gte=since)
+    return _geo_query(request, incidents, IncidentMapSerializer, ('-timestamp', '-id'))
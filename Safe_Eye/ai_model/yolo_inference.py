@@ -1,63 +1,51 @@
-from ultralytics import YOLO
 import os
-import torch
-
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MODEL_PATH = os.path.join(BASE_DIR, 'best.pt')
-
-model = None
-try:
-    model = YOLO(MODEL_PATH)
-except Exception as e:
-    print(f"Error loading YOLO model: {e}")
-    # Fallback: try loading with weights_only=False
-    try:
-        import torch.serialization
-        original_weights_only = torch.serialization._weights_only
-        torch.serialization._weights_only = False
-        model = YOLO(MODEL_PATH)
-        torch.serialization._weights_only = original_weights_only
-    except Exception as e2:
-        print(f"Failed to load YOLO model with fallback: {e2}")
-        model = None
+
+import cv2
+
+from .backends import get_backend
+from .results import to_detections
+
 
 class YOLOInference:
     def __init__(self):
-        global model
-        self.model = model
-        if self.model is None:
-            raise RuntimeError("YOLO model not loaded.")
+        # Shared, lazily-loaded backend (raises RuntimeError if it can't load)
+        self.backend = get_backend()
 
     def detect_accidents(self, img):
         """
         Accept numpy frame directly
         """
-        results = self.model(img)
-        detections = []
-        for r in results:
-            boxes = r.boxes
-            for box in boxes:
-                bbox = box.xyxy[0].tolist()  # [x1, y1, x2, y2]
-                confidence = float(box.conf[0])
-                class_id = int(box.cls[0])
-                class_name = self.model.names[class_id] if hasattr(self.model, 'names') else str(class_id)
-                detections.append({
-                    'bbox': bbox,
-                    'confidence': confidence,
-                    'class_id': class_id,
-                    'class_name': class_name
-                })
-        return detections
-    
-    # For backward-compatibility with your REST “manual upload” view
-def predict_image(image_path: str):
-    """
-    Load an image from disk path, run YOLO inference, return raw results list.
-    """
-    if model is None:
-        raise RuntimeError("YOLO model not loaded.")
-    return model(image_path)
+        return self.detect_batch([img])[0]
+
+    def detect_batch(self, imgs):
+        """
+        Run one batched forward pass over a list of numpy frames.
 
+        Returns:
+            One list of detections per input frame, in input order
+        """
+        return [to_detections(arrays, 'ws') for arrays in self.detect_batch_arrays(imgs)]
 
+    def detect_batch_arrays(self, imgs):
+        """
+        Same as ``detect_batch``, but returns one DetectionArrays per frame
+        (for callers that pack their own payload, e.g. the binary protocol).
+        """
+        return self.backend.predict(list(imgs))
 
+    # For backward-compatibility with your REST “manual upload” view
+def predict_image(image):
+    """
+    Run inference on a disk path, a decoded BGR numpy array or a list of
+    arrays with the configured backend.
 
+    Returns:
+        One DetectionArrays per image
+    """
+    if isinstance(image, (str, os.PathLike)):
+        path = image
+        image = cv2.imread(os.fspath(path))
+        if image is None:
+            raise ValueError(f"Could not read image {path}")
+    images = image if isinstance(image, (list, tuple)) else [image]
+    return get_backend().predict(list(images))
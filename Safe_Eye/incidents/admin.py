@@ -1,7 +1,31 @@
 from django.contrib import admin
+from django.db import transaction
 from .models import Incident
+from .rollups import record_incident_change, record_incidents, remove_incidents
 
 @admin.register(Incident)
 class IncidentAdmin(admin.ModelAdmin):
     list_display = ('incident_type', 'description', 'location', 'timestamp', 'reported_by')
     list_filter = ('incident_type', )
+    list_select_related = ('reported_by', )
+
+    # Keep the dashboard rollups in step with admin edits
+    def save_model(self, request, obj, form, change):
+        old = Incident.objects.get(pk=obj.pk) if change else None
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            if old is None:
+                record_incidents([obj])
+            else:
+                record_incident_change(old, obj)
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            remove_incidents([obj])
+
+    def delete_queryset(self, request, queryset):
+        incidents = list(queryset)
+        with transaction.atomic():
+            super().delete_queryset(request, queryset)
+            remove_incidents(incidents)
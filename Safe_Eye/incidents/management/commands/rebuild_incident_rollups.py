@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from incidents.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the hourly/daily incident rollups from the incident table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="Only rebuild from this ISO 8601 datetime on (whole days)")
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError("--since must be an ISO 8601 datetime")
+        count = rebuild_rollups(since)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} incident rollups"))
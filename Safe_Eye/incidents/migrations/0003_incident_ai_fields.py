@@ -0,0 +1,58 @@
+# Generated by Django 5.0.6 on 2026-10-18 01:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='incident',
+            name='image_url',
+        ),
+        migrations.RemoveField(
+            model_name='incident',
+            name='is_verified',
+        ),
+        migrations.RemoveField(
+            model_name='incident',
+            name='video_url',
+        ),
+        migrations.AddField(
+            model_name='incident',
+            name='confidence',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='incident',
+            name='image',
+            field=models.ImageField(blank=True, null=True, upload_to='incidents/'),
+        ),
+        migrations.AlterField(
+            model_name='incident',
+            name='description',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='incident',
+            name='incident_type',
+            field=models.CharField(default='Accident', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='incident',
+            name='location',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='incident',
+            name='reported_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
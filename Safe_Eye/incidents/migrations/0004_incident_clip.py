@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 02:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0003_incident_ai_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='incident',
+            name='clip',
+            field=models.FileField(blank=True, null=True, upload_to='incidents/clips/'),
+        ),
+    ]
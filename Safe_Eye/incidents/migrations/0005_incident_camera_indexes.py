@@ -0,0 +1,32 @@
+# Generated by Django 5.0.6 on 2026-10-18 02:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_model', '0001_initial'),
+        ('incidents', '0004_incident_clip'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='incident',
+            name='camera',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='incidents', to='ai_model.camerafeed'),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['timestamp', 'id'], name='incident_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['incident_type', 'timestamp'], name='incident_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['location', 'timestamp'], name='incident_location_idx'),
+        ),
+    ]
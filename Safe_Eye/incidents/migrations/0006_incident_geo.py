@@ -0,0 +1,47 @@
+# Generated by Django 5.0.6 on 2026-10-18 03:40
+
+from django.db import migrations, models
+
+from ai_model import geo
+
+
+def fill_positions(apps, schema_editor):
+    # Incidents reported by a camera take its coordinates
+    Incident = apps.get_model('incidents', 'Incident')
+    incidents = list(Incident.objects.filter(camera__isnull=False).select_related('camera'))
+    for incident in incidents:
+        incident.latitude = incident.camera.latitude
+        incident.longitude = incident.camera.longitude
+        incident.geohash = geo.encode(incident.latitude, incident.longitude)
+    Incident.objects.bulk_update(incidents, ['latitude', 'longitude', 'geohash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_model', '0002_camerafeed_geohash'),
+        ('incidents', '0005_incident_camera_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='incident',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='incident',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='incident',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=12),
+        ),
+        migrations.RunPython(fill_positions, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['geohash', 'timestamp'], name='incident_geohash_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+from datetime import timezone
+
+from django.db import migrations
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import Coalesce, Trunc
+
+
+def backfill_rollups(apps, schema_editor):
+    """Build the hourly and daily rollups of the incidents recorded before 0007 (same as rebuild_incident_rollups)"""
+    Incident = apps.get_model('incidents', 'Incident')
+    IncidentRollup = apps.get_model('incidents', 'IncidentRollup')
+
+    rows = []
+    for bucket in ('hour', 'day'):
+        groups = (
+            Incident.objects.order_by()
+            .annotate(start=Trunc('timestamp', bucket, tzinfo=timezone.utc))
+            .values('start', 'camera_id', 'incident_type')
+            .annotate(
+                count=Count('id'),
+                confidence_count=Count('confidence'),
+                confidence_sum=Coalesce(Sum('confidence'), 0.0),
+                max_confidence=Max('confidence'),
+            )
+        )
+        rows.extend(
+            IncidentRollup(
+                bucket=bucket, bucket_start=group['start'], camera_key=group['camera_id'] or 0,
+                incident_type=group['incident_type'], count=group['count'],
+                confidence_count=group['confidence_count'], confidence_sum=group['confidence_sum'],
+                max_confidence=group['max_confidence'],
+            )
+            for group in groups
+        )
+
+    IncidentRollup.objects.all().delete()
+    IncidentRollup.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0007_incidentrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
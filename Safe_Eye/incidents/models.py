@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from ai_model import geo
 
 class Incident(models.Model):
     incident_type = models.CharField(max_length=20, default='Accident')
@@ -11,8 +12,79 @@ class Incident(models.Model):
         on_delete=models.CASCADE,
         null=True, blank=True  # allow null for AI-generated detections
     )
+    camera = models.ForeignKey(
+        'ai_model.CameraFeed',
+        on_delete=models.SET_NULL,
+        null=True, blank=True,  # only set for AI detections on a CameraFeed
+        related_name='incidents'
+    )
+    # Where it happened: the camera's position for AI detections; geohash
+    # is the spatial index key (see ai_model/geo.py)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False)
     confidence = models.FloatField(null=True, blank=True)
     image = models.ImageField(upload_to='incidents/', null=True, blank=True)
+    clip = models.FileField(upload_to='incidents/clips/', null=True, blank=True)  # footage around AI-detected events
+
+    class Meta:
+        # The listing pages newest first on (timestamp, id); the filtered
+        # variants keep the same order within a type / location
+        indexes = [
+            models.Index(fields=['timestamp', 'id'], name='incident_timestamp_idx'),
+            models.Index(fields=['incident_type', 'timestamp'], name='incident_type_idx'),
+            models.Index(fields=['location', 'timestamp'], name='incident_location_idx'),
+            models.Index(fields=['geohash', 'timestamp'], name='incident_geohash_idx'),
+        ]
+
+    def set_position(self, camera=None):
+        """Take the camera's coordinates when none are set, and refresh the geohash"""
+        camera = camera or self.camera
+        if self.latitude is None and camera is not None:
+            self.latitude, self.longitude = camera.latitude, camera.longitude
+        located = self.latitude is not None and self.longitude is not None
+        self.geohash = geo.encode(self.latitude, self.longitude) if located else ''
+
+    def save(self, *args, **kwargs):
+        self.set_position()
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Accident at {self.location or 'Unknown'}"
+
+
+class IncidentRollup(models.Model):
+    """
+    Incident counts and confidence stats per time bucket, camera and type.
+
+    Maintained incrementally as incidents are written (see rollups.py) so
+    dashboards never aggregate the raw incident table; rebuild with
+    ``manage.py rebuild_incident_rollups``.
+    """
+    HOUR = 'hour'
+    DAY = 'day'
+    BUCKET_CHOICES = [(HOUR, 'Hour'), (DAY, 'Day')]
+
+    bucket = models.CharField(max_length=4, choices=BUCKET_CHOICES)
+    bucket_start = models.DateTimeField()  # UTC
+    camera_key = models.IntegerField(default=0)  # CameraFeed id, 0 for incidents without one
+    incident_type = models.CharField(max_length=20)
+    count = models.PositiveIntegerField(default=0)
+    # Over the incidents that have a confidence
+    confidence_count = models.PositiveIntegerField(default=0)
+    confidence_sum = models.FloatField(default=0.0)
+    max_confidence = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['bucket', 'bucket_start', 'camera_key', 'incident_type'], name='incident_rollup_key'
+            ),
+        ]
+
+    @property
+    def avg_confidence(self):
+        return self.confidence_sum / self.confidence_count if self.confidence_count else None
+
+    def __str__(self):
+        return f"{self.count} x {self.incident_type} ({self.bucket} of {self.bucket_start:%Y-%m-%d %H:%M})"
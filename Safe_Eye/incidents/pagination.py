@@ -0,0 +1,15 @@
+from rest_framework.pagination import CursorPagination
+
+
+class IncidentCursorPagination(CursorPagination):
+    """
+    Newest first, paged by an opaque cursor over (timestamp, id).
+
+    Each page is an index range scan from the cursor position, so it costs
+    the same on page 1 and page 10,000, unlike OFFSET pagination; the id
+    tie-break keeps the order stable for incidents sharing a timestamp.
+    """
+    ordering = ('-timestamp', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
@@ -0,0 +1,245 @@
+from collections import defaultdict
+from datetime import timedelta, timezone
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Trunc
+
+from .models import Incident, IncidentRollup
+
+BUCKETS = (IncidentRollup.HOUR, IncidentRollup.DAY)
+
+
+def bucket_start(timestamp, bucket):
+    """Start (UTC) of the hour/day bucket containing ``timestamp`` (naive means UTC)"""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    timestamp = timestamp.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0) if bucket == IncidentRollup.DAY else timestamp
+
+
+BUCKET_SPANS = {IncidentRollup.HOUR: timedelta(hours=1), IncidentRollup.DAY: timedelta(days=1)}
+
+# Fields whose change moves an incident between (or within) rollup rows
+ROLLUP_FIELDS = ('timestamp', 'camera_id', 'incident_type', 'confidence')
+
+
+def _rollup_key(incident, bucket):
+    return bucket, bucket_start(incident.timestamp, bucket), incident.camera_id or 0, incident.incident_type
+
+
+def _key_filter(key):
+    bucket, start, camera_key, incident_type = key
+    return {'bucket': bucket, 'bucket_start': start, 'camera_key': camera_key, 'incident_type': incident_type}
+
+
+def _apply(key, count=0, confidence_count=0, confidence_sum=0.0, max_confidence=None):
+    """Add deltas to one rollup row, creating it if needed (safe against concurrent writers)"""
+    rows = IncidentRollup.objects.filter(**_key_filter(key))
+    changes = {
+        'count': F('count') + count,
+        'confidence_count': F('confidence_count') + confidence_count,
+        'confidence_sum': F('confidence_sum') + confidence_sum,
+    }
+    if max_confidence is not None:
+        changes['max_confidence'] = Greatest(Coalesce(F('max_confidence'), Value(max_confidence)), Value(max_confidence))
+
+    if rows.update(**changes):
+        return
+    if count < 0 or confidence_count < 0:
+        # Nothing recorded to subtract from
+        return
+    try:
+        with transaction.atomic():
+            IncidentRollup.objects.create(
+                **_key_filter(key),
+                count=count, confidence_count=confidence_count, confidence_sum=confidence_sum,
+                max_confidence=max_confidence,
+            )
+    except IntegrityError:
+        # Another writer created it in the meantime
+        rows.update(**changes)
+
+
+def _deltas(incidents, sign):
+    """Per rollup key deltas for adding (sign 1) or removing (sign -1) incidents"""
+    deltas = defaultdict(lambda: {'count': 0, 'confidence_count': 0, 'confidence_sum': 0.0, 'max_confidence': None})
+    for incident in incidents:
+        for bucket in BUCKETS:
+            delta = deltas[_rollup_key(incident, bucket)]
+            delta['count'] += sign
+            if incident.confidence is not None:
+                delta['confidence_count'] += sign
+                delta['confidence_sum'] += sign * incident.confidence
+                if sign > 0:
+                    delta['max_confidence'] = max(delta['max_confidence'] or incident.confidence, incident.confidence)
+    return deltas
+
+
+def _refresh(keys):
+    """
+    After incidents left these rollup rows: drop the emptied ones and
+    recompute max_confidence (a maximum can't be decremented) from the
+    incidents still in the row, an index range scan on (incident_type, timestamp)
+    """
+    for key in keys:
+        rows = IncidentRollup.objects.filter(**_key_filter(key))
+        if rows.filter(count__lte=0).delete()[0]:
+            continue
+        bucket, start, camera_key, incident_type = key
+        incidents = Incident.objects.filter(
+            incident_type=incident_type, timestamp__gte=start, timestamp__lt=start + BUCKET_SPANS[bucket],
+        )
+        incidents = incidents.filter(camera_id=camera_key) if camera_key else incidents.filter(camera__isnull=True)
+        rows.update(max_confidence=incidents.aggregate(peak=Max('confidence'))['peak'])
+
+
+def record_incidents(incidents):
+    """
+    Add newly created incidents to their hourly and daily rollups.
+
+    Incidents are grouped by rollup key first, so a batch costs one UPDATE
+    (or INSERT) per distinct bucket/camera/type rather than per incident.
+    Call it in the transaction that creates the incidents.
+    """
+    for key, delta in _deltas(incidents, 1).items():
+        _apply(key, **delta)
+
+
+def remove_incidents(incidents):
+    """
+    Take deleted incidents (instances still holding their field values)
+    out of their rollups. Call it in the deleting transaction, after the
+    delete.
+    """
+    deltas = _deltas(incidents, -1)
+    for key, delta in deltas.items():
+        _apply(key, **delta)
+    _refresh(deltas)
+
+
+def record_incident_change(old, incident):
+    """
+    Move an edited incident's rollups from its ``old`` values (a copy
+    taken before the edit) to its current ones. Call it in the updating
+    transaction, after the save.
+    """
+    if all(getattr(old, field) == getattr(incident, field) for field in ROLLUP_FIELDS):
+        return
+    remove_incidents([old])
+    record_incidents([incident])
+
+
+def record_confidence_change(incident, old_confidence):
+    """Move an existing incident's rollups from ``old_confidence`` to its current confidence"""
+    if incident.confidence == old_confidence:
+        return
+    keys = [_rollup_key(incident, bucket) for bucket in BUCKETS]
+    for key in keys:
+        _apply(
+            key,
+            confidence_count=(incident.confidence is not None) - (old_confidence is not None),
+            confidence_sum=(incident.confidence or 0.0) - (old_confidence or 0.0),
+            max_confidence=incident.confidence,
+        )
+    if old_confidence is not None and (incident.confidence is None or incident.confidence < old_confidence):
+        _refresh(keys)
+
+
+def rebuild_rollups(since=None):
+    """
+    Recompute rollups from the incident table (all of them, or from
+    ``since`` on, rounded down to a whole day).
+
+    Returns:
+        Number of rollup rows written
+    """
+    incidents = Incident.objects.all()
+    rollups = IncidentRollup.objects.all()
+    if since is not None:
+        since = bucket_start(since, IncidentRollup.DAY)
+        incidents = incidents.filter(timestamp__gte=since)
+        rollups = rollups.filter(bucket_start__gte=since)
+
+    rows = []
+    for bucket in BUCKETS:
+        groups = (
+            incidents.order_by()
+            .annotate(start=Trunc('timestamp', bucket, tzinfo=timezone.utc))
+            .values('start', 'camera_id', 'incident_type')
+            .annotate(
+                count=Count('id'),
+                confidence_count=Count('confidence'),
+                confidence_sum=Coalesce(Sum('confidence'), 0.0),
+                max_confidence=Max('confidence'),
+            )
+        )
+        rows.extend(
+            IncidentRollup(
+                bucket=bucket, bucket_start=group['start'], camera_key=group['camera_id'] or 0,
+                incident_type=group['incident_type'], count=group['count'],
+                confidence_count=group['confidence_count'], confidence_sum=group['confidence_sum'],
+                max_confidence=group['max_confidence'],
+            )
+            for group in groups
+        )
+
+    with transaction.atomic():
+        rollups.delete()
+        IncidentRollup.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def _summaries(rollups, *group_by):
+    rows = rollups.values(*group_by).annotate(
+        total=Sum('count'),
+        confidence_total=Sum('confidence_sum'),
+        confidence_n=Sum('confidence_count'),
+        peak=Max('max_confidence'),
+    ).order_by(*group_by)
+    return [
+        {
+            **{field: row[field] for field in group_by},
+            'count': row['total'],
+            'avg_confidence': row['confidence_total'] / row['confidence_n'] if row['confidence_n'] else None,
+            'max_confidence': row['peak'],
+        }
+        for row in rows
+    ]
+
+
+def rollup_stats(bucket, since, until=None, camera=None, incident_type=None):
+    """
+    Timeseries and per-camera / per-type breakdowns, from rollups only.
+
+    Returns:
+        dict with 'timeseries' (one entry per non-empty bucket), 'by_camera'
+        (with the camera's coordinates, for heatmaps) and 'by_type'
+    """
+    from ai_model.models import CameraFeed
+
+    rollups = IncidentRollup.objects.filter(bucket=bucket, bucket_start__gte=bucket_start(since, bucket))
+    if until is not None:
+        rollups = rollups.filter(bucket_start__lt=until)
+    if camera is not None:
+        rollups = rollups.filter(camera_key=camera)
+    if incident_type:
+        rollups = rollups.filter(incident_type=incident_type)
+
+    by_camera = _summaries(rollups, 'camera_key')
+    cameras = CameraFeed.objects.in_bulk([row['camera_key'] for row in by_camera if row['camera_key']])
+    for row in by_camera:
+        feed = cameras.get(row.pop('camera_key'))
+        row.update({
+            'camera': feed.pk if feed else None,
+            'location': feed.location if feed else None,
+            'latitude': feed.latitude if feed else None,
+            'longitude': feed.longitude if feed else None,
+        })
+
+    timeseries = _summaries(rollups, 'bucket_start')
+    return {
+        'timeseries': timeseries,
+        'by_camera': by_camera,
+        'by_type': _summaries(rollups, 'incident_type'),
+    }
@@ -1,3 +1,131 @@
-from django.test import TestCase
+from importlib import import_module
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.admin.sites import site
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase
+from rest_framework.test import APIClient
+
+from ai_model.models import CameraFeed
+from .models import Incident, IncidentRollup
+from .rollups import rebuild_rollups
+
+backfill_migration = import_module('incidents.migrations.0008_backfill_incident_rollups')
+
+
+def rollup_state():
+    """Every rollup row as a comparable tuple"""
+    return sorted(
+        (row.bucket, row.bucket_start, row.camera_key, row.incident_type, row.count, row.confidence_count,
+         round(row.confidence_sum, 6), row.max_confidence)
+        for row in IncidentRollup.objects.all()
+    )
+
+
+class RollupTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('operator', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.north = CameraFeed.objects.create(location='North', latitude=30.0, longitude=31.0,
+                                               stream_url='http://cameras.example/north')
+        self.south = CameraFeed.objects.create(location='South', latitude=29.0, longitude=31.0,
+                                               stream_url='http://cameras.example/south')
+
+    def assert_matches_rebuild(self):
+        live = rollup_state()
+        rebuild_rollups()
+        self.assertEqual(live, rollup_state())
+
+
+class IncidentRollupApiTests(RollupTestCase):
+    """Rollups maintained by the incident API equal a rebuild from the incident table"""
+
+    def create(self, **data):
+        response = self.client.post('/api/incidents/', data, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def patch(self, pk, **data):
+        self.assertEqual(self.client.patch(f'/api/incidents/{pk}/', data, format='json').status_code, 200)
+
+    def test_create(self):
+        self.create(incident_type='Accident', camera=self.north.pk, confidence=0.9)
+        self.create(incident_type='Accident', camera=self.north.pk, confidence=0.5)
+        self.create(incident_type='Fire')
+        self.assertEqual(IncidentRollup.objects.get(bucket=IncidentRollup.DAY, incident_type='Accident').count, 2)
+        self.assert_matches_rebuild()
+
+    def test_patch_type_and_camera(self):
+        pk = self.create(incident_type='Accident', camera=self.north.pk, confidence=0.9)
+        self.create(incident_type='Accident', camera=self.north.pk, confidence=0.4)
+        self.patch(pk, incident_type='Fire')
+        self.assert_matches_rebuild()
+        self.patch(pk, camera=self.south.pk)
+        self.assert_matches_rebuild()
+        # The remaining Accident row's peak drops to the other incident's
+        accident = IncidentRollup.objects.get(bucket=IncidentRollup.DAY, incident_type='Accident')
+        self.assertEqual(accident.max_confidence, 0.4)
+
+    def test_patch_confidence(self):
+        pk = self.create(incident_type='Accident', camera=self.north.pk, confidence=0.9)
+        self.create(incident_type='Accident', camera=self.north.pk, confidence=0.5)
+        self.patch(pk, confidence=0.2)
+        self.assert_matches_rebuild()
+
+    def test_delete(self):
+        first = self.create(incident_type='Accident', camera=self.north.pk, confidence=0.9)
+        second = self.create(incident_type='Accident', camera=self.north.pk, confidence=0.5)
+        self.assertEqual(self.client.delete(f'/api/incidents/{first}/').status_code, 204)
+        self.assert_matches_rebuild()
+        self.assertEqual(self.client.delete(f'/api/incidents/{second}/').status_code, 204)
+        self.assertEqual(rollup_state(), [])
+
+
+class IncidentRollupAdminTests(RollupTestCase):
+    """Admin edits and deletes keep the rollups in step too"""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = site._registry[Incident]
+        self.request = RequestFactory().post('/admin/')
+        self.request.user = self.user
+
+    def add(self, **fields):
+        incident = Incident(**fields)
+        self.admin.save_model(self.request, incident, None, change=False)
+        return incident
+
+    def test_change_and_delete(self):
+        incident = self.add(incident_type='Accident', camera=self.north, confidence=0.9)
+        self.add(incident_type='Accident', camera=self.south, confidence=0.3)
+        self.add(incident_type='Fire', confidence=0.6)
+        self.assert_matches_rebuild()
+
+        incident.incident_type, incident.camera = 'Fire', self.south
+        self.admin.save_model(self.request, incident, None, change=True)
+        self.assert_matches_rebuild()
+
+        self.admin.delete_model(self.request, incident)
+        self.assert_matches_rebuild()
+
+        self.admin.delete_queryset(self.request, Incident.objects.filter(incident_type='Fire'))
+        self.assert_matches_rebuild()
+        self.admin.delete_queryset(self.request, Incident.objects.all())
+        self.assertEqual(rollup_state(), [])
+
+
+class RollupBackfillMigrationTests(RollupTestCase):
+    def test_backfill_fills_rollups(self):
+        # bulk_create bypasses the rollup hooks, like incidents written before 0007
+        Incident.objects.bulk_create([
+            Incident(incident_type='Accident', camera=self.north, confidence=0.9),
+            Incident(incident_type='Accident', camera=self.north, confidence=0.4),
+            Incident(incident_type='Fire', camera=self.south),
+            Incident(incident_type='Fire'),
+        ])
+        self.assertEqual(rollup_state(), [])
+
+        backfill_migration.backfill_rollups(apps, None)
+        self.assertEqual(sum(IncidentRollup.objects.filter(bucket=IncidentRollup.DAY).values_list('count', flat=True)), 4)
+        self.assert_matches_rebuild()
@@ -1,7 +1,105 @@
+from copy import copy
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework import viewsets
-from .models import Incident
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from notifications.broadcast import broadcast_incidents
+from notifications.services import notify_incidents
+from .models import Incident, IncidentRollup
+from .pagination import IncidentCursorPagination
+from .rollups import record_incident_change, record_incidents, remove_incidents, rollup_stats
 from .serializers import IncidentSerializer
 
+
+def _query_param(request, name, parse):
+    value = request.query_params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        parsed = parse(value)
+    except (TypeError, ValueError):
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: f"Invalid value '{value}'"})
+    return parsed
+
+
 class IncidentViewSet(viewsets.ModelViewSet):
-    queryset = Incident.objects.all().order_by('-timestamp')
+    """
+    Incidents, newest first, cursor-paginated.
+
+    List filters (all optional): since / until (ISO 8601 datetimes), type,
+    location, min_confidence and camera (CameraFeed id).
+    """
+    queryset = Incident.objects.order_by('-timestamp', '-id')
     serializer_class = IncidentSerializer
+    pagination_class = IncidentCursorPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action != 'list':
+            return queryset
+
+        request = self.request
+        since = _query_param(request, 'since', parse_datetime)
+        until = _query_param(request, 'until', parse_datetime)
+        incident_type = request.query_params.get('type')
+        location = request.query_params.get('location')
+        min_confidence = _query_param(request, 'min_confidence', float)
+        camera = _query_param(request, 'camera', int)
+
+        if since is not None:
+            queryset = queryset.filter(timestamp__gte=since)
+        if until is not None:
+            queryset = queryset.filter(timestamp__lt=until)
+        if incident_type:
+            queryset = queryset.filter(incident_type=incident_type)
+        if location:
+            queryset = queryset.filter(location=location)
+        if min_confidence is not None:
+            queryset = queryset.filter(confidence__gte=min_confidence)
+        if camera is not None:
+            queryset = queryset.filter(camera_id=camera)
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """
+        Dashboard aggregates from the rollup tables (never the raw incidents).
+
+        ``bucket`` is 'hour' (default, last 7 days) or 'day' (last 90 days);
+        since / until, camera and type narrow it down.
+        """
+        bucket = request.query_params.get('bucket', IncidentRollup.HOUR)
+        if bucket not in (IncidentRollup.HOUR, IncidentRollup.DAY):
+            raise ValidationError({'bucket': "Must be 'hour' or 'day'"})
+        default_span = timedelta(days=7) if bucket == IncidentRollup.HOUR else timedelta(days=90)
+        since = _query_param(request, 'since', parse_datetime) or timezone.now() - default_span
+        until = _query_param(request, 'until', parse_datetime)
+        camera = _query_param(request, 'camera', int)
+
+        stats = rollup_stats(bucket, since, until, camera, request.query_params.get('type'))
+        return Response({'bucket': bucket, 'since': since, 'until': until, **stats})
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            incident = serializer.save()
+            record_incidents([incident])
+        broadcast_incidents([incident])
+        notify_incidents([incident])
+
+    def perform_update(self, serializer):
+        old = copy(serializer.instance)
+        with transaction.atomic():
+            incident = serializer.save()
+            record_incident_change(old, incident)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            remove_incidents([instance])
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from collections import defaultdict
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Every alerts socket joins this group; each authenticated one also joins
+# its user's group
+INCIDENTS_GROUP = 'incidents'
+
+# Seconds a plain thread waits for its sends to run on the server loop
+SEND_TIMEOUT = 10.0
+
+# Event loop serving this process's alerts sockets (set as they connect).
+# Sends from plain threads (the incident writer) are scheduled on it: with
+# the in-memory channel layer the sockets' queues belong to that loop, and
+# a send made from a loop of our own never wakes them.
+_server_loop = None
+
+
+def set_server_loop(loop):
+    global _server_loop
+    _server_loop = loop
+
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def user_group(user_id):
+    return f'notifications_user_{user_id}'
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def _group_send_all(channel_layer, messages):
+    results = await asyncio.gather(
+        *(channel_layer.group_send(group, message) for group, message in messages),
+        return_exceptions=True
+    )
+    for (group, message), result in zip(messages, results):
+        if isinstance(result, Exception):
+            logger.error("Could not push %s to group %s: %s", message['type'], group, result)
+
+
+def group_send_many(messages):
+    """
+    Send (group, message) pairs through the channel layer in one go.
+
+    All sends run concurrently in a single hop to the event loop, so a
+    batch costs one round of channel-layer (Redis) calls rather than one
+    per message. Once an alerts socket has connected in this process, the
+    hop goes to the server's loop; before that (or with no server, e.g. a
+    management command) ``async_to_sync`` runs it. Failures are logged,
+    never raised: a broken push must not fail the write that triggered it.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None or not messages:
+        return
+    messages = list(messages)
+    loop = _server_loop
+    try:
+        if loop is not None and loop.is_running() and _running_loop() is not loop:
+            asyncio.run_coroutine_threadsafe(_group_send_all(channel_layer, messages), loop).result(SEND_TIMEOUT)
+        else:
+            async_to_sync(_group_send_all)(channel_layer, messages)
+    except Exception:
+        logger.exception("Could not push %d messages to the channel layer", len(messages))
+
+
+def broadcast_incidents(incidents, created=True):
+    """
+    Push incidents to every connected alerts socket.
+
+    Records are packed ``ALERTS_BROADCAST_BATCH_SIZE`` to a group message;
+    the consumer unpacks them, so clients still get one message per record.
+
+    Args:
+        incidents: Saved Incident instances
+        created: True for new incidents, False for updates to existing ones
+    """
+    from incidents.serializers import IncidentSerializer
+
+    batch_size = getattr(settings, 'ALERTS_BROADCAST_BATCH_SIZE', 50)
+    payload = [dict(data) for data in IncidentSerializer(list(incidents), many=True).data]
+    message_type = 'incidents.created' if created else 'incidents.updated'
+    group_send_many([
+        (INCIDENTS_GROUP, {'type': message_type, 'incidents': chunk})
+        for chunk in _chunks(payload, batch_size)
+    ])
+
+
+def broadcast_notifications(notifications):
+    """Push saved Notification instances to their users' alerts sockets, one group message per user"""
+    from .serializers import NotificationSerializer
+
+    batch_size = getattr(settings, 'ALERTS_BROADCAST_BATCH_SIZE', 50)
+    by_user = defaultdict(list)
+    for notification in notifications:
+        by_user[notification.user_id].append(dict(NotificationSerializer(notification).data))
+    group_send_many([
+        (user_group(user_id), {'type': 'notifications.created', 'notifications': chunk})
+        for user_id, payload in by_user.items()
+        for chunk in _chunks(payload, batch_size)
+    ])
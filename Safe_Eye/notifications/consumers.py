@@ -0,0 +1,81 @@
+import asyncio
+import json
+import logging
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+
+from .broadcast import INCIDENTS_GROUP, set_server_loop, user_group
+
+logger = logging.getLogger(__name__)
+
+
+@database_sync_to_async
+def get_user_for_token(token):
+    """User for a simplejwt access token, or None if it isn't valid"""
+    from django.contrib.auth import get_user_model
+    from rest_framework_simplejwt.exceptions import TokenError
+    from rest_framework_simplejwt.settings import api_settings
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    try:
+        user_id = AccessToken(token)[api_settings.USER_ID_CLAIM]
+    except (TokenError, KeyError):
+        return None
+    return get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+
+
+class AlertConsumer(AsyncWebsocketConsumer):
+    """
+    Pushes incidents (to everyone) and notifications (to their user) as
+    they are created, so clients don't have to poll the REST API.
+
+    The REST API authenticates with JWT, which browsers can't send as a
+    WebSocket header, so the access token goes in the query string
+    (``ws/alerts/?token=<access>``); a session user works as well.
+    Anonymous sockets only receive incidents.
+    """
+
+    async def connect(self):
+        # Lets threads outside the server (the incident writer) push on this loop
+        set_server_loop(asyncio.get_running_loop())
+        self.groups_joined = [INCIDENTS_GROUP]
+
+        user = self.scope.get('user')
+        token = parse_qs(self.scope.get('query_string', b'').decode()).get('token')
+        if token:
+            user = await get_user_for_token(token[0])
+            if user is None:
+                await self.close(code=4001)
+                return
+        if user is not None and user.is_authenticated:
+            self.groups_joined.append(user_group(user.pk))
+
+        for group in self.groups_joined:
+            await self.channel_layer.group_add(group, self.channel_name)
+
+        await self.accept()
+        logger.info("Alerts WebSocket connected: %s", self.groups_joined)
+        await self.send(text_data=json.dumps({
+            'type': 'connection_established',
+            'groups': self.groups_joined,
+        }))
+
+    async def disconnect(self, close_code):
+        for group in getattr(self, 'groups_joined', []):
+            await self.channel_layer.group_discard(group, self.channel_name)
+        logger.info(f"Alerts WebSocket disconnected: {close_code}")
+
+    # Group messages carry a batch of records; clients get one message each
+    async def incidents_created(self, event):
+        for incident in event['incidents']:
+            await self.send(text_data=json.dumps({'type': 'incident_created', 'incident': incident}))
+
+    async def incidents_updated(self, event):
+        for incident in event['incidents']:
+            await self.send(text_data=json.dumps({'type': 'incident_updated', 'incident': incident}))
+
+    async def notifications_created(self, event):
+        for notification in event['notifications']:
+            await self.send(text_data=json.dumps({'type': 'notification_created', 'notification': notification}))
@@ -0,0 +1,39 @@
+"""
+Channel layer stand-in for local development and tests.
+
+``FakeRedisChannelLayer`` is channels_redis' ``RedisChannelLayer`` talking to
+an in-process fakeredis server instead of a real Redis, so the Redis code
+path (serialization, group membership, capacity and expiry handling) can be
+exercised without running Redis. Select it with
+``SAFE_EYE_REDIS_URL=fakeredis://``. Since the fake server lives in the
+process, it does not fan out across worker processes; use a real Redis
+URL for that.
+
+Requires ``fakeredis`` and ``lupa`` (channels_redis runs Lua scripts);
+neither is installed by default, see requirements.txt.
+"""
+import importlib.util
+
+import redis.asyncio as aioredis
+from channels_redis.core import RedisChannelLayer
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import fakeredis
+    from fakeredis.aioredis import FakeConnection
+except ImportError as e:
+    raise ImproperlyConfigured(
+        "SAFE_EYE_REDIS_URL=fakeredis:// needs fakeredis and lupa (pip install fakeredis lupa)"
+    ) from e
+if importlib.util.find_spec('lupa') is None:
+    raise ImproperlyConfigured(
+        "SAFE_EYE_REDIS_URL=fakeredis:// needs lupa to run channels_redis' Lua scripts (pip install lupa)"
+    )
+
+# Shared by every layer instance (and event loop) in the process
+_server = fakeredis.FakeServer()
+
+
+class FakeRedisChannelLayer(RedisChannelLayer):
+    def create_pool(self, index):
+        return aioredis.ConnectionPool(connection_class=FakeConnection, server=_server)
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.6 on 2026-10-18 03:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def delete_notifications_without_incident(apps, schema_editor):
+    # Rows from before the incident link existed can't be attached to one
+    Notification = apps.get_model('notifications', 'Notification')
+    Notification.objects.filter(incident__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0005_incident_camera_indexes'),
+        ('notifications', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='notification',
+            old_name='created_at',
+            new_name='timestamp',
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='incident',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='incidents.incident'),
+        ),
+        migrations.RunPython(delete_notifications_without_incident, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='notification',
+            name='incident',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='incidents.incident'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read', 'timestamp'], name='notification_user_read_idx'),
+        ),
+    ]
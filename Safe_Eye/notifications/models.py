@@ -9,5 +9,11 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Serves a user's unread count and "mark read up to" updates
+        indexes = [
+            models.Index(fields=['user', 'is_read', 'timestamp'], name='notification_user_read_idx'),
+        ]
+
     def __str__(self):
         return self.message
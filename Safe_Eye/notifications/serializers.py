@@ -1,7 +1,29 @@
 from rest_framework import serializers
+from incidents.models import Incident
 from .models import Notification
 
 class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
         fields = '__all__'
+        # Always the requesting user; never reassignable by a client
+        read_only_fields = ('user',)
+
+
+class IncidentSummarySerializer(serializers.ModelSerializer):
+    """The few incident fields a notification feed shows"""
+    class Meta:
+        model = Incident
+        fields = ('id', 'incident_type', 'location', 'timestamp', 'confidence', 'image')
+
+
+class NotificationFeedSerializer(serializers.ModelSerializer):
+    """Feed entry for the current user (so without ``user``); ``incident`` is the id"""
+    class Meta:
+        model = Notification
+        fields = ('id', 'incident', 'message', 'is_read', 'timestamp')
+
+
+class NotificationFeedEmbedSerializer(NotificationFeedSerializer):
+    """Feed entry with the incident summary embedded (?embed=incident)"""
+    incident = IncidentSummarySerializer(read_only=True)
@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from .broadcast import broadcast_notifications
+from .models import Notification
+
+
+def get_subscribers():
+    """
+    Users notified about new incidents: every active user, or only those
+    whose role is in INCIDENT_NOTIFICATION_ROLES when that is set.
+    """
+    users = get_user_model().objects.filter(is_active=True)
+    roles = getattr(settings, 'INCIDENT_NOTIFICATION_ROLES', None)
+    if roles:
+        users = users.filter(role__in=roles)
+    return users
+
+
+def incident_message(incident):
+    message = f"{incident.incident_type} reported at {incident.location or 'unknown location'}"
+    if incident.confidence is not None:
+        message += f" (confidence {incident.confidence:.0%})"
+    return message
+
+
+def notify_incidents(incidents, users=None):
+    """
+    Fan incidents out to subscribers as Notification rows.
+
+    All rows (incidents x users) are inserted with ``bulk_create`` in one
+    transaction, and pushed to the users' alert sockets once it commits.
+
+    Args:
+        incidents: Saved Incident instances
+        users: Recipients (defaults to ``get_subscribers()``)
+
+    Returns:
+        The created notifications
+    """
+    incidents = list(incidents)
+    if not incidents:
+        return []
+    users = get_subscribers() if users is None else users
+    user_ids = list(users.values_list('pk', flat=True)) if hasattr(users, 'values_list') else [u.pk for u in users]
+
+    notifications = [
+        Notification(user_id=user_id, incident=incident, message=incident_message(incident))
+        for incident in incidents
+        for user_id in user_ids
+    ]
+    with transaction.atomic():
+        created = Notification.objects.bulk_create(notifications, batch_size=1000)
+        transaction.on_commit(lambda: broadcast_notifications(created))
+    return created
+
+
+def mark_read(user, up_to=None, before=None):
+    """
+    Mark a user's unread notifications read in a single UPDATE.
+
+    Args:
+        up_to: Only notifications with id <= up_to
+        before: Only notifications with timestamp <= before
+
+    Returns:
+        Number of notifications marked read
+    """
+    notifications = Notification.objects.filter(user=user, is_read=False)
+    if up_to is not None:
+        notifications = notifications.filter(pk__lte=up_to)
+    if before is not None:
+        notifications = notifications.filter(timestamp__lte=before)
+    return notifications.update(is_read=True)
+
+
+def unread_count(user):
+    return Notification.objects.filter(user=user, is_read=False).count()
@@ -1,3 +1,214 @@
-from django.test import TestCase
+import asyncio
+import importlib.util
+import threading
+import unittest
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from incidents.models import Incident
+from .broadcast import group_send_many, set_server_loop, user_group
+from .models import Notification
+from .services import notify_incidents
+
+IN_MEMORY_LAYER = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+FAKE_REDIS_LAYER = {'default': {'BACKEND': 'notifications.layers.FakeRedisChannelLayer'}}
+
+
+class NotificationOwnershipTests(TestCase):
+    """A user can only ever create or edit notifications in their own feed"""
+
+    def setUp(self):
+        User = get_user_model()
+        self.owner = User.objects.create_user('owner', password='x')
+        self.other = User.objects.create_user('other', password='x')
+        self.incident = Incident.objects.create(incident_type='Accident', location='Main St')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_patch_cannot_move_notification(self):
+        notification = Notification.objects.create(user=self.owner, incident=self.incident, message='crash')
+        response = self.client.patch(f'/api/notifications/{notification.pk}/',
+                                     {'user': self.other.pk, 'is_read': True}, format='json')
+        self.assertEqual(response.status_code, 200)
+        notification.refresh_from_db()
+        self.assertEqual(notification.user, self.owner)
+        self.assertTrue(notification.is_read)
+
+    def test_create_is_owned_by_requester(self):
+        response = self.client.post('/api/notifications/', {
+            'user': self.other.pk, 'incident': self.incident.pk, 'message': 'crash',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Notification.objects.get(pk=response.data['id']).user, self.owner)
+        self.assertFalse(Notification.objects.filter(user=self.other).exists())
+
+
+class NotificationETagTests(TestCase):
+    """The feed's ETag changes whenever the page a client would see does"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('owner', password='x')
+        self.incident = Incident.objects.create(incident_type='Accident', location='Main St')
+        self.first = Notification.objects.create(user=self.user, incident=self.incident, message='one')
+        self.second = Notification.objects.create(user=self.user, incident=self.incident, message='two',
+                                                  is_read=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_feed(self, etag=None, **params):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get('/api/notifications/', params, **headers)
+
+    def assert_changed(self, etag, **params):
+        response = self.get_feed(etag, **params)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response['ETag']
+
+    def test_unchanged_feed_is_not_modified(self):
+        etag = self.get_feed()['ETag']
+        self.assertEqual(self.get_feed(etag).status_code, 304)
+
+    def test_edited_message_changes_etag(self):
+        etag = self.get_feed()['ETag']
+        Notification.objects.filter(pk=self.first.pk).update(message='edited')
+        self.assert_changed(etag)
+
+    def test_swapped_read_state_changes_etag(self):
+        etag = self.get_feed()['ETag']
+        # Same count, newest id and unread count as before
+        Notification.objects.filter(pk=self.first.pk).update(is_read=True)
+        Notification.objects.filter(pk=self.second.pk).update(is_read=False)
+        self.assert_changed(etag)
+
+    def test_embedded_incident_change_changes_etag(self):
+        etag = self.get_feed(embed='incident')['ETag']
+        Incident.objects.filter(pk=self.incident.pk).update(location='Second Ave')
+        self.assert_changed(etag, embed='incident')
+
+
+class NotificationDateParamTests(TestCase):
+    """Well-formed but impossible dates are a 400, not a 500"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user('owner', password='x'))
+
+    def test_invalid_since(self):
+        for since in ('2024-13-45T00:00', 'yesterday'):
+            with self.subTest(since=since):
+                self.assertEqual(self.client.get('/api/notifications/', {'since': since}).status_code, 400)
+
+    def test_invalid_mark_read_before(self):
+        for before in ('2024-13-45T00:00', 'yesterday'):
+            with self.subTest(before=before):
+                response = self.client.post('/api/notifications/mark_read/', {'before': before}, format='json')
+                self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER)
+class NotifyIncidentsTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.operators = [User.objects.create_user(f'operator{i}', password='x', role='Operator') for i in range(3)]
+        self.admin = User.objects.create_user('admin', password='x', role='Admin')
+        User.objects.create_user('former', password='x', is_active=False)
+        self.incidents = [
+            Incident.objects.create(incident_type='Accident', location='Main St', confidence=0.9),
+            Incident.objects.create(incident_type='Fire', location='Second Ave'),
+        ]
+
+    def test_one_row_per_recipient_in_one_insert(self):
+        with CaptureQueriesContext(connection) as queries:
+            created = notify_incidents(self.incidents)
+        inserts = [query for query in queries.captured_queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+
+        recipients = [*self.operators, self.admin]
+        self.assertEqual(len(created), len(self.incidents) * len(recipients))
+        self.assertEqual(
+            sorted(Notification.objects.values_list('incident_id', 'user_id')),
+            sorted((incident.pk, user.pk) for incident in self.incidents for user in recipients),
+        )
+        message = Notification.objects.get(incident=self.incidents[0], user=self.admin).message
+        self.assertEqual(message, 'Accident reported at Main St (confidence 90%)')
+
+    @override_settings(INCIDENT_NOTIFICATION_ROLES=['Operator'])
+    def test_roles_limit_recipients(self):
+        notify_incidents(self.incidents[:1])
+        self.assertEqual(set(Notification.objects.values_list('user_id', flat=True)),
+                         {user.pk for user in self.operators})
+
+    def test_pushed_to_users_after_commit(self):
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(user_group(self.admin.pk), channel)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            notify_incidents(self.incidents)
+
+        message = async_to_sync(layer.receive)(channel)
+        self.assertEqual(message['type'], 'notifications.created')
+        self.assertEqual({entry['incident'] for entry in message['notifications']},
+                         {incident.pk for incident in self.incidents})
+        self.assertTrue(all(entry['user'] == self.admin.pk for entry in message['notifications']))
+
+
+class GroupSendTestMixin:
+    """group_send_many delivers through the configured channel layer"""
+
+    layers = None
+
+    def setUp(self):
+        override = override_settings(CHANNEL_LAYERS=self.layers)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.layer = get_channel_layer()
+
+    def message(self, number):
+        return {'type': 'notifications.created', 'notifications': [{'id': number}]}
+
+    def test_send_without_server_loop(self):
+        channel = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)(user_group(1), channel)
+        group_send_many([(user_group(1), self.message(1)), (user_group(2), self.message(2))])
+        self.assertEqual(async_to_sync(self.layer.receive)(channel), self.message(1))
+
+    def test_thread_send_reaches_waiting_socket(self):
+        # A server loop with a socket waiting on it, and a send from a
+        # plain thread, like the incident writer's
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+
+        def run(coroutine):
+            return asyncio.run_coroutine_threadsafe(coroutine, loop)
+
+        try:
+            channel = run(self.layer.new_channel()).result(5)
+            run(self.layer.group_add(user_group(1), channel)).result(5)
+            receiving = run(self.layer.receive(channel))
+            set_server_loop(loop)
+            group_send_many([(user_group(1), self.message(1))])
+            self.assertEqual(receiving.result(5), self.message(1))
+        finally:
+            set_server_loop(None)
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(5)
+            loop.close()
+
+
+class InMemoryGroupSendTests(GroupSendTestMixin, SimpleTestCase):
+    layers = IN_MEMORY_LAYER
+
+
+@unittest.skipIf(importlib.util.find_spec('fakeredis') is None or importlib.util.find_spec('lupa') is None,
+                 "fakeredis and lupa are optional")
+class FakeRedisGroupSendTests(GroupSendTestMixin, SimpleTestCase):
+    layers = FAKE_REDIS_LAYER
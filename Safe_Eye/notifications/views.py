@@ -1,7 +1,106 @@
-from rest_framework import viewsets
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_datetime
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from .broadcast import broadcast_notifications
 from .models import Notification
-from .serializers import NotificationSerializer
+from .pagination import NotificationCursorPagination
+from .serializers import NotificationFeedEmbedSerializer, NotificationFeedSerializer, NotificationSerializer
+from . import services
+
+
+def _parse_datetime(value):
+    """ISO 8601 datetime, or None when malformed or out of range (e.g. month 13)"""
+    try:
+        return parse_datetime(str(value))
+    except ValueError:
+        return None
+
 
 class NotificationViewSet(viewsets.ModelViewSet):
-    queryset = Notification.objects.all().order_by('-timestamp')
+    """
+    The current user's notifications, newest first, cursor-paginated.
+
+    List options: ``embed=incident`` inlines an incident summary (joined in
+    the same query) and ``since=<ISO 8601>`` only returns notifications
+    newer than that. List responses carry an ETag of the page's content; a
+    request whose If-None-Match still matches gets an empty 304.
+    """
+    queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
+    pagination_class = NotificationCursorPagination
+    permission_classes = [IsAuthenticated]
+
+    def _embed_incident(self):
+        return self.request.query_params.get('embed') == 'incident'
+
+    def get_queryset(self):
+        queryset = super().get_queryset().filter(user=self.request.user)
+        if self.action != 'list':
+            return queryset
+
+        since = self.request.query_params.get('since')
+        if since:
+            since = _parse_datetime(since)
+            if since is None:
+                raise ValidationError({'since': 'Must be an ISO 8601 datetime'})
+            queryset = queryset.filter(timestamp__gt=since)
+        if self._embed_incident():
+            queryset = queryset.select_related('incident')
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return NotificationFeedEmbedSerializer if self._embed_incident() else NotificationFeedSerializer
+        return super().get_serializer_class()
+
+    def _etag(self, data):
+        # A digest of the page itself, so any change to what the client
+        # would see (new, deleted, edited or (un)read notifications, embedded
+        # incident data, cursor links) changes the tag
+        payload = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+        return '"%s"' % hashlib.md5(payload.encode()).hexdigest()
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        etag = self._etag(response.data)
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        response['ETag'] = etag
+        return response
+
+    def perform_create(self, serializer):
+        broadcast_notifications([serializer.save(user=self.request.user)])
+
+    @action(detail=False, methods=['post'])
+    def mark_read(self, request):
+        """
+        Mark the current user's notifications read in one UPDATE: all of
+        them, or only those up to notification id ``up_to`` and/or up to
+        timestamp ``before`` (ISO 8601)
+        """
+        up_to = request.data.get('up_to')
+        before = request.data.get('before')
+        try:
+            up_to = int(up_to) if up_to not in (None, '') else None
+        except (TypeError, ValueError):
+            return Response({'error': 'up_to must be a notification id'}, status=status.HTTP_400_BAD_REQUEST)
+        if before not in (None, ''):
+            before = _parse_datetime(before)
+            if before is None:
+                return Response({'error': 'before must be an ISO 8601 datetime'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            before = None
+
+        updated = services.mark_read(request.user, up_to=up_to, before=before)
+        return Response({'updated': updated, 'unread_count': services.unread_count(request.user)})
+
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        return Response({'unread_count': services.unread_count(request.user)})
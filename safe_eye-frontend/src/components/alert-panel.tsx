@@ -11,18 +11,14 @@ import { Label } from "@/components/ui/label";
 import { Textarea } from "@/components/ui/textarea";
 import { Bell, Mail, Phone, MessageSquare } from "lucide-react";
 import { getAuthToken } from "@/lib/auth";
+import { fetchIncidentPage, Incident } from "@/lib/incidents";
 
-interface Incident {
-  id: number;
-  incident_type: string;
-  description: string;
-  location: string;
-  timestamp: string;
-  reported_by: number;
-}
+// Only active incidents are shown as alerts
+const isActive = (incident: Incident) => incident.incident_type.toLowerCase() !== "normal";
 
 export default function AlertPanel() {
   const [alerts, setAlerts] = useState<Incident[]>([]);
+  const [nextPage, setNextPage] = useState<string | null>(null);
   const [emailNotifications, setEmailNotifications] = useState(true);
   const [smsNotifications, setSmsNotifications] = useState(false);
   const [soundAlerts, setSoundAlerts] = useState(true);
@@ -32,21 +28,17 @@ export default function AlertPanel() {
     fetchAlerts();
   }, []);
 
-  const fetchAlerts = async () => {
+  // First page, or the next one when `next` is given; older alerts load on demand
+  const fetchAlerts = async (next?: string) => {
     const token = getAuthToken();
     if (!token) return;
 
     setIsLoading(true);
     try {
-      const response = await axios.get("http://127.0.0.1:8000/api/incidents/", {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-
-      // Filter out normal incidents (only show active ones)
-      const activeAlerts = response.data.filter(
-        (incident: Incident) => incident.incident_type.toLowerCase() !== "normal"
-      );
-      setAlerts(activeAlerts);
+      const page = await fetchIncidentPage(token, next);
+      const activeAlerts = page.results.filter(isActive);
+      setAlerts((prev) => (next ? [...prev, ...activeAlerts] : activeAlerts));
+      setNextPage(page.next);
     } catch (err) {
       console.error("Failed to fetch alerts", err);
     } finally {
@@ -83,9 +75,9 @@ export default function AlertPanel() {
           <CardDescription>Current alerts requiring attention</CardDescription>
         </CardHeader>
         <CardContent>
-          {isLoading ? (
+          {isLoading && alerts.length === 0 ? (
             <p>Loading alerts...</p>
-          ) : alerts.length === 0 ? (
+          ) : alerts.length === 0 && !nextPage ? (
             <p className="text-center text-gray-500">No active alerts at this moment.</p>
           ) : (
             <div className="space-y-4">
@@ -117,6 +109,13 @@ export default function AlertPanel() {
                   </div>
                 </div>
               ))}
+              {nextPage && (
+                <div className="text-center">
+                  <Button variant="outline" onClick={() => fetchAlerts(nextPage)} disabled={isLoading}>
+                    {isLoading ? "Loading..." : "Load more"}
+                  </Button>
+                </div>
+              )}
             </div>
           )}
         </CardContent>
@@ -1,7 +1,6 @@
 'use client';
 
 import { useState, useEffect } from "react";
-import axios from "axios";
 import { useRouter } from "next/navigation";
 
 import { Button } from "@/components/ui/button";
@@ -24,6 +23,7 @@ import AlertPanel from "@/components/alert-panel";
 import SystemSettings from "@/components/system-settings";
 
 import { getAuthToken, clearAuthData } from "@/lib/auth";
+import { fetchIncidentStats, IncidentStats } from "@/lib/incidents";
 
 export default function DashboardPage() {
   const [activeAlerts, setActiveAlerts] = useState(0);
@@ -48,12 +48,12 @@ export default function DashboardPage() {
     if (!token) return;
     (async () => {
       try {
-        const res = await axios.get("http://127.0.0.1:8000/api/incidents/", {
-          headers: { Authorization: `Bearer ${token}` },
-        });
-        const incidents = res.data as Array<{ incident_type: string }>;
-        setEventsToday(incidents.length);
-        setActiveAlerts(incidents.filter(i => i.incident_type !== "normal").length);
+        // Counts come from the rollup-backed stats endpoint; day buckets are UTC days
+        const today = new Date().toISOString().slice(0, 10);
+        const stats = await fetchIncidentStats(token, { bucket: "day", since: `${today}T00:00:00Z` });
+        const total = (types: IncidentStats["by_type"]) => types.reduce((sum, row) => sum + row.count, 0);
+        setEventsToday(total(stats.by_type));
+        setActiveAlerts(total(stats.by_type.filter(row => row.incident_type !== "normal")));
         setCameras(12);
         setCoverageAreas(8);
       } catch (err: any) {
@@ -1,7 +1,6 @@
 'use client';
 
 import { useState, useEffect } from "react";
-import axios from "axios";
 import { useRouter } from "next/navigation";
 
 import { Button } from "@/components/ui/button";
@@ -32,25 +31,27 @@ import {
 import { Search, Download, Eye, AlertTriangle, Loader2 } from "lucide-react";
 
 import { getAuthToken, clearAuthData } from "@/lib/auth";
-
-interface Incident {
-  id: number;
-  incident_type: string;
-  description: string;
-  location: string;
-  timestamp: string;
-  reported_by: number;
-}
+import { fetchIncidentPage, Incident } from "@/lib/incidents";
 
 export default function EventRecords() {
   const [incidents, setIncidents] = useState<Incident[]>([]);
+  const [nextPage, setNextPage] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [searchTerm, setSearchTerm] = useState("");
   const [filterType, setFilterType] = useState("all");
   const router = useRouter();
   const token = getAuthToken();
 
-  // Fetch incidents on mount
+  const handleError = (err: any) => {
+    console.error("Error fetching incidents:", err);
+    if (err.response?.status === 401) {
+      clearAuthData();
+      router.push("/login");
+    }
+  };
+
+  // Fetch the first page on mount; older events load on demand
   useEffect(() => {
     if (!token) {
       clearAuthData();
@@ -59,23 +60,31 @@ export default function EventRecords() {
     }
     (async () => {
       try {
-        const res = await axios.get<Incident[]>(
-          "http://127.0.0.1:8000/api/incidents/",
-          { headers: { Authorization: `Bearer ${token}` } }
-        );
-        setIncidents(res.data);
+        const page = await fetchIncidentPage(token);
+        setIncidents(page.results);
+        setNextPage(page.next);
       } catch (err: any) {
-        console.error("Error fetching incidents:", err);
-        if (err.response?.status === 401) {
-          clearAuthData();
-          router.push("/login");
-        }
+        handleError(err);
       } finally {
         setLoading(false);
       }
     })();
   }, [router, token]);
 
+  const loadMore = async () => {
+    if (!token || !nextPage) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchIncidentPage(token, nextPage);
+      setIncidents((prev) => [...prev, ...page.results]);
+      setNextPage(page.next);
+    } catch (err: any) {
+      handleError(err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // Filter & search
   const filtered = incidents.filter((inc) => {
     const matchesSearch =
@@ -180,6 +189,14 @@ export default function EventRecords() {
               </TableBody>
             </Table>
           </div>
+          {nextPage && (
+            <div className="mt-4 text-center">
+              <Button variant="outline" onClick={loadMore} disabled={loadingMore}>
+                {loadingMore && <Loader2 className="h-4 w-4 mr-2 animate-spin" />}
+                Load more
+              </Button>
+            </div>
+          )}
         </CardContent>
       </Card>
     </div>
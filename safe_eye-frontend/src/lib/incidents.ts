@@ -0,0 +1,57 @@
+import axios from "axios";
+
+const INCIDENTS_URL = "http://127.0.0.1:8000/api/incidents/";
+
+export interface Incident {
+  id: number;
+  incident_type: string;
+  description: string;
+  location: string;
+  timestamp: string;
+  reported_by: number;
+}
+
+// GET /api/incidents/ is cursor-paginated: `next` is the URL of the following page (null on the last one)
+export interface IncidentPage {
+  next: string | null;
+  previous: string | null;
+  results: Incident[];
+}
+
+export interface IncidentSummary {
+  count: number;
+  avg_confidence: number | null;
+  max_confidence: number | null;
+}
+
+export interface IncidentStats {
+  bucket: "hour" | "day";
+  since: string;
+  until: string | null;
+  timeseries: Array<IncidentSummary & { bucket_start: string }>;
+  by_camera: Array<IncidentSummary & { camera: number | null; location: string | null }>;
+  by_type: Array<IncidentSummary & { incident_type: string }>;
+}
+
+const authHeaders = (token: string) => ({ Authorization: `Bearer ${token}` });
+
+/** One page of incidents, newest first: the first page, or the page at a previous response's `next` URL */
+export async function fetchIncidentPage(token: string, next?: string | null, pageSize = 50): Promise<IncidentPage> {
+  const res = await axios.get<IncidentPage>(next || INCIDENTS_URL, {
+    headers: authHeaders(token),
+    params: next ? undefined : { page_size: pageSize },
+  });
+  return res.data;
+}
+
+/** Dashboard aggregates, served from the rollup tables without reading the incidents themselves */
+export async function fetchIncidentStats(
+  token: string,
+  params: { bucket?: "hour" | "day"; since?: string; until?: string; camera?: number; type?: string } = {}
+): Promise<IncidentStats> {
+  const res = await axios.get<IncidentStats>(`${INCIDENTS_URL}stats/`, {
+    headers: authHeaders(token),
+    params,
+  });
+  return res.data;
+}